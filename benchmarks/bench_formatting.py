@@ -0,0 +1,63 @@
+"""MarkdownV2 格式化：多国家价格对比等长消息"""
+
+import pytest
+
+from utils.config_manager import get_config
+from utils.formatter import foldable_text_with_markdown_v2, format_with_markdown_v2
+
+
+COUNTRIES = [
+    ("🇹🇷", "土耳其", "TRY"),
+    ("🇳🇬", "尼日利亚", "NGN"),
+    ("🇮🇳", "印度", "INR"),
+    ("🇦🇷", "阿根廷", "ARS"),
+    ("🇵🇰", "巴基斯坦", "PKR"),
+    ("🇪🇬", "埃及", "EGP"),
+    ("🇺🇸", "美国", "USD"),
+    ("🇯🇵", "日本", "JPY"),
+    ("🇧🇷", "巴西", "BRL"),
+    ("🇲🇾", "马来西亚", "MYR"),
+]
+
+
+def build_price_message(repeat: int) -> str:
+    """构造与 /app、/nf 结果相近的多国家价格消息（含粗体、代码、链接和斜体）"""
+    lines = ["📱 *应用名称*: `Example Pro - Photo & Video`", "🔗 [App Store](https://apps.apple.com/us/app/id123)", ""]
+    for index in range(repeat):
+        for flag, name, currency in COUNTRIES:
+            lines.append(f"{flag} *{name}* ({currency}) _第{index + 1}组_")
+            lines.append(f"  • 月度订阅: 9.99 {currency} ≈ ¥{index + 12.34:.2f}")
+            lines.append(f"  • 年度订阅 (Pro+): 59.99 {currency} ≈ ¥{index + 88.8:.2f}")
+            lines.append(f"  • 终身买断 - `lifetime.unlock`: 199.00 {currency} ≈ ¥{index + 299.5:.2f}")
+    lines.append("")
+    lines.append("⏱ 数据缓存于: 2024-05-01 12:00 (UTC+8)")
+    return "\n".join(lines)
+
+
+SHORT_MESSAGE = build_price_message(1)
+LONG_MESSAGE = build_price_message(6)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _folding_threshold():
+    # 固定折叠阈值，避免本地 .env 影响结果
+    config = get_config()
+    original = config.folding_threshold
+    config.folding_threshold = 15
+    yield
+    config.folding_threshold = original
+
+
+def bench_format_with_markdown_v2_short(benchmark):
+    result = benchmark(format_with_markdown_v2, SHORT_MESSAGE)
+    assert "*土耳其*" in result
+
+
+def bench_format_with_markdown_v2_long(benchmark):
+    benchmark(format_with_markdown_v2, LONG_MESSAGE)
+
+
+def bench_foldable_text_with_markdown_v2_long(benchmark):
+    result = benchmark(foldable_text_with_markdown_v2, LONG_MESSAGE)
+    assert result.startswith("**> ")
+    assert result.endswith("||")
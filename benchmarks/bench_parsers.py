@@ -0,0 +1,25 @@
+"""
+页面解析器：回放 benchmarks/corpus 中录制的真实页面
+每个页面一个基准（ops 列即每秒解析页数），extra_info 记录页面大小和解析时的内存峰值，
+并与录制时的期望快照比对，兼作 Apple / Steam 页面改版的回归检查。
+
+语料库为空时整个模块跳过，录制方法见 parser_corpus.py。
+"""
+
+import pytest
+from parser_corpus import load_corpus, measure_allocation, normalize
+
+
+FIXTURES = load_corpus()
+
+if not FIXTURES:
+    pytest.skip("解析器语料库为空，先运行 python benchmarks/parser_corpus.py record", allow_module_level=True)
+
+
+@pytest.mark.parametrize("fixture", FIXTURES, ids=lambda fixture: fixture.id)
+def bench_parser(fixture, benchmark):
+    benchmark.extra_info["page_kib"] = round(len(fixture.content.encode("utf-8")) / 1024, 1)
+    benchmark.extra_info["alloc_peak_kib"] = round(measure_allocation(fixture) / 1024, 1)
+
+    result = benchmark(fixture.parse)
+    assert normalize(result) == fixture.expected, f"{fixture.url} 的解析结果与快照不一致"
@@ -0,0 +1,48 @@
+"""价格字符串解析：utils.price_parser 与 SteamPriceChecker 的同名实现"""
+
+import pytest
+
+from commands.steam import SteamPriceChecker
+from utils.price_parser import extract_currency_and_price
+
+
+# (价格字符串, 国家代码, 期望币种, 期望数值)
+PRICE_CASES = [
+    ("$9.99", "US", "USD", 9.99),
+    ("¥1,980", "JP", "JPY", 1980.0),
+    ("¥29.80", "CN", "CNY", 29.8),
+    ("₺1.299,99", "TR", "TRY", 1299.99),
+    ("Rp 149.000", "ID", "IDR", 149000.0),
+    ("₦4,400", "NG", "NGN", 4400.0),
+    ("₹ 799", "IN", "INR", 799.0),
+    ("R$ 54,90", "BR", "BRL", 54.9),
+    ("1 299,00 zł", "PL", "PLN", 1299.0),
+    ("RM 17.90", "MY", "MYR", 17.9),
+    ("HK$ 78", "HK", "HKD", 78.0),
+    ("€ 12,99", "DE", "EUR", 12.99),
+]
+
+
+@pytest.fixture(scope="module")
+def steam_checker():
+    return SteamPriceChecker()
+
+
+def _parse_all(parse):
+    for price_str, country, _currency, _value in PRICE_CASES:
+        parse(price_str, country)
+
+
+@pytest.mark.parametrize(("price_str", "country", "currency", "value"), PRICE_CASES)
+def bench_price_parser_correctness(price_str, country, currency, value, benchmark):
+    detected, parsed = benchmark(extract_currency_and_price, price_str, country)
+    assert detected == currency
+    assert parsed == pytest.approx(value)
+
+
+def bench_price_parser_all_locales(benchmark):
+    benchmark(_parse_all, extract_currency_and_price)
+
+
+def bench_steam_parser_all_locales(benchmark, steam_checker):
+    benchmark(_parse_all, steam_checker.extract_currency_and_price)
@@ -0,0 +1,72 @@
+"""结果排序与匹配：App Store 的 find_common_plan / sort_key_func，Steam 的 _select_best_match"""
+
+import random
+
+import pytest
+
+from commands.app_store import find_common_plan, sort_key_func
+from commands.steam import SteamPriceChecker
+
+
+PLAN_NAMES = ["Monthly", "Yearly", "Pro Monthly", "Pro Yearly", "Premium Lifetime", "Coins x100", "Coins x500"]
+
+
+def build_app_prices(countries: int = 40, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    results = []
+    for index in range(countries):
+        if index % 10 == 9:
+            results.append({"status": "not_listed", "country_code": f"C{index}"})
+            continue
+        purchases = [
+            {"name": name, "price_str": "x", "cny_price": round(rng.uniform(1, 300), 2)}
+            for name in rng.sample(PLAN_NAMES, k=rng.randint(3, len(PLAN_NAMES)))
+        ]
+        results.append(
+            {
+                "status": "ok",
+                "country_code": f"C{index}",
+                "app_price_cny": round(rng.uniform(0, 50), 2),
+                "in_app_purchases": purchases,
+            }
+        )
+    return results
+
+
+def build_search_results(count: int = 25, seed: int = 11) -> list[dict]:
+    rng = random.Random(seed)
+    suffixes = ["", " - Soundtrack", " Season Pass", " Deluxe Edition", " DLC Pack", " Friend's Pass", " Remastered"]
+    results = [{"name": "Cyberpunk 2077", "price": {"final": 29800}}]
+    for index in range(count - 1):
+        results.append(
+            {"name": f"Cyberpunk 2077{rng.choice(suffixes)} {index}", "price": {"final": 1000} if index % 2 else None}
+        )
+    rng.shuffle(results)
+    return results
+
+
+APP_PRICES = build_app_prices()
+SEARCH_RESULTS = build_search_results()
+
+
+@pytest.fixture(scope="module")
+def steam_checker():
+    return SteamPriceChecker()
+
+
+def bench_find_common_plan(benchmark):
+    assert benchmark(find_common_plan, APP_PRICES) in PLAN_NAMES
+
+
+def bench_sort_by_common_plan(benchmark):
+    def rank():
+        target_plan = find_common_plan(APP_PRICES)
+        return sorted(APP_PRICES, key=lambda item: sort_key_func(item, target_plan))
+
+    ranked = benchmark(rank)
+    assert ranked[-1]["status"] != "ok"
+
+
+def bench_select_best_match(benchmark, steam_checker):
+    best = benchmark(steam_checker._select_best_match, SEARCH_RESULTS, "cyberpunk 2077")
+    assert best["name"] == "Cyberpunk 2077"
@@ -0,0 +1,416 @@
+"""
+缓存层 Redis I/O：RedisCacheManager、RedisMessageDeleteScheduler、RedisStatsManager
+在临时启动的本地 redis-server 上运行（随机端口、不落盘，结束后关闭）；设置 BENCH_REDIS_URL
+（如 redis://127.0.0.1:6379/15）则改用该实例，运行前后会 FLUSHDB。两者都没有时整个模块跳过。
+
+数据规模与生产相近：100 KB 的价格数据集（Netflix / Spotify 等）、5 KB 的 App Store 单国价格记录（含内购）。
+extra_info 记录每次操作的网络往返数（客户端计数）、服务端处理的命令数和相关键的内存占用。
+计时包含每次 run_until_complete 的调度开销（数十微秒），对比改动前后时可忽略。
+"""
+
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import time
+from urllib.parse import urlparse
+
+import pytest
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from utils.redis_cache_manager import RedisCacheManager
+from utils.redis_message_delete_scheduler import RedisMessageDeleteScheduler
+from utils.redis_stats_manager import RedisStatsManager
+
+
+DATASET_COUNT = 50
+DATASET_BYTES = 100 * 1024
+IAP_RECORD_COUNT = 2000
+IAP_RECORD_BYTES = 5 * 1024
+DRAIN_TASKS = 1000
+DRAIN_CHATS = 50
+
+
+class CountingConnection(redis.Connection):
+    """统计发出的请求数：单条命令和整个 pipeline 都只调用一次 send_packed_command"""
+
+    round_trips = 0
+
+    async def send_packed_command(self, command, check_health=True):
+        CountingConnection.round_trips += 1
+        await super().send_packed_command(command, check_health)
+
+
+class _NullBot:
+    """删除总是成功的 Bot 替身，只统计调用次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def delete_messages(self, chat_id, message_ids):
+        self.calls += 1
+        return True
+
+    async def delete_message(self, chat_id, message_id):
+        self.calls += 1
+        return True
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def redis_location():
+    """返回 (host, port, db, password)；优先 BENCH_REDIS_URL，否则启动临时 redis-server"""
+    url = os.getenv("BENCH_REDIS_URL")
+    if url:
+        parsed = urlparse(url)
+        yield parsed.hostname or "127.0.0.1", parsed.port or 6379, int(parsed.path.lstrip("/") or 0), parsed.password
+        return
+
+    server = shutil.which("redis-server")
+    if not server:
+        pytest.skip("未找到 redis-server，也未设置 BENCH_REDIS_URL")
+
+    port = _free_port()
+    process = subprocess.Popen(
+        [server, "--port", str(port), "--bind", "127.0.0.1", "--save", "", "--appendonly", "no"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=0.2):
+            break
+        time.sleep(0.05)
+    else:
+        process.kill()
+        pytest.skip("redis-server 启动超时")
+
+    yield "127.0.0.1", port, 0, None
+    process.terminate()
+    process.wait(timeout=5)
+
+
+@pytest.fixture(scope="module")
+def loop():
+    event_loop = asyncio.new_event_loop()
+    yield event_loop
+    event_loop.close()
+
+
+@pytest.fixture(scope="module")
+def cache_manager(redis_location, loop):
+    host, port, db, password = redis_location
+    manager = RedisCacheManager(host=host, port=port, db=db, password=password)
+    # 连接池尚未建立连接，替换连接类即可统计往返次数
+    manager.pool.connection_class = CountingConnection
+    try:
+        loop.run_until_complete(manager.connect())
+    except RedisError as e:
+        pytest.skip(f"无法连接 Redis: {e}")
+    loop.run_until_complete(manager.redis_client.flushdb())
+    yield manager
+    loop.run_until_complete(manager.redis_client.flushdb())
+    loop.run_until_complete(manager.close())
+
+
+@pytest.fixture(scope="module")
+def client(cache_manager):
+    return cache_manager.redis_client
+
+
+def _run(loop, coroutine_function):
+    return lambda *args: loop.run_until_complete(coroutine_function(*args))
+
+
+async def _commands_processed(client) -> int:
+    return (await client.info("stats"))["total_commands_processed"]
+
+
+def measure_io(loop, client, operation, repeat: int = 20, setup=None) -> dict:
+    """
+    测量一次操作的平均网络往返数和服务端命令数（setup 不计入）
+
+    服务端命令数来自 INFO 的 total_commands_processed，Lua 脚本算一条命令。
+    """
+
+    async def run():
+        trips = commands = 0
+        for _ in range(repeat):
+            if setup:
+                await setup()
+            before = await _commands_processed(client)
+            start_trips = CountingConnection.round_trips
+            await operation()
+            trips += CountingConnection.round_trips - start_trips
+            # 减去 before 那次 INFO 本身
+            commands += await _commands_processed(client) - before - 1
+        return {"round_trips_per_op": round(trips / repeat, 2), "server_commands_per_op": round(commands / repeat, 2)}
+
+    return loop.run_until_complete(run())
+
+
+async def _memory_kib(client, pattern: str) -> float:
+    """匹配 pattern 的全部键的内存占用（MEMORY USAGE 之和）"""
+    total = 0
+    async for key in client.scan_iter(match=pattern, count=1000):
+        total += await client.memory_usage(key) or 0
+    return round(total / 1024, 1)
+
+
+def _price_dataset(seed: int) -> dict:
+    """约 100 KB 的多国家价格数据集，结构与 PriceQueryService 缓存的数据相同"""
+    rng = random.Random(seed)
+    data = {}
+    while len(json.dumps(data, ensure_ascii=False)) < DATASET_BYTES:
+        country = f"{rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}{rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ')}{len(data)}"
+        data[country] = {
+            "country_name": f"国家 {country}",
+            "currency": rng.choice(["USD", "EUR", "TRY", "NGN", "JPY", "INR"]),
+            "plans": [
+                {
+                    "name": name,
+                    "price": f"{rng.uniform(1, 2000):,.2f}",
+                    "price_cny": round(rng.uniform(5, 150), 2),
+                    "description": "含广告 · 1080p · 2 台设备同时观看",
+                }
+                for name in ("Basic", "Standard with ads", "Standard", "Premium")
+            ],
+        }
+    return data
+
+
+def _iap_record(seed: int) -> dict:
+    """约 5 KB 的 App Store 单国价格记录，结构与 get_app_prices 缓存的数据相同"""
+    rng = random.Random(seed)
+    record = {
+        "country_code": "TR",
+        "country_name": "土耳其",
+        "flag_emoji": "🇹🇷",
+        "status": "ok",
+        "app_price_str": "Ücretsiz",
+        "app_price_cny": 0,
+        "in_app_purchases": [],
+        "real_app_name": f"Benchmark App {seed}",
+    }
+    while len(json.dumps(record, ensure_ascii=False)) < IAP_RECORD_BYTES:
+        record["in_app_purchases"].append(
+            {
+                "name": f"Premium Subscription {len(record['in_app_purchases'])} · 12 Ay",
+                "price_str": f"{rng.uniform(10, 5000):,.2f} TL",
+                "cny_price": round(rng.uniform(1, 800), 2),
+            }
+        )
+    return record
+
+
+@pytest.fixture(scope="module")
+def populated(cache_manager, client, loop):
+    """写入生产规模的键空间：DATASET_COUNT 个数据集、IAP_RECORD_COUNT 条 App Store 记录"""
+
+    async def populate():
+        for i in range(DATASET_COUNT):
+            await cache_manager.save_cache(f"dataset_{i}_prices", _price_dataset(i), subdirectory="netflix")
+        record = _iap_record(0)
+        async with client.pipeline(transaction=False) as pipe:
+            for i in range(IAP_RECORD_COUNT):
+                cache_key = cache_manager._get_cache_key(f"app_prices_{i}_TR", "app_store")
+                pipe.setex(cache_key, 3600, json.dumps({"timestamp": time.time(), "data": record}, ensure_ascii=False))
+            await pipe.execute()
+        return {
+            "datasets_kib": await _memory_kib(client, "cache:netflix:*"),
+            "iap_records_kib": await _memory_kib(client, "cache:app_store:*"),
+            "used_memory_kib": round((await client.info("memory"))["used_memory"] / 1024, 1),
+        }
+
+    return loop.run_until_complete(populate())
+
+
+def _record_memory(benchmark, memory: dict):
+    benchmark.extra_info.update(memory)
+
+
+# RedisCacheManager
+
+
+def bench_save_dataset(benchmark, cache_manager, client, loop, populated):
+    data = _price_dataset(1)
+    keys = itertools.cycle(range(DATASET_COUNT))
+    save = _run(loop, lambda: cache_manager.save_cache(f"dataset_{next(keys)}_prices", data, subdirectory="netflix"))
+
+    benchmark.extra_info.update(measure_io(loop, client, lambda: cache_manager.save_cache("io", data, "netflix")))
+    _record_memory(benchmark, populated)
+    benchmark(save)
+
+
+def bench_load_dataset(benchmark, cache_manager, client, loop, populated):
+    keys = itertools.cycle(range(DATASET_COUNT))
+    load = _run(loop, lambda: cache_manager.load_cache(f"dataset_{next(keys)}_prices", 3600, subdirectory="netflix"))
+
+    benchmark.extra_info.update(
+        measure_io(loop, client, lambda: cache_manager.load_cache("dataset_0_prices", 3600, "netflix"))
+    )
+    _record_memory(benchmark, populated)
+    result = benchmark(load)
+    assert len(json.dumps(result, ensure_ascii=False)) >= DATASET_BYTES
+
+
+def bench_save_iap_record(benchmark, cache_manager, client, loop, populated):
+    record = _iap_record(1)
+    keys = itertools.cycle(range(IAP_RECORD_COUNT))
+    save = _run(loop, lambda: cache_manager.save_cache(f"app_prices_{next(keys)}_TR", record, subdirectory="app_store"))
+
+    benchmark.extra_info.update(measure_io(loop, client, lambda: cache_manager.save_cache("io", record, "app_store")))
+    _record_memory(benchmark, populated)
+    benchmark(save)
+
+
+def bench_load_iap_record(benchmark, cache_manager, client, loop, populated):
+    keys = itertools.cycle(range(IAP_RECORD_COUNT))
+    load = _run(loop, lambda: cache_manager.load_cache(f"app_prices_{next(keys)}_TR", 3600, subdirectory="app_store"))
+
+    benchmark.extra_info.update(
+        measure_io(loop, client, lambda: cache_manager.load_cache("app_prices_0_TR", 3600, "app_store"))
+    )
+    _record_memory(benchmark, populated)
+    result = benchmark(load)
+    assert result["in_app_purchases"]
+
+
+def bench_load_miss(benchmark, cache_manager, client, loop, populated):
+    load = _run(loop, lambda: cache_manager.load_cache("missing", 3600, subdirectory="app_store"))
+
+    benchmark.extra_info.update(
+        measure_io(loop, client, lambda: cache_manager.load_cache("missing", 3600, "app_store"))
+    )
+    assert benchmark(load) is None
+
+
+def bench_clear_cache_key(benchmark, cache_manager, client, loop, populated):
+    record = _iap_record(2)
+
+    async def setup():
+        await cache_manager.save_cache("clear_me", record, subdirectory="app_store")
+
+    async def clear():
+        await cache_manager.clear_cache(key="clear_me", subdirectory="app_store")
+
+    benchmark.extra_info.update(measure_io(loop, client, clear, setup=setup))
+    benchmark.pedantic(_run(loop, clear), setup=_run(loop, setup), rounds=200)
+
+
+def bench_clear_cache_subdirectory(benchmark, cache_manager, client, loop, populated):
+    # SCAN 遍历整个键空间（含 populated 写入的数据），往返数随总键数增长
+    record = _iap_record(3)
+    count = 200
+
+    async def setup():
+        async with client.pipeline(transaction=False) as pipe:
+            for i in range(count):
+                pipe.setex(f"cache:steam:game_{i}", 3600, json.dumps({"timestamp": time.time(), "data": record}))
+            await pipe.execute()
+
+    async def clear():
+        await cache_manager.clear_cache(subdirectory="steam")
+
+    benchmark.extra_info.update(measure_io(loop, client, clear, repeat=3, setup=setup))
+    benchmark.extra_info["keys_cleared"] = count
+    benchmark.extra_info["keyspace_size"] = loop.run_until_complete(client.dbsize()) + count
+    benchmark.pedantic(_run(loop, clear), setup=_run(loop, setup), rounds=10)
+    assert loop.run_until_complete(client.exists("cache:steam:game_0")) == 0
+
+
+# RedisMessageDeleteScheduler
+
+
+@pytest.fixture
+def scheduler(client, loop):
+    scheduler = RedisMessageDeleteScheduler(client)
+    scheduler.bot = _NullBot()
+    # 与工作器运行时相同，delay=0 的任务也进入队列；不启动工作器，由基准直接驱动 _process_due_tasks
+    scheduler._running = True
+    yield scheduler
+    loop.run_until_complete(scheduler.clear_all_pending_deletions())
+
+
+def bench_schedule_deletion(benchmark, scheduler, client, loop):
+    message_ids = itertools.count(1)
+    schedule = _run(loop, lambda: scheduler.schedule_deletion(-100123, next(message_ids), 180, session_id="bench"))
+
+    benchmark.extra_info.update(
+        measure_io(loop, client, lambda: scheduler.schedule_deletion(-100123, next(message_ids), 180, "bench"))
+    )
+    benchmark(schedule)
+
+    pending = loop.run_until_complete(scheduler.get_pending_deletions_count())
+    benchmark.extra_info["pending_tasks"] = pending
+    benchmark.extra_info["bytes_per_task"] = round(
+        loop.run_until_complete(_memory_kib(client, "msg:*")) * 1024 / max(pending, 1)
+    )
+
+
+def bench_delete_worker_drain(benchmark, scheduler, client, loop):
+    # 每轮领取并删除 DRAIN_TASKS 条到期消息（分布在 DRAIN_CHATS 个聊天中）
+    message_ids = itertools.count(1)
+
+    async def setup():
+        for i in range(DRAIN_TASKS):
+            await scheduler.schedule_deletion(-100000 - i % DRAIN_CHATS, next(message_ids), 0)
+
+    async def drain():
+        return await scheduler._process_due_tasks()
+
+    io = measure_io(loop, client, drain, repeat=3, setup=setup)
+    benchmark.extra_info["tasks_per_round"] = DRAIN_TASKS
+    benchmark.extra_info["round_trips_per_task"] = round(io["round_trips_per_op"] / DRAIN_TASKS, 3)
+    benchmark.extra_info["server_commands_per_task"] = round(io["server_commands_per_op"] / DRAIN_TASKS, 3)
+
+    processed = benchmark.pedantic(_run(loop, drain), setup=_run(loop, setup), rounds=10)
+    assert processed == DRAIN_TASKS
+    assert loop.run_until_complete(scheduler.get_pending_deletions_count()) == 0
+
+
+# RedisStatsManager
+
+
+@pytest.fixture
+def stats_manager(client, loop):
+    # 不调用 start()：record_command_usage 每次立即写入，与未启用缓冲时的行为相同
+    manager = RedisStatsManager(client, flush_interval=0)
+    yield manager
+    loop.run_until_complete(manager.reset_all_stats())
+
+
+def bench_record_command_usage(benchmark, stats_manager, client, loop):
+    user_ids = itertools.cycle(range(1000))
+    record = _run(loop, lambda: stats_manager.record_command_usage("rate", next(user_ids), -100123, "supergroup"))
+
+    benchmark.extra_info.update(
+        measure_io(loop, client, lambda: stats_manager.record_command_usage("rate", 1, -100123, "supergroup"))
+    )
+    benchmark(record)
+    benchmark.extra_info["stats_kib"] = loop.run_until_complete(_memory_kib(client, "stats:*"))
+
+
+def bench_flush_buffered_usage(benchmark, stats_manager, client, loop):
+    # 启用缓冲后的写入路径：一个刷新周期内 500 次命令（200 个用户）通过一次 pipeline 写入
+    rng = random.Random(1)
+    commands = ["rate", "steam", "app", "nf", "sp", "ds", "aps"]
+
+    async def setup():
+        for _ in range(500):
+            stats_manager._buffer_usage(rng.choice(commands), rng.randrange(200), -100123, "supergroup")
+
+    benchmark.extra_info.update(measure_io(loop, client, stats_manager.flush, repeat=5, setup=setup))
+    benchmark.extra_info["usages_per_flush"] = 500
+    assert benchmark.pedantic(_run(loop, stats_manager.flush), setup=_run(loop, setup), rounds=50)
@@ -0,0 +1,20 @@
+"""SafeMathEvaluator 表达式求值（/rate 的金额表达式）"""
+
+import pytest
+
+from utils.safe_math_evaluator import SafeMathEvaluator
+
+
+EXPRESSIONS = [
+    ("100", 100.0),
+    ("1999*12", 23988.0),
+    ("(59.99+9.99)*1.08", 75.5784),
+    ("max(12, 30) - min(3, 4) / 2", 28.5),
+    ("round(2**10 / 3, 2) + abs(-5) % 3", 343.33),
+]
+
+
+@pytest.mark.parametrize(("expression", "expected"), EXPRESSIONS, ids=[e for e, _ in EXPRESSIONS])
+def bench_eval_expr(expression, expected, benchmark):
+    result = benchmark(SafeMathEvaluator.eval_expr, expression)
+    assert result == pytest.approx(expected)
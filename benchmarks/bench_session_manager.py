@@ -0,0 +1,42 @@
+"""SessionManager 在容量上限附近的写入、读取与淘汰"""
+
+import itertools
+
+import pytest
+
+from utils.session_manager import SessionManager
+
+
+CAPACITY = 1000
+
+
+@pytest.fixture
+def full_manager():
+    manager = SessionManager("bench", max_age=3600, max_sessions=CAPACITY)
+    for user_id in range(CAPACITY):
+        manager.set_session(user_id, {"query": f"q{user_id}", "page": 1})
+    return manager
+
+
+def bench_set_session_at_capacity(benchmark, full_manager):
+    # 每次写入新用户都会触发一次淘汰
+    user_ids = itertools.count(CAPACITY)
+    payload = {"query": "netflix", "page": 2, "results": list(range(20))}
+
+    benchmark(lambda: full_manager.set_session(next(user_ids), payload))
+    assert len(full_manager.sessions) <= CAPACITY
+
+
+def bench_get_session_at_capacity(benchmark, full_manager):
+    user_ids = itertools.cycle(range(CAPACITY))
+
+    result = benchmark(lambda: full_manager.get_session(next(user_ids)))
+    assert result is not None
+
+
+def bench_update_existing_session(benchmark, full_manager):
+    user_ids = itertools.cycle(range(CAPACITY))
+    payload = {"query": "spotify", "page": 3}
+
+    benchmark(lambda: full_manager.set_session(next(user_ids), payload))
+    assert len(full_manager.sessions) == CAPACITY
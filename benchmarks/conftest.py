@@ -0,0 +1,17 @@
+"""
+基准测试公共配置
+把项目根目录加入 sys.path，并为 ConfigManager 提供导入时必需的环境变量（不连接任何外部服务）
+"""
+
+import os
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+os.environ.setdefault("SUPER_ADMIN_ID", "1")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
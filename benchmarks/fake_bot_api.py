@@ -0,0 +1,173 @@
+"""
+本地 Telegram Bot API 替身（ASGI 应用）
+接收 /bot<token>/<方法> 请求，对 sendMessage、editMessageText、sendDocument 等返回合法的 Message，
+对 deleteMessage、answerCallbackQuery、setMyCommands 等返回 True，并按方法统计调用次数。
+可配置固定或随机延迟，模拟真实 Bot API 的往返时间。
+
+用法（在项目根目录执行，需要 uvicorn）:
+    python benchmarks/fake_bot_api.py --port 8901 --latency lognormal:40:0.3
+
+机器人侧通过 Application.builder().base_url("http://127.0.0.1:8901/bot") 使用（loadtest.py 会自动启动并配置）。
+GET /__fake__/stats 返回各方法的调用次数，POST /__fake__/reset 清空统计。
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import parse_qs
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_upstream import parse_latency  # noqa: E402
+
+
+BOT_USER = {
+    "id": 100000001,
+    "is_bot": True,
+    "first_name": "LoadTest",
+    "username": "loadtest_bot",
+    "can_join_groups": True,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": False,
+}
+
+# 返回 Message 的方法；其余方法返回 True
+MESSAGE_METHODS = {
+    "sendmessage",
+    "editmessagetext",
+    "editmessagereplymarkup",
+    "senddocument",
+    "sendphoto",
+    "sendanimation",
+    "sendvideo",
+    "sendaudio",
+}
+
+_MULTIPART_FIELD = re.compile(rb'name="([^"]+)"\r\n\r\n(.*?)\r\n--', re.DOTALL)
+
+
+def _parse_body(content_type: str, body: bytes) -> dict[str, str]:
+    """解析 PTB 发送的表单参数（urlencoded 或 multipart，复杂参数为 JSON 字符串）"""
+    if content_type.startswith("multipart/form-data"):
+        # 文件字段的头部带 filename 和 Content-Type，不会被匹配
+        return {name.decode(): value.decode("utf-8", "replace") for name, value in _MULTIPART_FIELD.findall(body)}
+    if content_type.startswith("application/json"):
+        return {key: value if isinstance(value, str) else json.dumps(value) for key, value in json.loads(body).items()}
+    return {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+
+
+class FakeBotAPI:
+    """Bot API 替身 ASGI 应用"""
+
+    def __init__(self, latency: str = "fixed:0", seed: int | None = None):
+        self.latency = parse_latency(latency)
+        self.rng = random.Random(seed)
+        self.calls: Counter[str] = Counter()
+        self._message_id = 1_000_000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        path = scope["path"]
+        if path == "/__fake__/stats":
+            await self._send(send, dict(self.calls))
+            return
+        if path == "/__fake__/reset":
+            self.calls.clear()
+            await self._send(send, {"ok": True})
+            return
+
+        method = path.rsplit("/", 1)[-1]
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        try:
+            params = _parse_body(headers.get("content-type", ""), body)
+        except (ValueError, UnicodeDecodeError):
+            params = {}
+
+        self.calls[method] += 1
+        await asyncio.sleep(max(0.0, self.latency(self.rng)) / 1000)
+        await self._send(send, {"ok": True, "result": self._result(method, params)})
+
+    def _result(self, method: str, params: dict[str, str]):
+        lowered = method.lower()
+        if lowered == "getme":
+            return BOT_USER
+        if lowered not in MESSAGE_METHODS:
+            return True
+
+        if lowered.startswith("edit") and params.get("message_id"):
+            message_id = int(params["message_id"])
+        else:
+            self._message_id += 1
+            message_id = self._message_id
+
+        chat_id = int(params.get("chat_id", "0") or 0)
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            "from": BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if "reply_markup" in params:
+            try:
+                message["reply_markup"] = json.loads(params["reply_markup"])
+            except ValueError:
+                pass
+        return message
+
+    @staticmethod
+    async def _send(send, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Telegram Bot API 替身")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:MS | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("需要 uvicorn: pip install -r benchmarks/requirements.txt")
+
+    uvicorn.run(FakeBotAPI(args.latency, args.seed), host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,671 @@
+"""
+本地上游替身（ASGI 应用）
+按 commands/*.py 使用的 URL 形式（按 Host 头区分上游）返回响应，用于压测时不访问 Apple、Steam、
+openexchangerates、GitHub 等真实上游。响应来源依次为：
+
+1. benchmarks/corpus/upstream/<主机>/<路径> 下原样保存的响应（可选，用于放置真实数据集快照）
+2. parser_corpus.py 录制的页面（App Store、Steam 捆绑包、iCloud、Apple One、Apple Music）
+3. 按国家生成的合成数据（结构与真实接口一致，价格确定性生成）
+
+可按主机配置延迟分布、429 / 5xx 注入和慢速响应体；200 响应带 ETag 并支持 If-None-Match，
+可用于观察条件请求缓存。机器人侧设置 UPSTREAM_OVERRIDE_URL=http://127.0.0.1:8900 即可把上游请求转发过来。
+
+用法（在项目根目录执行，需要 uvicorn）:
+    python benchmarks/fake_upstream.py --port 8900 --latency lognormal:80:0.5 --error-rate 0.02
+    python benchmarks/fake_upstream.py --profile profile.json --seed 1
+
+profile.json 示例（hosts 中未列出的字段沿用 default）:
+    {"default": {"latency": "uniform:20:60"},
+     "hosts": {"store.steampowered.com": {"latency": "lognormal:300:0.8", "throttle_rate": 0.1}}}
+
+运行期间可通过 /__fake__/ 接口查看和调整（任意 Host）:
+    GET  /__fake__/stats     各主机、状态码的请求数
+    GET  /__fake__/profile   当前故障配置
+    PUT  /__fake__/profile   替换故障配置（请求体同 profile.json）
+    POST /__fake__/reset     清空统计并按 seed 重置随机数
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+import zlib
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field, replace
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import parse_qs
+
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+os.environ.setdefault("SUPER_ADMIN_ID", "1")
+
+from utils.country_data import SUPPORTED_COUNTRIES  # noqa: E402
+
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+RAW_DIR = CORPUS_DIR / "upstream"
+
+# 合成数据使用的汇率（相对 USD），未列出的币种按币种代码确定性生成
+_KNOWN_RATES = {
+    "USD": 1.0, "CNY": 7.2, "EUR": 0.92, "GBP": 0.79, "JPY": 150.0, "KRW": 1350.0, "HKD": 7.8, "TWD": 32.0,
+    "TRY": 32.0, "NGN": 1500.0, "INR": 83.0, "MYR": 4.7, "IDR": 15800.0, "PHP": 56.0, "PKR": 280.0,
+    "EGP": 48.0, "BRL": 5.0, "ARS": 870.0, "RUB": 92.0, "UAH": 39.0, "VND": 25000.0, "THB": 36.0,
+}
+
+
+def _rate(currency: str) -> float:
+    if currency in _KNOWN_RATES:
+        return _KNOWN_RATES[currency]
+    return 0.5 + zlib.crc32(currency.encode()) % 2000 / 10
+
+
+def _country_factor(country: str) -> float:
+    """不同国家的定价差异（0.4-1.2），保证排序类命令有稳定的结果"""
+    return 0.4 + zlib.crc32(country.encode()) % 81 / 100
+
+
+def _local_price(usd: float, country: str) -> tuple[float, str, str]:
+    info = SUPPORTED_COUNTRIES.get(country.upper(), {"currency": "USD", "symbol": "$"})
+    amount = round(usd * _country_factor(country.upper()) * _rate(info["currency"]), 2)
+    return amount, info["currency"], f"{info.get('symbol', '')}{amount:,.2f}"
+
+
+# ---------------------------------------------------------------------------
+# 故障配置
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class FaultProfile:
+    """一个主机的延迟与故障注入配置"""
+
+    # fixed:MS | uniform:MIN_MS:MAX_MS | lognormal:MEDIAN_MS:SIGMA
+    latency: str = "fixed:0"
+    throttle_rate: float = 0.0  # 返回 429 的比例
+    retry_after: int = 1  # 429 响应的 Retry-After（秒）
+    error_rate: float = 0.0  # 返回 500/502/503 的比例
+    slow_body_rate: float = 0.0  # 慢速发送响应体的比例
+    slow_body_kbps: float = 64.0  # 慢速响应体的发送速率（KiB/s）
+
+    def __post_init__(self):
+        self._sampler = parse_latency(self.latency)
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """抽取一次延迟（秒）"""
+        return max(0.0, self._sampler(rng)) / 1000
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(":") if value]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"无法解析延迟分布: {spec}（fixed:MS / uniform:MIN:MAX / lognormal:MEDIAN:SIGMA）")
+
+
+@dataclass
+class UpstreamProfile:
+    """默认故障配置和按主机覆盖的配置"""
+
+    default: FaultProfile = field(default_factory=FaultProfile)
+    hosts: dict[str, FaultProfile] = field(default_factory=dict)
+
+    def for_host(self, host: str) -> FaultProfile:
+        return self.hosts.get(host, self.default)
+
+    @classmethod
+    def from_dict(cls, data: dict, base: FaultProfile | None = None) -> "UpstreamProfile":
+        default = replace(base or FaultProfile(), **data.get("default", {}))
+        hosts = {host.lower(): replace(default, **overrides) for host, overrides in data.get("hosts", {}).items()}
+        return cls(default=default, hosts=hosts)
+
+    def to_dict(self) -> dict:
+        return {
+            "default": self.default.to_dict(),
+            "hosts": {host: profile.to_dict() for host, profile in self.hosts.items()},
+        }
+
+
+# ---------------------------------------------------------------------------
+# 响应生成
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Reply:
+    status: int
+    body: bytes
+    content_type: str = "text/html; charset=utf-8"
+    headers: list[tuple[str, str]] = field(default_factory=list)
+
+
+def _html(text: str) -> Reply:
+    return Reply(200, text.encode("utf-8"))
+
+
+def _json(data) -> Reply:
+    return Reply(200, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+
+def _not_found() -> Reply:
+    return Reply(404, b"Not Found", "text/plain; charset=utf-8")
+
+
+@lru_cache(maxsize=512)
+def _corpus_page(parser: str, name: str) -> str | None:
+    path = CORPUS_DIR / parser / f"{name}.html.gz"
+    if not path.exists():
+        return None
+    return gzip.decompress(path.read_bytes()).decode("utf-8")
+
+
+@lru_cache(maxsize=512)
+def _raw_response(host: str, path: str) -> bytes | None:
+    relative = path.strip("/") or "index"
+    for candidate in (RAW_DIR / host / relative, RAW_DIR / host / f"{relative}.gz"):
+        if candidate.is_file():
+            data = candidate.read_bytes()
+            return gzip.decompress(data) if candidate.suffix == ".gz" else data
+    return None
+
+
+def _query(query: dict[str, list[str]], key: str, default: str = "") -> str:
+    return query.get(key, [default])[0]
+
+
+def _app_store_page(match: re.Match, query) -> Reply:
+    country, app_id = match.group(1).upper(), match.group(2)
+    page = _corpus_page("app_store", f"{app_id}-{country}")
+    if page is not None:
+        return _html(page)
+    if country not in SUPPORTED_COUNTRIES:
+        return _not_found()
+
+    # 奇数 ID 为付费应用，偶数 ID 为免费应用
+    amount, currency, _ = _local_price(4.99, country)
+    offers = {"price": amount, "priceCurrency": currency, "category": "paid"}
+    if not int(app_id) % 2:
+        offers = {"price": 0, "priceCurrency": currency, "category": "free"}
+    ld_json = json.dumps({"@type": "SoftwareApplication", "name": f"Fake App {app_id}", "offers": offers})
+    items = "".join(
+        '<li class="list-with-numbers__item">'
+        f'<span class="truncate-single-line truncate-single-line--block">Pack {i}</span>'
+        f'<span class="list-with-numbers__item__price medium-show-tablecell">{_local_price(usd, country)[2]}</span>'
+        "</li>"
+        for i, usd in enumerate((0.99, 2.99, 4.99, 9.99, 19.99, 49.99, 99.99), 1)
+    )
+    return _html(
+        f'<html><head><script type="application/ld+json">{ld_json}</script></head>'
+        f'<body><ol class="list-with-numbers">{items}</ol></body></html>'
+    )
+
+
+def _itunes_app(app_id: int, name: str, country: str) -> dict:
+    amount, currency, formatted = _local_price(4.99, country)
+    paid = app_id % 2
+    return {
+        "kind": "software",
+        "trackId": app_id,
+        "trackName": name,
+        "artistName": "Fake Developer",
+        "price": amount if paid else 0.0,
+        "formattedPrice": formatted if paid else "Free",
+        "currency": currency,
+        "supportedDevices": ["iPhone15-iPhone15", "iPadPro11M4-iPadPro11M4"],
+        "genres": ["Utilities"],
+        "averageUserRating": 4.5,
+        "userRatingCount": 1000,
+        "trackViewUrl": f"https://apps.apple.com/{country.lower()}/app/id{app_id}",
+    }
+
+
+def _itunes_search(match: re.Match, query) -> Reply:
+    term = _query(query, "term", "app")
+    country = _query(query, "country", "us").upper()
+    limit = min(int(_query(query, "limit", "50") or 50), 200)
+    base = 100000000 + zlib.crc32(term.encode()) % 100000000
+    results = [_itunes_app(base + i, f"{term} {i}" if i else term, country) for i in range(min(limit, 25))]
+    return _json({"resultCount": len(results), "results": results})
+
+
+def _itunes_lookup(match: re.Match, query) -> Reply:
+    app_id = int(_query(query, "id", "0") or 0)
+    country = _query(query, "country", "us").upper()
+    results = [_itunes_app(app_id, f"Fake App {app_id}", country)] if app_id else []
+    return _json({"resultCount": len(results), "results": results})
+
+
+def _steam_price(usd: float, cc: str, discount: int = 0) -> dict:
+    amount, currency, formatted = _local_price(usd, cc)
+    final = round(amount * (100 - discount) / 100, 2)
+    return {
+        "currency": currency,
+        "initial": int(amount * 100),
+        "final": int(final * 100),
+        "discount_percent": discount,
+        "initial_formatted": formatted,
+        "final_formatted": _local_price(usd * (100 - discount) / 100, cc)[2],
+    }
+
+
+def _steam_store_search(match: re.Match, query) -> Reply:
+    term = _query(query, "term", "game")
+    cc = _query(query, "cc", "US").upper()
+    base = 100000 + zlib.crc32(term.encode()) % 900000
+    items = [
+        {"type": "app", "name": f"{term} {suffix}".strip(), "id": base + i, "price": _steam_price(29.99, cc)}
+        for i, suffix in enumerate(("", "Deluxe Edition", "Soundtrack"))
+    ]
+    return _json({"total": len(items), "items": items})
+
+
+def _steam_app_details(match: re.Match, query) -> Reply:
+    app_ids = _query(query, "appids", "0")
+    cc = _query(query, "cc", "US").upper()
+    result = {}
+    for app_id in app_ids.split(","):
+        price = _steam_price(29.99, cc, discount=int(app_id) % 4 * 25 if app_id.isdigit() else 0)
+        result[app_id] = {
+            "success": True,
+            "data": {
+                "type": "game",
+                "name": f"Fake Game {app_id}",
+                "steam_appid": int(app_id) if app_id.isdigit() else 0,
+                "is_free": False,
+                "price_overview": price,
+                "package_groups": [],
+            },
+        }
+    return _json(result)
+
+
+def _steam_search_results(match: re.Match, query) -> Reply:
+    term = _query(query, "term", "bundle")
+    bundle_id = 200 + zlib.crc32(term.encode()) % 50000
+    logo = f"https://shared.akamai.steamstatic.com/store_item_assets/steam/bundles/{bundle_id}/capsule_231x87.jpg"
+    return _json({"desc": "", "items": [{"name": f"{term} Bundle", "logo": logo}]})
+
+
+def _steam_bundle_page(match: re.Match, query) -> Reply:
+    bundle_id = match.group(1)
+    cc = _query(query, "cc", "US").upper()
+    page = _corpus_page("steam_bundle", f"{bundle_id}-{cc}")
+    if page is not None:
+        return _html(page)
+
+    items = "".join(
+        f'<div class="tab_item"><div class="tab_item_name">Fake Game {i}</div>'
+        f'<div class="discount_final_price">{_local_price(usd, cc)[2]}</div></div>'
+        for i, usd in enumerate((9.99, 19.99, 29.99), 1)
+    )
+    return _html(
+        f'<h2 class="pageheader">Fake Bundle {bundle_id}</h2>{items}'
+        '<div class="package_totals_area">'
+        f'<div class="bundle_final_package_price">{_local_price(59.97, cc)[2]}</div>'
+        '<div class="bundle_discount">-20%</div>'
+        f'<div class="bundle_final_price_with_discount">{_local_price(47.98, cc)[2]}</div>'
+        f'<div class="bundle_savings">{_local_price(11.99, cc)[2]}</div>'
+        "</div>\n</div>"
+    )
+
+
+def _apple_country(match: re.Match, cn_site: bool) -> str:
+    if cn_site:
+        return "CN"
+    return (match.group(1) or "us").upper()
+
+
+def _apple_one_page(country: str) -> Reply:
+    page = _corpus_page("apple_one", country)
+    if page is not None:
+        return _html(page)
+    tiles = "".join(
+        f'<div class="plan-tile"><h3 class="typography-plan-headline">{name}</h3>'
+        f'<p class="typography-plan-subhead">{_local_price(usd, country)[2]}/mo.</p><ul>'
+        + "".join(
+            f'<li class="service-item"><span class="visuallyhidden">{service}</span>'
+            f'<span class="cost">{_local_price(service_usd, country)[2]}/mo.</span></li>'
+            for service, service_usd in (("Apple Music", 10.99), ("Apple TV+", 9.99), ("Apple Arcade", 6.99))
+        )
+        + "</ul></div>"
+        for name, usd in (("Individual", 19.95), ("Family", 25.95))
+    )
+    return _html(f"<html><body>{tiles}</body></html>")
+
+
+def _apple_music_page(country: str) -> Reply:
+    page = _corpus_page("apple_music", country)
+    if page is not None:
+        return _html(page)
+    items = "".join(
+        f'<div class="plan-list-item {plan}"><p class="plan-type">{plan.title()}</p>'
+        f'<p class="cost">{_local_price(usd, country)[2]}/month</p></div>'
+        for plan, usd in (("student", 5.99), ("individual", 10.99), ("family", 16.99))
+    )
+    return _html(f'<html><body><section class="section-plans">{items}</section></body></html>')
+
+
+def _apple_service(match: re.Match, query, cn_site: bool = False) -> Reply:
+    country = _apple_country(match, cn_site)
+    if country not in SUPPORTED_COUNTRIES:
+        return _not_found()
+    service = match.group(2).replace("-", "")
+    return _apple_one_page(country) if service == "appleone" else _apple_music_page(country)
+
+
+def _icloud_page(match: re.Match, query) -> Reply:
+    page = _corpus_page("icloud", "all")
+    if page is not None:
+        return _html(page)
+    paragraphs = []
+    for code, info in SUPPORTED_COUNTRIES.items():
+        paragraphs.append(f'<p class="gb-paragraph">{info["name"]}（{info["currency"]}）</p>')
+        for size, usd in (("50GB", 0.99), ("200GB", 2.99), ("2TB", 9.99), ("6TB", 29.99), ("12TB", 59.99)):
+            paragraphs.append(f'<p class="gb-paragraph"><b>{size}：</b>{_local_price(usd, code)[2]}</p>')
+    return _html(f"<html><body>{''.join(paragraphs)}</body></html>")
+
+
+def _exchange_rates(match: re.Match, query) -> Reply:
+    currencies = {info["currency"] for info in SUPPORTED_COUNTRIES.values()} | set(_KNOWN_RATES)
+    return _json(
+        {"timestamp": int(time.time()), "base": "USD", "rates": {code: _rate(code) for code in sorted(currencies)}}
+    )
+
+
+def _netflix_sheet(match: re.Match, query) -> Reply:
+    rows = []
+    for code, info in SUPPORTED_COUNTRIES.items():
+        row = {"Code": code, "Country": code, "Translation": info["name"], "Currency": info["currency"]}
+        for plan, usd_key, usd in (
+            ("Mobile", "MobileUSD", 2.99),
+            ("Standard with ads", "With_Ads_USD", 6.99),
+            ("Basic", "BasicUSD", 9.99),
+            ("Standard", "StandardUSD", 15.49),
+            ("Premium", "PremiumUSD", 22.99),
+        ):
+            amount = _local_price(usd, code)[0]
+            row[plan] = f"{amount:.2f}"
+            row[usd_key] = f"{amount / _rate(info['currency']):.2f}"
+        row["Extra member slots"] = "Standard: 1 / Premium: 2"
+        rows.append(row)
+    return _json(rows)
+
+
+def _spotify_prices(match: re.Match, query) -> Reply:
+    data = {}
+    family = []
+    for code, info in SUPPORTED_COUNTRIES.items():
+        plans = []
+        for plan, usd in (
+            ("Premium Individual", 10.99),
+            ("Premium Student", 5.99),
+            ("Premium Duo", 14.99),
+            ("Premium Family", 16.99),
+        ):
+            amount, currency, formatted = _local_price(usd, code)
+            price_cny = round(amount / _rate(currency) * _KNOWN_RATES["CNY"], 2)
+            plans.append(
+                {"plan": plan, "currency": currency, "price_number": amount, "price": formatted, "price_cny": price_cny}
+            )
+        data[code.lower()] = {
+            "country_code": code,
+            "country_name": code,
+            "country_name_cn": info["name"],
+            "plans": plans,
+        }
+        family.append((plans[-1]["price_cny"], code, info, plans[-1]))
+
+    family.sort(key=lambda item: item[0])
+    data["_top_10_cheapest_premium_family"] = {
+        "updated_at": time.strftime("%Y-%m-%d"),
+        "data": [
+            {
+                "rank": rank,
+                "country_code": code,
+                "country_name_cn": info["name"],
+                "currency": plan["currency"],
+                "price_number": plan["price_number"],
+                "price_cny": plan["price_cny"],
+                "original_price": plan["price"],
+            }
+            for rank, (_price, code, info, plan) in enumerate(family[:10], 1)
+        ],
+    }
+    return _json(data)
+
+
+def _disney_prices(match: re.Match, query) -> Reply:
+    data = {}
+    premium = []
+    for code, info in SUPPORTED_COUNTRIES.items():
+        plans = []
+        for plan, usd in (("Basic", 7.99), ("Standard", 10.99), ("Premium", 15.99)):
+            amount, currency, _ = _local_price(usd, code)
+            monthly_cny = round(amount / _rate(currency) * _KNOWN_RATES["CNY"], 2)
+            plans.append(
+                {
+                    "plan_name": plan,
+                    "currency_code": currency,
+                    "monthly_price_original": f"{amount:.2f}",
+                    "monthly_price_cny": f"{monthly_cny:.2f}",
+                    "annual_price_original": f"{amount * 10:.2f}",
+                    "annual_price_cny": f"{monthly_cny * 10:.2f}",
+                }
+            )
+        data[code] = {"name_cn": info["name"], "plans": plans}
+        premium.append((float(plans[-1]["monthly_price_cny"]), code, info, plans[-1]))
+
+    premium.sort(key=lambda item: item[0])
+    data["_top_10_cheapest_premium_plans"] = {
+        "data": [
+            {
+                "country_code": code,
+                "country_name_cn": info["name"],
+                "price_cny": price,
+                "plan_name": plan["plan_name"],
+                "original_price": plan["monthly_price_original"],
+                "currency": plan["currency_code"],
+            }
+            for price, code, info, plan in premium[:10]
+        ]
+    }
+    return _json(data)
+
+
+# (主机, 路径正则, 处理函数)；路径正则匹配 path，不含查询参数
+ROUTES: list[tuple[str, re.Pattern, Callable[[re.Match, dict], Reply]]] = [
+    ("apps.apple.com", re.compile(r"^/([a-z]{2})/app/(?:[^/]+/)?id(\d+)"), _app_store_page),
+    ("itunes.apple.com", re.compile(r"^/search$"), _itunes_search),
+    ("itunes.apple.com", re.compile(r"^/lookup$"), _itunes_lookup),
+    ("store.steampowered.com", re.compile(r"^/api/storesearch/?$"), _steam_store_search),
+    ("store.steampowered.com", re.compile(r"^/api/appdetails/?$"), _steam_app_details),
+    ("store.steampowered.com", re.compile(r"^/search/results/?$"), _steam_search_results),
+    ("store.steampowered.com", re.compile(r"^/bundle/(\d+)"), _steam_bundle_page),
+    ("support.apple.com", re.compile(r"^/zh-cn/108047"), _icloud_page),
+    ("www.apple.com", re.compile(r"^/(?:([a-z]{2}(?:-[a-z]+)?)/)?(appleone|applemusic|apple-one|apple-music)/?$"),
+     _apple_service),
+    ("www.apple.com.cn", re.compile(r"^/()(apple-one|apple-music)/?$"),
+     lambda match, query: _apple_service(match, query, cn_site=True)),
+    ("openexchangerates.org", re.compile(r"^/api/latest\.json$"), _exchange_rates),
+    ("opensheet.elk.sh", re.compile(r"^/[^/]+/by\+regions$"), _netflix_sheet),
+    ("raw.githubusercontent.com", re.compile(r"spotify_prices.*\.json$"), _spotify_prices),
+    ("git.domob.org", re.compile(r"disneyplus_prices.*\.json$"), _disney_prices),
+]
+
+
+def route(host: str, path: str, query: dict[str, list[str]]) -> Reply:
+    """按主机和路径生成响应"""
+    raw = _raw_response(host, path)
+    if raw is not None:
+        content_type = "application/json; charset=utf-8" if raw[:1] in (b"{", b"[") else "text/html; charset=utf-8"
+        return Reply(200, raw, content_type)
+
+    for route_host, pattern, handler in ROUTES:
+        if route_host != host:
+            continue
+        match = pattern.search(path)
+        if match:
+            return handler(match, query)
+    return _not_found()
+
+
+# ---------------------------------------------------------------------------
+# ASGI 应用
+# ---------------------------------------------------------------------------
+
+
+class FakeUpstream:
+    """上游替身 ASGI 应用"""
+
+    def __init__(self, profile: UpstreamProfile | None = None, seed: int | None = None):
+        self.profile = profile or UpstreamProfile()
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.stats: Counter[tuple[str, int]] = Counter()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        host = headers.get("host", "").split(":")[0].lower()
+        path = scope["path"]
+
+        if path.startswith("/__fake__/"):
+            await self._send(send, await self._admin(scope, receive, path))
+            return
+
+        faults = self.profile.for_host(host)
+        await asyncio.sleep(faults.sample_latency(self.rng))
+
+        roll = self.rng.random()
+        if roll < faults.throttle_rate:
+            reply = Reply(429, b"Too Many Requests", "text/plain", [("retry-after", str(faults.retry_after))])
+        elif roll < faults.throttle_rate + faults.error_rate:
+            status = self.rng.choice((500, 502, 503))
+            reply = Reply(status, f"Injected {status}".encode(), "text/plain")
+        else:
+            reply = route(host, path, parse_qs(scope["query_string"].decode("latin-1")))
+            if reply.status == 200:
+                etag = '"' + hashlib.sha1(reply.body).hexdigest()[:16] + '"'
+                if headers.get("if-none-match") == etag:
+                    reply = Reply(304, b"", reply.content_type)
+                reply.headers.append(("etag", etag))
+
+        self.stats[(host, reply.status)] += 1
+        slow_kbps = faults.slow_body_kbps if self.rng.random() < faults.slow_body_rate else None
+        await self._send(send, reply, slow_kbps)
+
+    async def _admin(self, scope, receive, path: str) -> Reply:
+        method = scope["method"]
+        if path == "/__fake__/stats":
+            by_host: dict[str, dict[str, int]] = {}
+            for (host, status), count in sorted(self.stats.items()):
+                by_host.setdefault(host, {})[str(status)] = count
+            return _json(by_host)
+        if path == "/__fake__/profile" and method == "GET":
+            return _json(self.profile.to_dict())
+        if path == "/__fake__/profile" and method in ("PUT", "POST"):
+            body = b""
+            while True:
+                message = await receive()
+                body += message.get("body", b"")
+                if not message.get("more_body"):
+                    break
+            try:
+                self.profile = UpstreamProfile.from_dict(json.loads(body or b"{}"))
+            except (TypeError, ValueError) as e:
+                return Reply(400, str(e).encode(), "text/plain; charset=utf-8")
+            return _json(self.profile.to_dict())
+        if path == "/__fake__/reset" and method == "POST":
+            self.stats.clear()
+            self.rng = random.Random(self.seed)
+            return _json({"ok": True})
+        return _not_found()
+
+    @staticmethod
+    async def _send(send, reply: Reply, slow_kbps: float | None = None):
+        headers = [
+            (b"content-type", reply.content_type.encode()),
+            (b"content-length", str(len(reply.body)).encode()),
+        ] + [(key.encode(), value.encode()) for key, value in reply.headers]
+        await send({"type": "http.response.start", "status": reply.status, "headers": headers})
+
+        if not slow_kbps or not reply.body:
+            await send({"type": "http.response.body", "body": reply.body})
+            return
+
+        # 慢速响应体：响应头发出后按设定速率分块发送（每块之前等待，小响应体同样会变慢）
+        chunk_size = 1024
+        delay = chunk_size / (slow_kbps * 1024)
+        for offset in range(0, len(reply.body), chunk_size):
+            await asyncio.sleep(delay)
+            more = offset + chunk_size < len(reply.body)
+            await send({"type": "http.response.body", "body": reply.body[offset : offset + chunk_size], "more_body": more})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地上游替身（延迟、429/5xx、慢速响应体注入）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", default="fixed:0", help="fixed:MS | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回 429 的比例")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 响应的 Retry-After（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 500/502/503 的比例")
+    parser.add_argument("--slow-body-rate", type=float, default=0.0, help="慢速发送响应体的比例")
+    parser.add_argument("--slow-body-kbps", type=float, default=64.0, help="慢速响应体速率（KiB/s）")
+    parser.add_argument("--profile", help="按主机配置的 JSON 文件，命令行参数作为其 default 的基础值")
+    parser.add_argument("--seed", type=int, help="随机数种子（故障注入和延迟可复现）")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("需要 uvicorn: pip install -r benchmarks/requirements.txt")
+
+    base = FaultProfile(
+        latency=args.latency,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        error_rate=args.error_rate,
+        slow_body_rate=args.slow_body_rate,
+        slow_body_kbps=args.slow_body_kbps,
+    )
+    profile = UpstreamProfile(default=base)
+    if args.profile:
+        profile = UpstreamProfile.from_dict(json.loads(Path(args.profile).read_text(encoding="utf-8")), base)
+
+    app = FakeUpstream(profile, seed=args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
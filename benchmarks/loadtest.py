@@ -0,0 +1,397 @@
+"""
+端到端吞吐压测
+在本进程内按 main.py 的方式初始化完整的 Application（本地 Redis、MySQL），把合成的命令 Update
+放入 update_queue（与 webhook 收到更新后的路径相同），在受控并发下测量单副本的处理能力。
+Telegram Bot API 和各上游分别由 fake_bot_api.py、fake_upstream.py 替代（默认自动以子进程启动）。
+
+报告：每秒完成的更新数、各命令的端到端延迟分位数（入队到处理完成）、处理耗时，
+以及每条命令平均产生的 Bot API 调用（send / edit / delete 等，自动删除按消息归属到原命令）。
+
+用法（在项目根目录执行，需要本地 Redis 和 MySQL，连接参数读取 .env / 环境变量）:
+    python benchmarks/loadtest.py --concurrency 20 --duration 60
+    python benchmarks/loadtest.py --mix rate=5,steam=2,nf=1 --concurrent-updates 16 --json result.json
+    python benchmarks/loadtest.py --upstream-args "--latency lognormal:200:0.6 --error-rate 0.05"
+
+注意：压测会写入 Redis 缓存和 MySQL 白名单（合成用户 ID 从 --user-base 开始），建议使用独立的 Redis DB 和数据库。
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+
+# 压测使用的命令及参数模板；{game} / {app} 从下面的列表中随机选取，制造真实的缓存命中比例
+SCENARIOS = {
+    "rate": ["/rate", "/rate USD", "/rate USD JPY 50", "/rate EUR 1+1*2", "/rate TRY CNY 1000"],
+    "steam": ["/steam {game}", "/steam {game} TR US", "/steam {game} JP"],
+    "steamb": ["/steamb {game}"],
+    "app": ["/app {app}"],
+    "nf": ["/nf", "/nf US TR"],
+    "sp": ["/sp", "/sp NG"],
+    "ds": ["/ds", "/ds TR"],
+    "aps": ["/aps iCloud", "/aps AppleMusic TR JP", "/aps AppleOne US"],
+}
+DEFAULT_MIX = "rate=4,steam=2,app=2,nf=1,sp=1,ds=1,aps=1"
+
+GAMES = ["elden ring", "cyberpunk 2077", "hades", "stardew valley", "portal 2", "terraria", "baldurs gate 3", "celeste"]
+APPS = ["tiktok", "youtube", "minecraft", "notion", "spotify", "procreate", "goodnotes", "lightroom"]
+
+# 当前正在处理的更新对应的命令（Bot API 调用按此归属）
+_current_command: ContextVar[str | None] = ContextVar("loadtest_command", default=None)
+
+
+def _percentile(samples: list[float], quantile: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+
+class Recorder:
+    """记录每条更新的耗时和 Bot API 调用"""
+
+    def __init__(self):
+        self.enqueued: dict[int, float] = {}
+        self.started: dict[int, float] = {}
+        self.commands: dict[int, str] = {}
+        self.waiters: dict[int, asyncio.Future] = {}
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.handling: dict[str, list[float]] = defaultdict(list)
+        self.api_calls: dict[str, Counter[str]] = defaultdict(Counter)
+        self.error_replies: Counter[str] = Counter()
+        # (chat_id, message_id) -> 命令，用于把之后的自动删除归属到原命令
+        self.message_owner: dict[tuple[int, int], str] = {}
+        self.recording = False
+
+    def record_api_call(self, endpoint: str, params: dict, payload: bytes):
+        command = _current_command.get()
+        chat_id = params.get("chat_id")
+        if command is None and endpoint == "deleteMessage":
+            command = self.message_owner.get((int(chat_id or 0), int(params.get("message_id") or 0)))
+        command = command or "(background)"
+
+        if self.recording:
+            self.api_calls[command][endpoint] += 1
+            text = params.get("text") or ""
+            if endpoint == "sendMessage" and text.startswith("❌"):
+                self.error_replies[command] += 1
+
+        if command != "(background)" and endpoint.startswith("send"):
+            try:
+                result = json.loads(payload).get("result") or {}
+                self.message_owner[(int(chat_id), int(result["message_id"]))] = command
+            except (ValueError, KeyError, TypeError):
+                pass
+
+
+def _build_application_class(recorder: Recorder):
+    from telegram.ext import Application
+
+    class TimedApplication(Application):
+        """记录每条更新的处理起止时间，并在处理期间设置当前命令"""
+
+        async def process_update(self, update):
+            update_id = update.update_id
+            command = recorder.commands.get(update_id)
+            recorder.started[update_id] = time.perf_counter()
+            token = _current_command.set(command)
+            try:
+                await super().process_update(update)
+            finally:
+                _current_command.reset(token)
+                waiter = recorder.waiters.pop(update_id, None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(time.perf_counter())
+
+    return TimedApplication
+
+
+def _build_request_class(recorder: Recorder):
+    from utils.message_manager import TracedHTTPXRequest
+
+    class RecordingHTTPXRequest(TracedHTTPXRequest):
+        """在 TracedHTTPXRequest 之上记录每次 Bot API 调用所属的命令"""
+
+        async def do_request(self, url: str, method: str, request_data=None, **kwargs) -> tuple[int, bytes]:
+            status, payload = await super().do_request(url, method, request_data, **kwargs)
+            params = request_data.parameters if request_data else {}
+            recorder.record_api_call(url.rsplit("/", 1)[-1], params, payload)
+            return status, payload
+
+    return RecordingHTTPXRequest
+
+
+def _wait_for_port(port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=0.5):
+            return
+        time.sleep(0.1)
+    raise RuntimeError(f"端口 {port} 在 {timeout:.0f}s 内未就绪")
+
+
+def _start_service(script: str, port: int, extra_args: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, str(BENCH_DIR / script), "--port", str(port), *shlex.split(extra_args)], cwd=ROOT
+    )
+    try:
+        _wait_for_port(port)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process
+
+
+def _parse_mix(mix: str) -> tuple[list[str], list[float]]:
+    names, weights = [], []
+    for item in mix.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"未知命令 {name}，可选: {', '.join(SCENARIOS)}")
+        names.append(name)
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+class LoadGenerator:
+    """闭环负载：每个虚拟用户发出一条命令，等待处理完成后再发下一条"""
+
+    def __init__(self, application, recorder: Recorder, args):
+        self.application = application
+        self.recorder = recorder
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.names, self.weights = _parse_mix(args.mix)
+        self.user_ids = [args.user_base + i for i in range(args.users)]
+        self._update_id = 0
+        self._message_id = 0
+        self.completed = 0
+
+    def _next_update(self):
+        from telegram import Update
+
+        command = self.rng.choices(self.names, self.weights)[0]
+        text = self.rng.choice(SCENARIOS[command]).format(game=self.rng.choice(GAMES), app=self.rng.choice(APPS))
+        user_id = self.rng.choice(self.user_ids)
+        self._update_id += 1
+        self._message_id += 1
+        entity_length = len(text.split(" ", 1)[0])
+        data = {
+            "update_id": self._update_id,
+            "message": {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private", "first_name": "Load"},
+                "from": {"id": user_id, "is_bot": False, "first_name": "Load", "username": f"load{user_id}"},
+                "text": text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": entity_length}],
+            },
+        }
+        self.recorder.message_owner[(user_id, self._message_id)] = command
+        return command, Update.de_json(data, self.application.bot)
+
+    async def _user(self, deadline: float):
+        loop = asyncio.get_running_loop()
+        while time.perf_counter() < deadline:
+            command, update = self._next_update()
+            waiter = loop.create_future()
+            self.recorder.commands[update.update_id] = command
+            self.recorder.waiters[update.update_id] = waiter
+
+            enqueued = time.perf_counter()
+            await self.application.update_queue.put(update)
+            try:
+                finished = await asyncio.wait_for(waiter, timeout=self.args.timeout)
+            except asyncio.TimeoutError:
+                finished = None
+
+            if self.recorder.recording:
+                if finished is None:
+                    self.recorder.error_replies[command] += 1
+                    continue
+                self.recorder.latency[command].append(finished - enqueued)
+                started = self.recorder.started.get(update.update_id, enqueued)
+                self.recorder.handling[command].append(finished - started)
+                self.completed += 1
+
+    async def run(self, seconds: float):
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(self._user(deadline) for _ in range(self.args.concurrency)))
+
+
+def _report(recorder: Recorder, elapsed: float, completed: int, args) -> dict:
+    commands = sorted(recorder.latency)
+    rows = {}
+    for command in commands:
+        latency = recorder.latency[command]
+        handling = recorder.handling[command]
+        count = len(latency)
+        rows[command] = {
+            "count": count,
+            "p50_ms": _percentile(latency, 0.50) * 1000,
+            "p95_ms": _percentile(latency, 0.95) * 1000,
+            "p99_ms": _percentile(latency, 0.99) * 1000,
+            "max_ms": max(latency) * 1000,
+            "handling_p50_ms": _percentile(handling, 0.50) * 1000,
+            "error_replies": recorder.error_replies.get(command, 0),
+            "api_calls_per_command": {
+                endpoint: round(calls / count, 2) for endpoint, calls in sorted(recorder.api_calls[command].items())
+            },
+        }
+
+    all_latency = [value for command in commands for value in recorder.latency[command]]
+    summary = {
+        "concurrency": args.concurrency,
+        "concurrent_updates": args.concurrent_updates,
+        "duration_s": round(elapsed, 1),
+        "completed": completed,
+        "updates_per_second": round(completed / elapsed, 2) if elapsed else 0,
+        "p50_ms": _percentile(all_latency, 0.50) * 1000,
+        "p95_ms": _percentile(all_latency, 0.95) * 1000,
+        "p99_ms": _percentile(all_latency, 0.99) * 1000,
+        "commands": rows,
+        "background_api_calls": dict(recorder.api_calls.get("(background)", {})),
+    }
+
+    print()
+    print(
+        f"并发 {args.concurrency} · concurrent_updates={args.concurrent_updates} · {elapsed:.1f}s · "
+        f"完成 {completed} 条 · {summary['updates_per_second']} 条/秒 · "
+        f"p50 {summary['p50_ms']:.0f}ms · p95 {summary['p95_ms']:.0f}ms · p99 {summary['p99_ms']:.0f}ms"
+    )
+    print()
+    print(f"{'command':<10}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'handle':>9}{'err':>6}  Bot API calls / command")
+    for command, row in rows.items():
+        calls = " ".join(f"{endpoint}={value}" for endpoint, value in row["api_calls_per_command"].items())
+        print(
+            f"{command:<10}{row['count']:>7}{row['p50_ms']:>8.0f}ms{row['p95_ms']:>7.0f}ms{row['p99_ms']:>7.0f}ms"
+            f"{row['max_ms']:>7.0f}ms{row['handling_p50_ms']:>7.0f}ms{row['error_replies']:>6}  {calls}"
+        )
+    if summary["background_api_calls"]:
+        print(f"\n无法归属到命令的 Bot API 调用: {summary['background_api_calls']}")
+    return summary
+
+
+async def _run(args) -> dict:
+    import main as bot_main
+    from telegram.ext import Application
+
+    recorder = Recorder()
+    config = bot_main.config
+
+    builder = (
+        Application.builder()
+        .application_class(_build_application_class(recorder))
+        .token(config.bot_token)
+        .base_url(f"http://127.0.0.1:{args.bot_api_port}/bot")
+        .base_file_url(f"http://127.0.0.1:{args.bot_api_port}/file/bot")
+        .request(_build_request_class(recorder)(connection_pool_size=256))
+    )
+    if args.concurrent_updates:
+        builder = builder.concurrent_updates(args.concurrent_updates)
+    application = builder.build()
+
+    await application.initialize()
+    await bot_main.setup_application(application, config)
+
+    # 合成用户加入白名单，走与真实用户相同的权限检查
+    user_manager = application.bot_data["user_cache_manager"]
+    for user_id in range(args.user_base, args.user_base + args.users):
+        await user_manager.add_to_whitelist(user_id, int(config.super_admin_id))
+
+    await application.start()
+    generator = LoadGenerator(application, recorder, args)
+    try:
+        if args.warmup:
+            print(f"预热 {args.warmup}s ...")
+            await generator.run(args.warmup)
+
+        print(f"压测 {args.duration}s，并发 {args.concurrency} ...")
+        recorder.recording = True
+        start = time.perf_counter()
+        await generator.run(args.duration)
+        elapsed = time.perf_counter() - start
+
+        # 等待自动删除执行完，使 delete 调用计入对应命令
+        if args.drain:
+            print(f"等待 {args.drain}s 让自动删除执行完 ...")
+            await asyncio.sleep(args.drain)
+        recorder.recording = False
+    finally:
+        await application.stop()
+        await bot_main.cleanup_application(application)
+        await application.shutdown()
+
+    return _report(recorder, elapsed, generator.completed, args)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="端到端吞吐压测（fake Bot API + fake upstream + 本地 Redis/MySQL）")
+    parser.add_argument("--concurrency", type=int, default=10, help="同时在等待回复的虚拟用户数")
+    parser.add_argument("--duration", type=float, default=30, help="计入统计的压测时长（秒）")
+    parser.add_argument("--warmup", type=float, default=5, help="不计入统计的预热时长（秒）")
+    parser.add_argument("--drain", type=float, default=3, help="压测结束后等待自动删除的时长（秒）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"命令权重，可选: {', '.join(SCENARIOS)}")
+    parser.add_argument("--users", type=int, default=50, help="合成用户数")
+    parser.add_argument("--user-base", type=int, default=900_000_000, help="合成用户 ID 起始值")
+    parser.add_argument("--concurrent-updates", type=int, default=0, help="Application 并发处理更新数，0 同生产配置")
+    parser.add_argument("--timeout", type=float, default=60, help="单条更新的最长等待时间（秒）")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--bot-api-port", type=int, default=8901)
+    parser.add_argument("--bot-api-args", default="--latency lognormal:40:0.3", help="传给 fake_bot_api.py 的参数")
+    parser.add_argument("--upstream-port", type=int, default=8900)
+    parser.add_argument("--upstream-args", default="--latency lognormal:80:0.5", help="传给 fake_upstream.py 的参数")
+    parser.add_argument("--no-spawn", action="store_true", help="不启动替身服务（已在对应端口手动运行）")
+    parser.add_argument("--keep-rate-limit", action="store_true", help="保留速率限制（默认关闭，避免合成用户被限流）")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    # 必须在导入 main / config_manager 之前设置：上游转发、短删除延迟、关闭与压测无关的组件
+    os.chdir(ROOT)
+    sys.path.insert(0, str(ROOT))
+    os.environ["UPSTREAM_OVERRIDE_URL"] = f"http://127.0.0.1:{args.upstream_port}"
+    # DEFAULT_MESSAGE_DELETE_DELAY 优先于 AUTO_DELETE_DELAY，两个都覆盖
+    os.environ["DEFAULT_MESSAGE_DELETE_DELAY"] = os.environ["AUTO_DELETE_DELAY"] = "1"
+    os.environ["USER_COMMAND_DELETE_DELAY"] = "0"
+    os.environ["METRICS_ENABLED"] = "false"
+    os.environ["LOAD_CUSTOM_SCRIPTS"] = "false"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("BOT_TOKEN", "123456:loadtest")
+    os.environ.setdefault("SUPER_ADMIN_ID", "1")
+    os.environ.setdefault("EXCHANGE_RATE_API_KEYS", "loadtest")
+    if not args.keep_rate_limit:
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    services = []
+    try:
+        if not args.no_spawn:
+            services.append(_start_service("fake_upstream.py", args.upstream_port, args.upstream_args))
+            services.append(_start_service("fake_bot_api.py", args.bot_api_port, args.bot_api_args))
+        summary = asyncio.run(_run(args))
+    finally:
+        for process in services:
+            process.terminate()
+            with contextlib.suppress(subprocess.TimeoutExpired):
+                process.wait(timeout=5)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
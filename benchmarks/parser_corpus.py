@@ -0,0 +1,290 @@
+"""
+解析器离线语料库
+把 App Store、Steam 捆绑包、iCloud、Apple One、Apple Music 的真实页面按国家录制为 gzip 文件，
+并保存录制时解析器的输出作为期望快照。bench_parsers.py 回放这些页面测量吞吐和内存分配，
+同时与快照比对：Apple / Steam 改版导致解析结果变化时基准会失败。
+
+用法（在项目根目录执行）:
+    python benchmarks/parser_corpus.py record [--parsers app_store,icloud] [--countries US,TR]
+    python benchmarks/parser_corpus.py replay [--rounds 20]
+    python benchmarks/parser_corpus.py snapshot     # 确认解析变化符合预期后，用当前解析器重写快照
+
+目录结构: benchmarks/corpus/<解析器>/<名称>.html.gz 与同名 .json（url、国家、录制时间、期望输出）
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("BOT_TOKEN", "123456:benchmark")
+os.environ.setdefault("SUPER_ADMIN_ID", "1")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from commands.app_store import parse_app_page  # noqa: E402
+from commands.apple_services import (  # noqa: E402
+    get_icloud_prices_from_html,
+    parse_apple_music_plans,
+    parse_apple_one_plans,
+)
+from commands.steam import SteamPriceChecker  # noqa: E402
+
+
+CORPUS_DIR = Path(__file__).resolve().parent / "corpus"
+
+# 默认录制的国家：覆盖常见币种格式（千分位、小数逗号、前后缀符号、无小数货币）
+DEFAULT_COUNTRIES = ["US", "CN", "JP", "KR", "HK", "TW", "TR", "NG", "IN", "MY", "ID", "PH", "PK", "EG", "BR", "DE", "GB"]
+# 默认录制的 App Store 应用：YouTube（免费 + 内购）、Minecraft（付费 + 内购）
+DEFAULT_APP_IDS = ["544007664", "479516143"]
+# 默认录制的 Steam 捆绑包：Valve Complete Pack
+DEFAULT_BUNDLE_IDS = ["232"]
+
+STEAM_HEADERS = {
+    "Accept-Language": "zh-CN,zh;q=0.9",
+    "Cookie": "birthtime=946656001; lastagecheckage=1-January-2000",
+}
+
+
+def _apple_service_url(service: str, country: str) -> str:
+    """与 /aps 命令相同的 URL 规则"""
+    if country == "US":
+        return f"https://www.apple.com/{service}/"
+    if country == "CN":
+        return "https://www.apple.com.cn/apple-one/" if service == "appleone" else "https://www.apple.com.cn/apple-music/"
+    return f"https://www.apple.com/{country.lower()}/{service}/"
+
+
+@dataclass(frozen=True)
+class ParserSpec:
+    """一个被测解析器：解析函数、录制 URL 规则和录制目标"""
+
+    parse: Callable[[str, str], object]
+    url: Callable[[str, str], str]
+    # 录制目标：None 表示每个国家一页；否则为应用 ID / 捆绑包 ID 列表
+    targets: list[str] | None = None
+    # 页面与国家无关（如 iCloud 价格表），只录制一次
+    single_page: bool = False
+    headers: dict[str, str] | None = None
+
+
+PARSERS: dict[str, ParserSpec] = {
+    "app_store": ParserSpec(
+        parse=lambda content, country: parse_app_page(content),
+        url=lambda target, country: f"https://apps.apple.com/{country.lower()}/app/id{target}",
+        targets=DEFAULT_APP_IDS,
+    ),
+    "steam_bundle": ParserSpec(
+        parse=lambda content, country: SteamPriceChecker.parse_bundle_page(content),
+        url=lambda target, country: f"https://store.steampowered.com/bundle/{target}?cc={country.lower()}&l=schinese",
+        targets=DEFAULT_BUNDLE_IDS,
+        headers=STEAM_HEADERS,
+    ),
+    "icloud": ParserSpec(
+        parse=lambda content, country: get_icloud_prices_from_html(content),
+        url=lambda target, country: "https://support.apple.com/zh-cn/108047",
+        single_page=True,
+    ),
+    "apple_one": ParserSpec(
+        parse=lambda content, country: parse_apple_one_plans(content),
+        url=lambda target, country: _apple_service_url("appleone", country),
+    ),
+    "apple_music": ParserSpec(
+        parse=parse_apple_music_plans,
+        url=lambda target, country: _apple_service_url("applemusic", country),
+    ),
+}
+
+
+def normalize(result) -> object:
+    """把解析结果转换为 JSON 可比较的形式（元组转列表等）"""
+    return json.loads(json.dumps(result, ensure_ascii=False))
+
+
+@dataclass
+class Fixture:
+    """语料库中的一个页面"""
+
+    parser: str
+    name: str
+    country: str
+    url: str
+    content: str
+    expected: object
+
+    @property
+    def id(self) -> str:
+        return f"{self.parser}/{self.name}"
+
+    def parse(self):
+        return PARSERS[self.parser].parse(self.content, self.country)
+
+
+def load_corpus(parsers: list[str] | None = None) -> list[Fixture]:
+    """读取已录制的全部页面（按解析器、名称排序）"""
+    fixtures = []
+    for parser in sorted(parsers or PARSERS):
+        for meta_path in sorted((CORPUS_DIR / parser).glob("*.json")):
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            page_path = meta_path.with_suffix(".html.gz")
+            if not page_path.exists():
+                continue
+            fixtures.append(
+                Fixture(
+                    parser=parser,
+                    name=meta_path.stem,
+                    country=meta["country"],
+                    url=meta["url"],
+                    content=gzip.decompress(page_path.read_bytes()).decode("utf-8"),
+                    expected=meta["expected"],
+                )
+            )
+    return fixtures
+
+
+def measure_allocation(fixture: Fixture) -> int:
+    """解析一页期间 tracemalloc 记录的内存峰值增量（字节）"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        fixture.parse()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+    return peak - baseline
+
+
+def _write_fixture(parser: str, name: str, country: str, url: str, content: str, expected: object):
+    directory = CORPUS_DIR / parser
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f"{name}.html.gz").write_bytes(gzip.compress(content.encode("utf-8"), mtime=0))
+    meta = {
+        "url": url,
+        "country": country,
+        "recorded_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "expected": normalize(expected),
+    }
+    (directory / f"{name}.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+async def record(parsers: list[str], countries: list[str], concurrency: int = 4):
+    """抓取页面并写入语料库（404 的国家/地区跳过）"""
+    import httpx
+
+    jobs = []
+    for parser in parsers:
+        spec = PARSERS[parser]
+        for target in spec.targets or [None]:
+            for country in ["CN"] if spec.single_page else countries:
+                name = country if target is None else f"{target}-{country}"
+                if spec.single_page:
+                    name = "all"
+                jobs.append((parser, spec, name, country, spec.url(target, country)))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 Safari/605.1.15"}
+
+    async with httpx.AsyncClient(follow_redirects=True, timeout=20, headers=headers) as client:
+
+        async def fetch(parser: str, spec: ParserSpec, name: str, country: str, url: str):
+            async with semaphore:
+                try:
+                    response = await client.get(url, headers=spec.headers)
+                except httpx.RequestError as e:
+                    print(f"  ✗ {parser}/{name}: {e}")
+                    return
+            if response.status_code != 200:
+                print(f"  - {parser}/{name}: HTTP {response.status_code}，跳过")
+                return
+            content = response.text
+            _write_fixture(parser, name, country, url, content, spec.parse(content, country))
+            print(f"  ✓ {parser}/{name}: {len(content) / 1024:.0f} KiB")
+
+        await asyncio.gather(*(fetch(*job) for job in jobs))
+
+
+def snapshot(parsers: list[str]):
+    """用当前解析器重新生成期望快照（页面不变）"""
+    for fixture in load_corpus(parsers):
+        meta_path = CORPUS_DIR / fixture.parser / f"{fixture.name}.json"
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        new_expected = normalize(fixture.parse())
+        if new_expected != meta["expected"]:
+            print(f"  ~ {fixture.id}: 快照已更新")
+        meta["expected"] = new_expected
+        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def replay(parsers: list[str], rounds: int):
+    """回放语料库，按解析器汇总吞吐（页/秒）和每页内存峰值，并报告与快照不一致的页面"""
+    fixtures = load_corpus(parsers)
+    if not fixtures:
+        print(f"语料库为空：先运行 python {Path(__file__).name} record")
+        return 1
+
+    mismatches = []
+    print(f"{'parser':<14}{'pages':>6}{'KiB/page':>10}{'pages/s':>10}{'alloc KiB/page':>16}{'max alloc KiB':>15}")
+    for parser in sorted({fixture.parser for fixture in fixtures}):
+        group = [fixture for fixture in fixtures if fixture.parser == parser]
+        mismatches.extend(fixture.id for fixture in group if normalize(fixture.parse()) != fixture.expected)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for fixture in group:
+                fixture.parse()
+        elapsed = time.perf_counter() - start
+
+        allocations = [measure_allocation(fixture) for fixture in group]
+        size = sum(len(fixture.content.encode("utf-8")) for fixture in group) / len(group)
+        print(
+            f"{parser:<14}{len(group):>6}{size / 1024:>10.0f}{rounds * len(group) / elapsed:>10.1f}"
+            f"{sum(allocations) / len(allocations) / 1024:>16.0f}{max(allocations) / 1024:>15.0f}"
+        )
+
+    if mismatches:
+        print(f"\n与快照不一致 ({len(mismatches)}): {', '.join(mismatches)}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="解析器离线语料库：录制、回放、更新快照")
+    parser.add_argument("action", choices=["record", "replay", "snapshot"])
+    parser.add_argument("--parsers", default=",".join(PARSERS), help="逗号分隔，默认全部")
+    parser.add_argument("--countries", default=",".join(DEFAULT_COUNTRIES), help="录制的国家代码，逗号分隔")
+    parser.add_argument("--rounds", type=int, default=20, help="回放轮数")
+    args = parser.parse_args()
+
+    parsers = [name.strip() for name in args.parsers.split(",") if name.strip()]
+    unknown = set(parsers) - set(PARSERS)
+    if unknown:
+        parser.error(f"未知解析器: {', '.join(sorted(unknown))}")
+
+    if args.action == "record":
+        countries = [code.strip().upper() for code in args.countries.split(",") if code.strip()]
+        asyncio.run(record(parsers, countries))
+        return 0
+    if args.action == "snapshot":
+        snapshot(parsers)
+        return 0
+    return replay(parsers, args.rounds)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,7 @@ from utils.command_factory import command_factory
 from utils.config_manager import config_manager, get_config
 from utils.country_data import COUNTRY_NAME_TO_CODE, SUPPORTED_COUNTRIES, get_country_flag
 from utils.formatter import foldable_text_v2, foldable_text_with_markdown_v2
+from utils.http_client import create_custom_client
 from utils.message_manager import (
     cancel_session_deletions,
     send_message_with_auto_delete,
@@ -27,6 +28,7 @@ from utils.message_manager import (
 from utils.permissions import Permission
 from utils.price_parser import extract_currency_and_price
 from utils.session_manager import app_search_sessions as user_search_sessions
+from utils.tracing import span
 
 
 # Configure logging
@@ -80,7 +82,7 @@ class SappSearchAPI:
             包含搜索结果的字典
         """
         try:
-            async with httpx.AsyncClient(verify=False) as client:
+            async with create_custom_client(verify=False) as client:
                 params = {"term": query, "country": country, "media": "software", "limit": limit, "entity": app_type}
 
                 response = await client.get(
@@ -166,7 +168,7 @@ class SappSearchAPI:
             App详细信息
         """
         try:
-            async with httpx.AsyncClient(verify=False) as client:
+            async with create_custom_client(verify=False) as client:
                 params = {"id": app_id, "country": country.lower()}
 
                 response = await client.get(
@@ -968,6 +970,66 @@ async def handle_app_id_query(update: Update, context: ContextTypes.DEFAULT_TYPE
         await message.edit_text(foldable_text_v2(error_message), parse_mode="MarkdownV2")
 
 
+def parse_app_page(content: str) -> dict:
+    """
+    解析 App Store 应用页面（不做汇率换算）
+
+    Returns:
+        {"real_app_name": 应用名称或 None, "price": 付费价格或 None（免费）, "currency": 币种,
+         "in_app_purchases": [(名称, 价格字符串), ...]（已去重，保持页面顺序）}
+    """
+    # Try lxml first, fall back to html.parser if not available
+    try:
+        soup = BeautifulSoup(content, "lxml")
+    except Exception:
+        soup = BeautifulSoup(content, "html.parser")
+
+    real_app_name = None
+    price = None
+    currency = None
+
+    script_tags = soup.find_all("script", type="application/ld+json")
+    for script in script_tags:
+        try:
+            json_data = json.loads(script.string)
+            if isinstance(json_data, dict) and json_data.get("@type") == "SoftwareApplication":
+                # 获取应用名称
+                if not real_app_name:
+                    real_app_name = json_data.get("name", "").strip()
+
+                offers = json_data.get("offers", {})
+                if offers:
+                    offer_price = offers.get("price", 0)
+                    category = offers.get("category", "").lower()
+                    if category != "free" and float(offer_price) > 0:
+                        price = offer_price
+                        currency = offers.get("priceCurrency", "USD")
+                break
+        except (json.JSONDecodeError, TypeError, ValueError):
+            continue
+
+    in_app_purchases = []
+    unique_items = set()
+    for item in soup.select("li.list-with-numbers__item"):
+        name_tag = item.find("span", class_="truncate-single-line truncate-single-line--block")
+        price_tag = item.find("span", class_="list-with-numbers__item__price medium-show-tablecell")
+
+        if name_tag and price_tag:
+            name = name_tag.text.strip()
+            price_str = price_tag.text.strip()
+
+            if (name, price_str) not in unique_items:
+                unique_items.add((name, price_str))
+                in_app_purchases.append((name, price_str))
+
+    return {
+        "real_app_name": real_app_name,
+        "price": price,
+        "currency": currency,
+        "in_app_purchases": in_app_purchases,
+    }
+
+
 async def get_app_prices(
     app_name: str, country_code: str, app_id: int, app_type: str, context: ContextTypes.DEFAULT_TYPE
 ) -> dict:
@@ -1006,10 +1068,11 @@ async def get_app_prices(
     url = f"https://apps.apple.com/{country_code.lower()}/app/id{app_id}"
 
     try:
-        async with httpx.AsyncClient(follow_redirects=True, verify=False) as client:
-            response = await client.get(url, timeout=12)
-            response.raise_for_status()
-            content = response.text
+        with span("http.request", host="apps.apple.com", country=country_code):
+            async with create_custom_client(verify=False) as client:
+                response = await client.get(url, timeout=12)
+                response.raise_for_status()
+                content = response.text
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             logger.info(f"App 'id{app_id}' not found in {country_code} (404).")
@@ -1049,64 +1112,29 @@ async def get_app_prices(
         }
 
     try:
-        # Try lxml first, fall back to html.parser if not available
-        try:
-            soup = BeautifulSoup(content, "lxml")
-        except Exception:
-            soup = BeautifulSoup(content, "html.parser")
+        with span("parse.app_store", country=country_code, bytes=len(content)):
+            parsed = parse_app_page(content)
 
+        real_app_name = parsed["real_app_name"]
         app_price_str = "免费"
         app_price_cny = 0.0
-        real_app_name = None
+        if parsed["price"] is not None:
+            app_price_str = f"{parsed['price']} {parsed['currency']}"
+            if country_code != "CN" and rate_converter:
+                cny_price = await rate_converter.convert(float(parsed["price"]), parsed["currency"], "CNY")
+                if cny_price is not None:
+                    app_price_cny = cny_price
 
-        script_tags = soup.find_all("script", type="application/ld+json")
-        for script in script_tags:
-            try:
-                json_data = json.loads(script.string)
-                if isinstance(json_data, dict) and json_data.get("@type") == "SoftwareApplication":
-                    # 获取应用名称
-                    if not real_app_name:
-                        real_app_name = json_data.get("name", "").strip()
-
-                    offers = json_data.get("offers", {})
-                    if offers:
-                        price = offers.get("price", 0)
-                        currency = offers.get("priceCurrency", "USD")
-                        category = offers.get("category", "").lower()
-                        if category != "free" and float(price) > 0:
-                            app_price_str = f"{price} {currency}"
-                            if country_code != "CN" and rate_converter:
-                                cny_price = await rate_converter.convert(float(price), currency, "CNY")
-                                if cny_price is not None:
-                                    app_price_cny = cny_price
-                    break
-            except (json.JSONDecodeError, TypeError, ValueError):
-                continue
-
-        in_app_items = soup.select("li.list-with-numbers__item")
-        unique_items = set()
         in_app_purchases = []
-
-        if in_app_items:
-            for item in in_app_items:
-                name_tag = item.find("span", class_="truncate-single-line truncate-single-line--block")
-                price_tag = item.find("span", class_="list-with-numbers__item__price medium-show-tablecell")
-
-                if name_tag and price_tag:
-                    name = name_tag.text.strip()
-                    price_str = price_tag.text.strip()
-
-                    if (name, price_str) not in unique_items:
-                        unique_items.add((name, price_str))
-
-                        in_app_cny_price = None
-                        if country_code != "CN" and rate_converter:
-                            detected_currency, price_value = extract_currency_and_price(price_str, country_code)
-                            if price_value is not None:
-                                cny_price = await rate_converter.convert(price_value, detected_currency, "CNY")
-                                if cny_price is not None:
-                                    in_app_cny_price = cny_price
-                        in_app_purchases.append({"name": name, "price_str": price_str, "cny_price": in_app_cny_price})
+        for name, price_str in parsed["in_app_purchases"]:
+            in_app_cny_price = None
+            if country_code != "CN" and rate_converter:
+                detected_currency, price_value = extract_currency_and_price(price_str, country_code)
+                if price_value is not None:
+                    cny_price = await rate_converter.convert(price_value, detected_currency, "CNY")
+                    if cny_price is not None:
+                        in_app_cny_price = cny_price
+            in_app_purchases.append({"name": name, "price_str": price_str, "cny_price": in_app_cny_price})
 
         result_data = {
             "country_code": country_code,
@@ -15,6 +15,7 @@ from utils.formatter import foldable_text_v2, foldable_text_with_markdown_v2
 from utils.message_manager import delete_user_command, send_error, send_success, send_help
 from utils.permissions import Permission
 from utils.price_parser import extract_price_value_from_country_info
+from utils.tracing import span, traced
 
 
 # Configure logging
@@ -66,6 +67,7 @@ def parse_countries_from_args(args: list[str]) -> list[str]:
     return countries if countries else DEFAULT_COUNTRIES
 
 
+@traced("parse.icloud")
 def get_icloud_prices_from_html(content: str) -> dict:
     """Extracts iCloud prices from Apple Support HTML content."""
     soup = BeautifulSoup(content, "html.parser")
@@ -129,6 +131,98 @@ def get_icloud_prices_from_html(content: str) -> dict:
     return prices
 
 
+def _strip_per_month(price: str) -> str:
+    return price.replace("per month", "").replace("/month", "").replace("/mo.", "").strip()
+
+
+def parse_apple_one_plans(content: str) -> list[dict]:
+    """
+    解析 Apple One 页面中的套餐（不做汇率换算），缺少名称或价格的套餐卡片被跳过
+
+    Returns:
+        [{"name": 套餐名, "price": 月价, "services": [(服务名, 单独订阅价), ...]}, ...]
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    plans = []
+    for plan in soup.find_all("div", class_="plan-tile"):
+        name = plan.find("h3", class_="typography-plan-headline")
+        price_element = plan.find("p", class_="typography-plan-subhead")
+        if not name or not price_element:
+            continue
+
+        services = []
+        for service_item in plan.find_all("li", class_="service-item"):
+            service_name = service_item.find("span", class_="visuallyhidden")
+            service_price = service_item.find("span", class_="cost")
+            if service_name and service_price:
+                services.append(
+                    (service_name.get_text(strip=True), _strip_per_month(service_price.get_text(strip=True)))
+                )
+
+        plans.append(
+            {
+                "name": name.get_text(strip=True),
+                "price": _strip_per_month(price_element.get_text(strip=True)),
+                "services": services,
+            }
+        )
+    return plans
+
+
+def parse_apple_music_plans(content: str, country_code: str) -> list[tuple[str, str]] | None:
+    """
+    解析 Apple Music 页面中的订阅计划（不做汇率换算）
+
+    Returns:
+        [(计划名, 价格字符串), ...]；页面没有计划区块（服务不可用）时返回 None
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    plans_section = soup.find("section", class_="section-plans")
+    if not plans_section or not isinstance(plans_section, Tag):
+        return None
+
+    plans = []
+    if country_code == "CN":
+        # 国区页面的计划名带有脚注编号，直接使用固定名称
+        for plan_type, plan_name in (("student", "学生计划"), ("individual", "个人计划"), ("family", "家庭计划")):
+            item = plans_section.select_one(f"div.plan-list-item.{plan_type}")
+            if item and isinstance(item, Tag):
+                plan_name_tag = item.select_one("p.plan-type:not(.cost)")
+                price_tag = item.select_one("p.cost")
+                if plan_name_tag and price_tag:
+                    plans.append((plan_name, price_tag.get_text(strip=True)))
+        return plans
+
+    plan_names = {"student": "学生计划", "individual": "个人计划", "family": "家庭计划"}
+    processed_plans = set()
+
+    for plan_type, plan_name in plan_names.items():
+        item = plans_section.select_one(f"div.plan-list-item.{plan_type}")
+        if item and isinstance(item, Tag):
+            price_tag = item.select_one("p.cost span, p.cost, .price, .plan-price")
+            if price_tag:
+                price_str = price_tag.get_text(strip=True)
+                price_str = re.sub(r"\s*/\s*(月|month|mo\\.?).*", "", price_str, flags=re.IGNORECASE).strip()
+                plans.append((plan_name, price_str))
+                processed_plans.add(plan_type)
+
+    # 其余不属于标准三档的计划，使用页面上的名称
+    for item in plans_section.select("div.plan-list-item"):
+        if any(plan_type in item.get("class", []) for plan_type in processed_plans):
+            continue
+
+        plan_name_tag = item.select_one("p.plan-type:not(.cost), h3, h4, .plan-title, .plan-name")
+        plan_name = plan_name_tag.get_text(strip=True).replace("プラン", "").strip() if plan_name_tag else "未知计划"
+
+        price_tag = item.select_one("p.cost span, p.cost, .price, .plan-price")
+        if price_tag:
+            price_str = price_tag.get_text(strip=True)
+            price_str = re.sub(r"\s*/\s*(月|month).*", "", price_str, flags=re.IGNORECASE).strip()
+            plans.append((plan_name, price_str))
+
+    return plans
+
+
 async def get_service_info(url: str, country_code: str, service: str, context: ContextTypes.DEFAULT_TYPE) -> str:
     """Fetches and parses Apple service price information with caching."""
     cache_manager = context.bot_data["cache_manager"]
@@ -212,153 +306,41 @@ async def get_service_info(url: str, country_code: str, service: str, context: C
                         logger.warning(f"{size} plan not found for {country_name}")
 
         elif service == "appleone":
-            soup = BeautifulSoup(content, "html.parser")
-            plans = soup.find_all("div", class_="plan-tile")
+            with span("parse.apple_one", country=country_code):
+                plans = parse_apple_one_plans(content)
             logger.info(f"Found {len(plans)} Apple One plans for {country_code}")
 
+            # 只为解析成功的套餐输出内容和分隔空行；没有可解析的套餐时按不可用处理
             if not plans:
                 result_lines.append(f"{service_display_name} 服务在该国家/地区不可用。")
             else:
-                is_first_plan = True
-                for plan in plans:
-                    if not is_first_plan:
+                for index, plan in enumerate(plans):
+                    if index:
                         result_lines.append("")
-                    else:
-                        is_first_plan = False
 
-                    name = plan.find("h3", class_="typography-plan-headline")
-                    price_element = plan.find("p", class_="typography-plan-subhead")
+                    line = f"• {plan['name']}: {plan['price']}"
+                    if country_code != "CN":
+                        line += await convert_price_to_cny(plan["price"], country_code, context)
+                    result_lines.append(line)
 
-                    if name and price_element:
-                        name_text = name.get_text(strip=True)
-                        price = price_element.get_text(strip=True)
-                        price = price.replace("per month", "").replace("/month", "").replace("/mo.", "").strip()
-                        line = f"• {name_text}: {price}"
+                    for service_name, service_price in plan["services"]:
+                        service_line = f"  - {service_name}: {service_price}"
                         if country_code != "CN":
-                            cny_price_str = await convert_price_to_cny(price, country_code, context)
-                            line += cny_price_str
-                        result_lines.append(line)
-
-                        services = plan.find_all("li", class_="service-item")
-                        for service_item in services:
-                            service_name = service_item.find("span", class_="visuallyhidden")
-                            service_price = service_item.find("span", class_="cost")
-
-                            if service_name and service_price:
-                                service_name_text = service_name.get_text(strip=True)
-                                service_price_text = service_price.get_text(strip=True)
-                                service_price_text = (
-                                    service_price_text.replace("per month", "")
-                                    .replace("/month", "")
-                                    .replace("/mo.", "")
-                                    .strip()
-                                )
-                                service_line = f"  - {service_name_text}: {service_price_text}"
-                                if country_code != "CN":
-                                    cny_price_str = await convert_price_to_cny(
-                                        service_price_text, country_code, context
-                                    )
-                                    service_line += cny_price_str
-                                result_lines.append(service_line)
+                            service_line += await convert_price_to_cny(service_price, country_code, context)
+                        result_lines.append(service_line)
 
         elif service == "applemusic":
-            soup = BeautifulSoup(content, "html.parser")
-            plans_section = soup.find("section", class_="section-plans")
+            with span("parse.apple_music", country=country_code):
+                plans = parse_apple_music_plans(content, country_code)
 
-            if not plans_section or not isinstance(plans_section, Tag):
+            if plans is None:
                 result_lines.append(f"{service_display_name} 服务在该国家/地区不可用。")
-            elif country_code == "CN":
-                logger.info("Applying CN-specific parsing for Apple Music.")
-                student_plan_item = plans_section.select_one("div.plan-list-item.student")
-                if student_plan_item and isinstance(student_plan_item, Tag):
-                    plan_name_tag = student_plan_item.select_one("p.plan-type:not(.cost)")
-                    price_tag = student_plan_item.select_one("p.cost")
-                    if plan_name_tag and price_tag:
-                        plan_name = plan_name_tag.get_text(strip=True).replace("4", "").strip()
-                        price_str = price_tag.get_text(strip=True)
-                        result_lines.append(f"• 学生计划: {price_str}")
-
-                individual_plan_item = plans_section.select_one("div.plan-list-item.individual")
-                if individual_plan_item and isinstance(individual_plan_item, Tag):
-                    plan_name_tag = individual_plan_item.select_one("p.plan-type:not(.cost)")
-                    price_tag = individual_plan_item.select_one("p.cost")
-                    if plan_name_tag and price_tag:
-                        plan_name = plan_name_tag.get_text(strip=True)
-                        price_str = price_tag.get_text(strip=True)
-                        result_lines.append(f"• 个人计划: {price_str}")
-
-                family_plan_item = plans_section.select_one("div.plan-list-item.family")
-                if family_plan_item and isinstance(family_plan_item, Tag):
-                    plan_name_tag = family_plan_item.select_one("p.plan-type:not(.cost)")
-                    price_tag = family_plan_item.select_one("p.cost")
-                    if plan_name_tag and price_tag:
-                        plan_name = plan_name_tag.get_text(strip=True).replace("5", "").strip()
-                        price_str = price_tag.get_text(strip=True)
-                        result_lines.append(f"• 家庭计划: {price_str}")
             else:
-                logger.info(f"Applying standard parsing for Apple Music ({country_code}).")
-                plan_items = plans_section.select("div.plan-list-item")
-                plan_order = ["student", "individual", "family"]
-                processed_plans = set()
-
-                for plan_type in plan_order:
-                    item = plans_section.select_one(f"div.plan-list-item.{plan_type}")
-                    if item and isinstance(item, Tag) and plan_type not in processed_plans:
-                        plan_name_tag = item.select_one("p.plan-type:not(.cost), h3, h4, .plan-title, .plan-name")
-                        plan_name_extracted = (
-                            plan_name_tag.get_text(strip=True).replace("プラン", "").strip()
-                            if plan_name_tag
-                            else plan_type.capitalize()
-                        )
-
-                        price_tag = item.select_one("p.cost span, p.cost, .price, .plan-price")
-                        if price_tag:
-                            price_str = price_tag.get_text(strip=True)
-                            price_str = re.sub(
-                                r"\s*/\s*(月|month|mo\\.?).*", "", price_str, flags=re.IGNORECASE
-                            ).strip()
-
-                            if plan_type == "student":
-                                plan_name = "学生"
-                            elif plan_type == "individual":
-                                plan_name = "个人"
-                            elif plan_type == "family":
-                                plan_name = "家庭"
-                            else:
-                                plan_name = plan_name_extracted
-
-                            line = f"• {plan_name}计划: {price_str}"
-                            cny_price_str = await convert_price_to_cny(price_str, country_code, context)
-                            line += cny_price_str
-                            result_lines.append(line)
-                            processed_plans.add(plan_type)
-
-                for item in plan_items:
-                    class_list = item.get("class", [])
-                    is_processed = False
-                    for p_plan in processed_plans:
-                        if p_plan in class_list:
-                            is_processed = True
-                            break
-                    if is_processed:
-                        continue
-
-                    plan_name_tag = item.select_one("p.plan-type:not(.cost), h3, h4, .plan-title, .plan-name")
-                    plan_name = (
-                        plan_name_tag.get_text(strip=True).replace("プラン", "").strip()
-                        if plan_name_tag
-                        else "未知计划"
-                    )
-
-                    price_tag = item.select_one("p.cost span, p.cost, .price, .plan-price")
-                    if price_tag:
-                        price_str = price_tag.get_text(strip=True)
-                        price_str = re.sub(r"\s*/\s*(月|month).*", "", price_str, flags=re.IGNORECASE).strip()
-
-                        line = f"• {plan_name}: {price_str}"
-                        cny_price_str = await convert_price_to_cny(price_str, country_code, context)
-                        line += cny_price_str
-                        result_lines.append(line)
+                for plan_name, price_str in plans:
+                    line = f"• {plan_name}: {price_str}"
+                    if country_code != "CN":
+                        line += await convert_price_to_cny(price_str, country_code, context)
+                    result_lines.append(line)
 
         # Only join if there are actual price details beyond the header
         if len(result_lines) > 1:
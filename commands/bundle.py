@@ -0,0 +1,155 @@
+import logging
+import math
+import re
+from datetime import datetime
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from utils.command_factory import command_factory
+from utils.country_data import REGION_ALIASES, REGION_COUNTRIES, SUPPORTED_COUNTRIES, get_country_flag
+from utils.formatter import escape_v2, foldable_text_with_markdown_v2
+from utils.message_manager import delete_user_command, send_error, send_search_result
+from utils.permissions import Permission
+from utils.price_columns import COUNTRIES
+from utils.price_index import SERVICE_ALIASES, BundleSelection, get_price_index
+from utils.price_query_service import get_price_services, rank_emoji
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUNDLE = ["netflix", "spotify", "disney_plus"]
+MAX_BUNDLE_RESULTS = 30
+
+USAGE_TEXT = (
+    "用法: /bundle [服务[:套餐]...] [top N] [region=地区]\n"
+    "示例:\n"
+    "  /bundle nf+sp+ds\n"
+    "  /bundle nf:basic sp:individual top 5 region=asia\n"
+    "服务: nf (Netflix), sp (Spotify), ds (Disney+)，不指定时默认三者组合"
+)
+
+
+def _parse_bundle_args(args: list[str]) -> tuple[list[tuple[str, str | None]], int, list[str] | None]:
+    """解析 /bundle 参数，返回 ([(服务键, 套餐)], top_n, 地区国家代码列表)"""
+    services: list[tuple[str, str | None]] = []
+    top_n = 10
+    region_codes: list[str] | None = None
+
+    tokens = [token for arg in args for token in arg.split("+") if token]
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        lowered = token.lower()
+
+        if lowered == "top" and i + 1 < len(tokens) and tokens[i + 1].isdigit():
+            top_n = int(tokens[i + 1])
+            i += 1
+        elif match := re.fullmatch(r"top(\d+)", lowered):
+            top_n = int(match.group(1))
+        elif lowered.startswith(("region=", "地区=")):
+            region_codes = []
+            for region in lowered.split("=", 1)[1].split(","):
+                region_key = REGION_ALIASES.get(region.strip())
+                if not region_key:
+                    raise ValueError(f"未知的地区: {region}")
+                region_codes.extend(REGION_COUNTRIES[region_key])
+        else:
+            name, _, plan = token.partition(":")
+            service_key = SERVICE_ALIASES.get(name.lower())
+            if not service_key:
+                raise ValueError(f"未知的服务: {name}")
+            services.append((service_key, plan or None))
+        i += 1
+
+    if not 1 <= top_n <= MAX_BUNDLE_RESULTS:
+        raise ValueError(f"结果数量需在 1 到 {MAX_BUNDLE_RESULTS} 之间")
+
+    return services or [(key, None) for key in DEFAULT_BUNDLE], top_n, region_codes
+
+
+async def bundle_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handles the /bundle command: cheapest countries for a combination of subscriptions."""
+    if not update.message:
+        return
+
+    chat_id = update.message.chat_id
+
+    try:
+        requested, top_n, region_codes = _parse_bundle_args(context.args or [])
+    except ValueError as e:
+        await send_error(context, chat_id, escape_v2(f"❌ {e}\n\n{USAGE_TEXT}"), parse_mode="MarkdownV2")
+        await delete_user_command(context, chat_id, update.message.message_id)
+        return
+
+    services = get_price_services()
+    missing = [key for key, _ in requested if key not in services]
+    if missing:
+        await send_error(
+            context, chat_id, escape_v2(f"❌ 服务未初始化: {', '.join(missing)}"), parse_mode="MarkdownV2"
+        )
+        await delete_user_command(context, chat_id, update.message.message_id)
+        return
+
+    try:
+        for key, _ in requested:
+            await services[key].load_or_fetch_data(context)
+
+        index = get_price_index()
+        await index.refresh(services)
+
+        selections = []
+        for key, plan in requested:
+            columns = index.columns_for(key)
+            if columns is None:
+                raise RuntimeError(f"{services[key].service_name} 价格数据不可用")
+            plan_ids = services[key].resolve_plan_ids(columns, [plan] if plan else [])
+            selections.append(BundleSelection(key, plan_ids))
+
+        country_ids = None
+        if region_codes is not None:
+            country_ids = [cid for code in region_codes if (cid := COUNTRIES.lookup(code)) is not None]
+
+        results = index.cheapest_bundle(selections, country_ids=country_ids, top_n=top_n)
+
+        bundle_name = " + ".join(services[key].service_name for key, _ in requested)
+        lines = ["*🧾 订阅组合最低价格排名*", f"📦 组合：{bundle_name}", ""]
+
+        if not results:
+            lines.append("未找到同时提供这些订阅的国家/地区。")
+
+        for idx, result in enumerate(results, 1):
+            country_code = COUNTRIES.label(result.country_id)
+            country_name = SUPPORTED_COUNTRIES.get(country_code, {}).get("name", country_code)
+            lines.append(f"{rank_emoji(idx)} {country_name} ({country_code}) {get_country_flag(country_code)}")
+            lines.append(f"💰 合计 ≈ ¥{result.total:.2f}/月")
+            for key, row in result.rows:
+                columns = index.columns_for(key)
+                local_price = columns.local_prices[row]
+                local_text = "N/A" if math.isnan(local_price) else f"{local_price:,.2f} {columns.currency(row)}"
+                service_name = services[key].service_name
+                base_price = columns.base_prices[row]
+                lines.append(f"  • {service_name} {columns.plan(row)}: {local_text} ≈ ¥{base_price:.2f}")
+            if idx < len(results):
+                lines.append("")
+
+        oldest_timestamp = min(services[key].cache_timestamp for key, _ in requested)
+        if oldest_timestamp:
+            update_time_str = datetime.fromtimestamp(oldest_timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            lines.append("")
+            lines.append(f"⏱ 数据更新时间 (缓存)：{update_time_str}")
+
+        result_text = foldable_text_with_markdown_v2("\n".join(lines).strip())
+        await send_search_result(context, chat_id, result_text, parse_mode="MarkdownV2", disable_web_page_preview=True)
+        await delete_user_command(context, chat_id, update.message.message_id)
+
+    except Exception as e:
+        logger.error(f"Error processing bundle command: {e}", exc_info=True)
+        await send_error(context, chat_id, escape_v2(f"❌ 执行组合查询时发生错误: {e}"), parse_mode="MarkdownV2")
+        await delete_user_command(context, chat_id, update.message.message_id)
+
+
+# Register commands
+command_factory.register_command(
+    "bundle", bundle_command, permission=Permission.USER, description="订阅组合最低价国家查询"
+)
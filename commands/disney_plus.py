@@ -12,6 +12,7 @@ from utils.country_data import SUPPORTED_COUNTRIES, get_country_flag
 from utils.formatter import foldable_text_v2, foldable_text_with_markdown_v2
 from utils.message_manager import delete_user_command, send_error
 from utils.permissions import Permission
+from utils.price_columns import parse_price
 from utils.price_query_service import PriceQueryService
 from utils.rate_converter import RateConverter
 
@@ -26,7 +27,16 @@ DATA_URL = "https://git.domob.org/https://github.com/domoxiaojun/disneyplus-pric
 class DisneyPriceBot(PriceQueryService):
     """Manages Disney+ price data fetching, caching, and formatting."""
 
-    async def _fetch_data(self, context: ContextTypes.DEFAULT_TYPE) -> dict | None:
+    PLAN_ALIASES = {
+        "premium": ("Premium", "高級版"),
+        "高级版": ("Premium", "高級版"),
+        "standard": ("Standard", "標準版"),
+        "标准版": ("Standard", "標準版"),
+        "basic": ("Basic", "基本版"),
+        "基础版": ("Basic", "基本版"),
+    }
+
+    async def _fetch_data(self, context: ContextTypes.DEFAULT_TYPE | None) -> dict | None:
         """Fetches Disney+ price data from the specified URL."""
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
@@ -34,7 +44,7 @@ class DisneyPriceBot(PriceQueryService):
         try:
             from utils.http_client import create_custom_client
 
-            async with create_custom_client(headers=headers) as client:
+            async with create_custom_client(headers=headers, conditional_cache=True) as client:
                 response = await client.get(DATA_URL, timeout=20.0)
                 response.raise_for_status()
                 return response.json()
@@ -121,6 +131,22 @@ class DisneyPriceBot(PriceQueryService):
                         continue
         return None
 
+    def _iter_price_rows(self, items: list[tuple[str | None, dict]]):
+        """Projects each country's plans into (entry, country, plan, local, currency, CNY monthly) rows."""
+        for entry_id, (code, country_data) in enumerate(items):
+            for plan in country_data.get("plans", []):
+                yield (
+                    entry_id,
+                    code,
+                    plan.get("plan_name", ""),
+                    parse_price(plan.get("monthly_price_original")),
+                    plan.get("currency_code", ""),
+                    parse_price(plan.get("monthly_price_cny")),
+                )
+
+    def _is_comparison_plan(self, plan: str) -> bool:
+        return "Premium" in plan or "高級版" in plan
+
     async def get_top_cheapest(self, top_n: int = 10) -> str:
         if not self.data:
             error_msg = f"❌ 错误：未能加载 {self.service_name} 价格数据。请稍后再试或检查日志。"
@@ -143,42 +169,30 @@ class DisneyPriceBot(PriceQueryService):
                     }
                 })
         else:
-            # 降级到原有的排序逻辑（作为备用）
-            countries_with_prices = []
-            for code, country_data in self.data.items():
-                if code.startswith("_"):  # 跳过元数据键
-                    continue
-                    
-                comparison_price = self._extract_comparison_price(country_data)
-                if comparison_price is not None:
-                    country_name_cn = country_data.get(
-                        "name_cn", SUPPORTED_COUNTRIES.get(code.upper(), {}).get("name", code)
-                    )
-
-                    premium_plan_details = next(
-                        (
-                            plan
-                            for plan in country_data.get("plans", [])
-                            if ("Premium" in plan.get("plan_name", "") or "高級版" in plan.get("plan_name", ""))
-                        ),
-                        None,
-                    )
-
-                    countries_with_prices.append(
-                        {
-                            "code": code,
-                            "name_cn": country_name_cn,
-                            "price": comparison_price,
-                            "plan_details": premium_plan_details,
-                        }
-                    )
-
-            if not countries_with_prices:
+            # 降级到列式数据排名（作为备用）
+            columns = await self.get_columns()
+            top_rows = columns.rank(self.comparison_plan_ids(), top_n) if columns else []
+
+            if not top_rows:
                 error_msg = f"未能找到足够的可比较 {self.service_name} Premium 套餐价格信息。"
                 return foldable_text_v2(error_msg)
 
-            countries_with_prices.sort(key=lambda x: x["price"])
-            top_countries = countries_with_prices[:top_n]
+            top_countries = []
+            for row in top_rows:
+                code = columns.country(row)
+                country_data = columns.entry(row)
+                plan_name = columns.plan(row)
+                top_countries.append(
+                    {
+                        "code": code,
+                        "name_cn": country_data.get("name_cn", SUPPORTED_COUNTRIES.get(code, {}).get("name", code)),
+                        "price": columns.base_prices[row],
+                        "plan_details": next(
+                            (plan for plan in country_data.get("plans", []) if plan.get("plan_name") == plan_name),
+                            None,
+                        ),
+                    }
+                )
 
         # 组装原始文本，不转义
         message_lines = [f"*🏆 {self.service_name} 全球最低价格排名 (基于 Premium 套餐月付)*"]
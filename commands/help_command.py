@@ -44,6 +44,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 - `/nf [国家代码]`: 查询Netflix订阅价格 (默认查询热门地区)。
 - `/ds [国家代码]`: 查询Disney+订阅价格 (默认查询热门地区)。
 - `/sp [国家代码]`: 查询Spotify Premium价格 (默认查询热门地区)。
+- 以上命令支持条件查询，如 `/sp top 20 plan=individual currency=EUR region=asia`。
+- `/bundle [nf+sp+ds]`: 查询订阅组合总价最低的国家/地区。
 
 📱 *应用与服务价格*
 - `/app <应用名>`: 搜索App Store应用。
@@ -79,6 +81,10 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 - `/add <用户ID>`: (或回复消息) 添加用户到白名单。
 - `/addgroup`: (在群组中) 添加当前群组到白名单。
 
+📈 *性能监控*
+- `/perf [hour|day|week|month] [命令]`: 查看命令耗时分布 (p50/p95/p99)。
+- `/traces [数量]`: 查看最近的慢请求 trace，按 span 列出耗时。
+
 
 🧹 *缓存管理*
 - `/rate_cleancache`: 清理汇率缓存。
@@ -104,6 +110,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 - 访问所有系统状态和日志数据。
 
 ⚙️ *系统控制*
+- `/profile [秒数] [nomem]`: 在线采样分析，返回火焰图数据和内存分配热点。
 - 完整的日志管理权限 (归档/清理/维护)。
 - 定时任务调度管理。
 - 自定义脚本加载控制。
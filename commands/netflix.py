@@ -1,4 +1,6 @@
 import logging
+import math
+import re
 from datetime import datetime
 from typing import Any
 
@@ -13,6 +15,7 @@ from utils.country_data import SUPPORTED_COUNTRIES, get_country_flag
 from utils.formatter import foldable_text_v2, foldable_text_with_markdown_v2
 from utils.message_manager import delete_user_command, send_error
 from utils.permissions import Permission
+from utils.price_columns import parse_price
 from utils.price_query_service import PriceQueryService
 from utils.rate_converter import RateConverter
 
@@ -23,7 +26,32 @@ logger = logging.getLogger(__name__)
 class NetflixPriceBot(PriceQueryService):
     PRICE_URL = "https://opensheet.elk.sh/1b3qotAFrjHai7ny3AGGCTHsZ1xyl4yXviPU3Grqt940/by+regions"
 
-    async def _fetch_data(self, context: ContextTypes.DEFAULT_TYPE) -> list[dict[str, Any]] | None:
+    # 套餐字段 -> (中文名称, 美元价格字段)
+    PLAN_MAP = {
+        "Mobile": ("移动版", "MobileUSD"),
+        "Standard with ads": ("标准广告版", "With_Ads_USD"),
+        "Basic": ("基础版", "BasicUSD"),
+        "Standard": ("标准版", "StandardUSD"),
+        "Premium": ("高级版", "PremiumUSD"),
+    }
+
+    # 基准币种价格由美元价格按汇率换算
+    columns_require_rates = True
+
+    PLAN_ALIASES = {
+        "mobile": ("Mobile",),
+        "移动版": ("Mobile",),
+        "ads": ("Standard with ads",),
+        "广告版": ("Standard with ads",),
+        "basic": ("Basic",),
+        "基础版": ("Basic",),
+        "standard": ("Standard",),
+        "标准版": ("Standard",),
+        "premium": ("Premium",),
+        "高级版": ("Premium",),
+    }
+
+    async def _fetch_data(self, context: ContextTypes.DEFAULT_TYPE | None) -> list[dict[str, Any]] | None:
         """Fetches Netflix price data from the specified URL."""
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
@@ -31,7 +59,7 @@ class NetflixPriceBot(PriceQueryService):
         try:
             from utils.http_client import create_custom_client
 
-            async with create_custom_client(headers=headers) as client:
+            async with create_custom_client(headers=headers, conditional_cache=True) as client:
                 response = await client.get(self.PRICE_URL, timeout=20.0)
                 response.raise_for_status()
                 return response.json()
@@ -69,13 +97,7 @@ class NetflixPriceBot(PriceQueryService):
 
         lines = [f"📍 国家/地区: {country_name} ({country_code.upper()}) {country_flag}"]
 
-        plan_map = {
-            "Mobile": ("移动版", "MobileUSD"),
-            "Standard with ads": ("标准广告版", "With_Ads_USD"),
-            "Basic": ("基础版", "BasicUSD"),
-            "Standard": ("标准版", "StandardUSD"),
-            "Premium": ("高级版", "PremiumUSD"),
-        }
+        plan_map = self.PLAN_MAP
 
         plan_keys = list(plan_map.keys())
 
@@ -100,10 +122,7 @@ class NetflixPriceBot(PriceQueryService):
         if has_extra_members:
             # Process extra member slots format: "Standard: 1 / Premium: 2"
             extra_members_text = price_info["Extra member slots"]
-            # Add currency to numbers in the format
-            import re
-
-            # Replace numbers with number + currency
+            # Add currency to numbers in the format: replace numbers with number + currency
             extra_members_formatted = re.sub(r"(\d+)", r"\1 " + currency, extra_members_text)
             lines.append(f"  • 额外会员：{extra_members_formatted}")
 
@@ -118,6 +137,26 @@ class NetflixPriceBot(PriceQueryService):
                 pass
         return None
 
+    def _iter_price_rows(self, items: list[tuple[str | None, Any]]):
+        """Projects each country's plans into (entry, country, plan, local, currency, CNY) rows."""
+        rates = self.rate_converter.rates or {}
+        usd_to_cny = rates["CNY"] / rates["USD"] if rates.get("CNY") and rates.get("USD") else math.nan
+
+        for entry_id, (_, item) in enumerate(items):
+            code = item.get("Code")
+            if not code:
+                continue
+            currency = item.get("Currency", "")
+            for plan, (_, usd_key) in self.PLAN_MAP.items():
+                local_price = parse_price(item.get(plan))
+                usd_price = parse_price(item.get(usd_key))
+                if math.isnan(local_price) and math.isnan(usd_price):
+                    continue
+                yield entry_id, code, plan, local_price, currency, usd_price * usd_to_cny
+
+    def _is_comparison_plan(self, plan: str) -> bool:
+        return plan == "Premium"
+
     async def query_prices(self, query_list: list[str]) -> str:
         """
         Queries prices for a list of specified countries.
@@ -182,27 +221,24 @@ class NetflixPriceBot(PriceQueryService):
             error_message = f"❌ 错误：未能加载 {self.service_name} 价格数据。"
             return foldable_text_v2(error_message)
 
-        countries_with_prices = []
-        for item in self.data:
-            premium_usd = self._extract_comparison_price(item)
-            if premium_usd is not None:
-                countries_with_prices.append({"data": item, "price": premium_usd})
-
-        countries_with_prices.sort(key=lambda x: x["price"])
-        top_countries = countries_with_prices[:top_n]
+        columns = await self.get_columns()
+        top_rows = columns.rank(self.comparison_plan_ids(), top_n) if columns else []
+        if not top_rows:
+            error_message = f"未能找到足够的可比较 {self.service_name} 高级版价格信息。"
+            return foldable_text_v2(error_message)
 
         # Assemble raw text message
         raw_message_parts = []
         raw_message_parts.append(f"*🏆 {self.service_name} 全球最低价格排名 (高级版)*")
         raw_message_parts.append("")  # Empty line after header
 
-        for idx, country_data in enumerate(top_countries, 1):
-            item = country_data["data"]
-            country_code = item.get("Code", "N/A").upper()
+        for idx, row in enumerate(top_rows, 1):
+            item = columns.entry(row)
+            country_code = columns.country(row)
             country_info = SUPPORTED_COUNTRIES.get(country_code, {})
             country_name = country_info.get("name_cn", item.get("Translation", country_code))
             country_flag = get_country_flag(country_code)
-            premium_cny = await self.rate_converter.convert(country_data["price"], "USD", "CNY") or 0.0
+            premium_cny = columns.base_prices[row]
             premium_local = item.get("Premium", "")
             currency = item.get("Currency", "")
 
@@ -223,7 +259,7 @@ class NetflixPriceBot(PriceQueryService):
             raw_message_parts.append(country_block)
 
             # Add blank line between countries (except for the last one)
-            if idx < len(top_countries):
+            if idx < len(top_rows):
                 raw_message_parts.append("")
 
         if self.cache_timestamp:
@@ -0,0 +1,237 @@
+# type: ignore
+import asyncio
+import io
+import logging
+from datetime import datetime
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from utils.command_factory import command_factory
+from utils.formatter import foldable_text_with_markdown_v2
+from utils.loop_monitor import get_loop_monitor
+from utils.message_manager import delete_user_command, send_error, send_info, send_search_result
+from utils.permissions import Permission
+from utils.profiler import is_profiling, profile
+from utils.redis_stats_manager import LATENCY_WINDOWS
+from utils.task_manager import create_task
+from utils.tracing import get_tracer
+
+
+logger = logging.getLogger(__name__)
+
+WINDOW_NAMES = {"hour": "最近1小时", "day": "最近24小时", "week": "最近7天", "month": "最近30天"}
+
+
+def _format_ms(value: float | None) -> str:
+    if value is None:
+        return "-"
+    if value >= 1000:
+        return f"{value / 1000:.1f}s"
+    return f"{value:.0f}ms"
+
+
+def _format_summary(summary: dict) -> str:
+    error_rate = summary["errors"] / summary["count"] * 100 if summary["count"] else 0
+    return (
+        f"{summary['count']}次 · p50 {_format_ms(summary['p50_ms'])} · "
+        f"p95 {_format_ms(summary['p95_ms'])} · p99 {_format_ms(summary['p99_ms'])} · 错误 {error_rate:.1f}%"
+    )
+
+
+async def perf_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    查看命令耗时分布。
+    用法: /perf [hour|day|week|month] [命令]
+    """
+    message = update.effective_message
+    chat = update.effective_chat
+    if not message or not chat:
+        return
+
+    args = list(context.args or [])
+    window = "hour"
+    if args and args[0].lower() in LATENCY_WINDOWS:
+        window = args.pop(0).lower()
+    command = args[0].lstrip("/").lower() if args else None
+
+    stats_manager = context.bot_data.get("stats_manager")
+    if not stats_manager:
+        await send_error(context, chat.id, "统计管理器未初始化")
+        await delete_user_command(context, chat.id, message.message_id)
+        return
+
+    report = await stats_manager.get_latency_report(window, command)
+    commands = report["commands"]
+
+    lines = [f"⏱ *命令耗时* ({WINDOW_NAMES[window]})", ""]
+    if not commands:
+        lines.append("暂无数据")
+    elif command:
+        lines.append(f"`/{command}`: {_format_summary(commands[command])}")
+        lines.append("")
+        lines.append("*时间分布:*")
+        for period, summary in report["series"]:
+            lines.append(f"`{period}` {_format_summary(summary)}")
+    else:
+        # 按 p95 从慢到快排序，便于发现回归
+        ranked = sorted(commands.items(), key=lambda item: item[1]["p95_ms"] or 0, reverse=True)
+        for name, summary in ranked:
+            lines.append(f"`/{name}`: {_format_summary(summary)}")
+
+    loop_monitor = get_loop_monitor()
+    if loop_monitor:
+        lag = {key: value * 1000 for key, value in loop_monitor.get_lag_percentiles().items()}
+        if lag:
+            lines.append("")
+            lines.append(
+                f"🔁 事件循环延迟 (本进程): p50 {_format_ms(lag['p50'])} · p95 {_format_ms(lag['p95'])} · "
+                f"p99 {_format_ms(lag['p99'])} · 最大 {_format_ms(lag['max'])} · 阻塞 {loop_monitor.stall_count}次"
+            )
+
+    await send_search_result(
+        context, chat.id, foldable_text_with_markdown_v2("\n".join(lines)), parse_mode="MarkdownV2"
+    )
+    await delete_user_command(context, chat.id, message.message_id)
+
+
+def _format_trace(trace: dict, max_spans: int = 8) -> list[str]:
+    started = datetime.fromtimestamp(trace["start"]).strftime("%m-%d %H:%M:%S")
+    status = f" · ❌ {trace['error']}" if trace.get("error") else ""
+    lines = [f"`{trace['name']}` {_format_ms(trace['duration_ms'])} @ {started}{status}"]
+
+    # 除根 span 外按耗时从长到短列出
+    spans = sorted(trace["spans"][1:], key=lambda item: item["duration_ms"], reverse=True)
+    for item in spans[:max_spans]:
+        detail = " ".join(f"{k}={v}" for k, v in item["attributes"].items())
+        error = f" ❌ {item['error']}" if item.get("error") else ""
+        offset, duration = _format_ms(item["offset_ms"]), _format_ms(item["duration_ms"])
+        lines.append(f"  • +{offset} `{item['name']}` {duration} {detail}{error}")
+    hidden = max(len(spans) - max_spans, 0) + trace.get("dropped_spans", 0)
+    if hidden:
+        lines.append(f"  … 另有 {hidden} 个 span")
+    return lines
+
+
+async def traces_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    查看最近的慢请求 trace。
+    用法: /traces [数量]
+    """
+    message = update.effective_message
+    chat = update.effective_chat
+    if not message or not chat:
+        return
+
+    limit = 5
+    if context.args and context.args[0].isdigit():
+        limit = min(int(context.args[0]), 20)
+
+    tracer = get_tracer()
+    traces = await tracer.get_slow_traces(limit)
+
+    lines = [f"🐢 *慢请求* (>{_format_ms(tracer.slow_threshold_ms)} 或出错)", ""]
+    if not traces:
+        lines.append("暂无数据")
+    for trace in traces:
+        lines.extend(_format_trace(trace))
+        lines.append("")
+
+    await send_search_result(
+        context, chat.id, foldable_text_with_markdown_v2("\n".join(lines).rstrip()), parse_mode="MarkdownV2"
+    )
+    await delete_user_command(context, chat.id, message.message_id)
+
+
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 300
+
+# 正在进行的采样任务（任务启动并取得采样锁之前，is_profiling() 仍为 False）
+_profile_task: asyncio.Task | None = None
+
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    在运行中的进程内采样 N 秒，返回 collapsed stack 文件和内存分配热点。
+    用法: /profile [秒数] [nomem]
+
+    采样在后台任务中进行，处理器立即返回，期间机器人照常处理其他更新，结果完成后发送。
+    """
+    global _profile_task
+
+    message = update.effective_message
+    chat = update.effective_chat
+    if not message or not chat:
+        return
+
+    args = [arg.lower() for arg in context.args or []]
+    seconds = PROFILE_DEFAULT_SECONDS
+    if args and args[0].isdigit():
+        seconds = max(1, min(int(args[0]), PROFILE_MAX_SECONDS))
+    trace_memory = "nomem" not in args
+
+    await delete_user_command(context, chat.id, message.message_id)
+    if is_profiling() or (_profile_task and not _profile_task.done()):
+        await send_error(context, chat.id, "已有采样正在进行，请稍后再试")
+        return
+
+    try:
+        _profile_task = create_task(
+            _run_profile(context, chat.id, seconds, trace_memory), name="profile", context="profile"
+        )
+    except RuntimeError as e:
+        await send_error(context, chat.id, f"无法启动采样: {e}")
+        return
+
+    await send_info(context, chat.id, f"⏳ 开始采样 {seconds} 秒{'（含内存分配）' if trace_memory else ''}，完成后发送结果")
+
+
+async def _run_profile(context: ContextTypes.DEFAULT_TYPE, chat_id: int, seconds: int, trace_memory: bool):
+    """后台采样并发送结果"""
+    try:
+        result = await profile(seconds, trace_memory=trace_memory)
+    except Exception as e:
+        logger.error(f"采样失败: {e}")
+        await send_error(context, chat_id, f"采样失败: {e}")
+        return
+
+    lines = [f"🔬 *采样完成*: {result.duration:.1f}s, {result.samples} 次采样", "", "*自身耗时热点:*"]
+    if not result.top_functions:
+        lines.append("事件循环基本处于空闲")
+    for label, count in result.top_functions[:10]:
+        lines.append(f"`{count / max(result.samples, 1) * 100:5.1f}%` {label}")
+    await send_search_result(
+        context, chat_id, foldable_text_with_markdown_v2("\n".join(lines)), parse_mode="MarkdownV2"
+    )
+
+    # 结果文件不自动删除，便于下载后用 flamegraph.pl / speedscope 查看
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    await context.bot.send_document(
+        chat_id=chat_id,
+        document=io.BytesIO(result.collapsed.encode("utf-8")),
+        filename=f"profile-{stamp}.folded",
+        caption="collapsed stacks (flamegraph.pl / speedscope)",
+    )
+    if result.allocations:
+        await context.bot.send_document(
+            chat_id=chat_id,
+            document=io.BytesIO(result.allocations.encode("utf-8")),
+            filename=f"alloc-{stamp}.txt",
+            caption="tracemalloc top allocation sites",
+        )
+
+
+# 注册命令
+command_factory.register_command(
+    "perf", perf_command, permission=Permission.ADMIN, description="查看命令耗时分布 (p50/p95/p99)"
+)
+command_factory.register_command(
+    "traces", traces_command, permission=Permission.ADMIN, description="查看最近的慢请求 trace"
+)
+command_factory.register_command(
+    "profile",
+    profile_command,
+    permission=Permission.SUPER_ADMIN,
+    description="在线采样分析 (火焰图 + 内存分配)",
+    use_retry=False,
+)
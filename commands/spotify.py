@@ -14,6 +14,7 @@ from utils.country_data import COUNTRY_NAME_TO_CODE, SUPPORTED_COUNTRIES, get_co
 from utils.formatter import foldable_text_v2, foldable_text_with_markdown_v2
 from utils.message_manager import delete_user_command, send_error, send_search_result
 from utils.permissions import Permission
+from utils.price_columns import parse_price
 from utils.price_query_service import PriceQueryService
 from utils.rate_converter import RateConverter
 
@@ -412,7 +413,18 @@ class SpotifyPriceBot(PriceQueryService):
         "https://raw.githubusercontent.com/domoxiaojun/spotify-prices/refs/heads/main/spotify_prices_cny_sorted.json"
     )
 
-    async def _fetch_data(self, context: ContextTypes.DEFAULT_TYPE) -> dict[str, Any] | None:
+    PLAN_ALIASES = {
+        "individual": ("Premium Individual",),
+        "个人版": ("Premium Individual",),
+        "student": ("Premium Student",),
+        "学生版": ("Premium Student",),
+        "duo": ("Premium Duo",),
+        "双人版": ("Premium Duo",),
+        "family": ("Premium Family",),
+        "家庭版": ("Premium Family",),
+    }
+
+    async def _fetch_data(self, context: ContextTypes.DEFAULT_TYPE | None) -> dict[str, Any] | None:
         """Fetches Spotify price data from the specified URL."""
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
@@ -420,7 +432,7 @@ class SpotifyPriceBot(PriceQueryService):
         try:
             from utils.http_client import create_custom_client
 
-            async with create_custom_client(headers=headers) as client:
+            async with create_custom_client(headers=headers, conditional_cache=True) as client:
                 response = await client.get(self.PRICE_URL, timeout=20.0)
                 response.raise_for_status()
                 return response.json()
@@ -547,6 +559,26 @@ class SpotifyPriceBot(PriceQueryService):
                     return float(price_cny)
         return None
 
+    def _iter_price_rows(self, items: list[tuple[str | None, Any]]):
+        """Projects each country's plans into (entry, country, plan, local, currency, CNY) rows."""
+        for entry_id, (code, item) in enumerate(items):
+            country_code = item.get("country_code") or code
+            if not country_code:
+                continue
+            for plan in item.get("plans", []):
+                price_cny = parse_price(plan.get("price_cny"))
+                yield (
+                    entry_id,
+                    country_code,
+                    plan.get("plan", ""),
+                    parse_price(plan.get("price_number")),
+                    plan.get("currency", ""),
+                    price_cny if price_cny > 0 else float("nan"),
+                )
+
+    def _is_comparison_plan(self, plan: str) -> bool:
+        return plan == "Premium Family"
+
     async def query_prices(self, query_list: list[str]) -> str:
         """
         Queries prices for a list of specified countries.
@@ -684,29 +716,21 @@ class SpotifyPriceBot(PriceQueryService):
                 message_lines.append(f"⏱ 数据更新时间 (缓存)：{update_time_str}")
 
         else:
-            # Fallback: calculate from individual country data
-            countries_with_prices = []
-            for key, item in self.data.items():
-                if key.startswith("_"):  # Skip metadata
-                    continue
-                price_cny = self._extract_comparison_price(item)
-                if price_cny is not None:
-                    countries_with_prices.append({"data": item, "price": price_cny})
-
-            if not countries_with_prices:
+            # Fallback: rank the columnar projection of individual country data
+            columns = await self.get_columns()
+            top_rows = columns.rank(self.comparison_plan_ids(), top_n) if columns else []
+
+            if not top_rows:
                 error_msg = f"未能找到足够的可比较 {self.service_name} 家庭版价格信息。"
                 return foldable_text_v2(error_msg)
 
-            countries_with_prices.sort(key=lambda x: x["price"])
-            top_countries = countries_with_prices[:top_n]
-
             # 组装原始文本，不转义
             message_lines = [f"*🎵 {self.service_name} 全球最低价格排名 (家庭版)*"]
             message_lines.append("")  # Empty line after header
 
-            for idx, country_data in enumerate(top_countries, 1):
-                item = country_data["data"]
-                country_code = item.get("country_code", "N/A").upper()
+            for idx, row in enumerate(top_rows, 1):
+                item = columns.entry(row)
+                country_code = columns.country(row)
                 country_info = SUPPORTED_COUNTRIES.get(country_code, {})
 
                 # Try to get Chinese name in this order:
@@ -722,7 +746,7 @@ class SpotifyPriceBot(PriceQueryService):
                 )
 
                 country_flag = get_country_flag(country_code)
-                price_cny = country_data["price"]
+                price_cny = columns.base_prices[row]
 
                 # Find the Premium Family plan for original price and details
                 currency = ""
@@ -730,7 +754,7 @@ class SpotifyPriceBot(PriceQueryService):
                 original_price = "价格未知"
                 plans = item.get("plans", [])
                 for plan in plans:
-                    if plan.get("plan") == "Premium Family":
+                    if plan.get("plan") == columns.plan(row):
                         currency = plan.get("currency", "")
                         price_number = plan.get("price_number", "")
                         original_price = plan.get("price", "价格未知")
@@ -761,7 +785,7 @@ class SpotifyPriceBot(PriceQueryService):
                 message_lines.append(f"💰 家庭版: {price_display}")
 
                 # Add blank line between countries (except for the last one)
-                if idx < len(top_countries):
+                if idx < len(top_rows):
                     message_lines.append("")
 
             if self.cache_timestamp:
@@ -17,6 +17,7 @@ from utils.command_factory import command_factory
 from utils.config_manager import config_manager
 from utils.country_data import SUPPORTED_COUNTRIES, get_country_flag
 from utils.formatter import foldable_text_v2, foldable_text_with_markdown_v2
+from utils.http_client import create_custom_client
 from utils.message_manager import delete_user_command, send_error, send_help, send_search_result, send_success
 from utils.permissions import Permission
 from utils.rate_converter import RateConverter
@@ -330,7 +331,7 @@ class SteamPriceChecker:
 
         try:
             headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
-            async with httpx.AsyncClient(headers=headers) as client:
+            async with create_custom_client(headers=headers) as client:
                 response = await client.get(url, follow_redirects=True, timeout=10)
                 response.raise_for_status()
                 data = response.json()
@@ -369,7 +370,7 @@ class SteamPriceChecker:
         url = f"https://store.steampowered.com/api/appdetails?appids={app_id}&cc={cc}&l={self.config.DEFAULT_LANG}"
         try:
             headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
-            async with httpx.AsyncClient(headers=headers) as client:
+            async with create_custom_client(headers=headers) as client:
                 response = await client.get(url, follow_redirects=True, timeout=10)
                 response.raise_for_status()
                 data = response.json()
@@ -410,7 +411,7 @@ class SteamPriceChecker:
 
         try:
             headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
-            async with httpx.AsyncClient(headers=headers) as client:
+            async with create_custom_client(headers=headers) as client:
                 response = await client.get(url, follow_redirects=True, timeout=10)
                 response.raise_for_status()
                 data = response.json()
@@ -452,6 +453,58 @@ class SteamPriceChecker:
             logger.error("JSON decode error during bundle search.")
             return []
 
+    @staticmethod
+    def parse_bundle_page(content: str) -> dict:
+        """Parses a Steam bundle page into name, items and price fields (without the URL)."""
+        name_match = re.search(r'<h2[^>]*class="[^"]*pageheader[^"]*"[^>]*>(.*?)</h2>', content, re.DOTALL)
+        bundle_name = name_match.group(1).strip() if name_match else "未知捆绑包"
+
+        games = []
+        for game_match in re.finditer(r'<div class="tab_item.*?tab_item_name">(.*?)</div>.*?discount_final_price">(.*?)</div>', content, re.DOTALL):
+            game_name = game_match.group(1).strip()
+            game_price = game_match.group(2).strip()
+            games.append({
+                'name': game_name,
+                'price': {'final_formatted': game_price}
+            })
+
+        price_info = {
+            'original_price': '未知',
+            'discount_pct': '0',
+            'final_price': '未知',
+            'savings': '0'
+        }
+
+        price_block = re.search(r'<div class="package_totals_area.*?</div>\s*</div>', content, re.DOTALL)
+        if price_block:
+            price_content = price_block.group(0)
+
+            original_match = re.search(r'bundle_final_package_price">([^<]+)</div>', price_content)
+            if original_match:
+                price_info['original_price'] = original_match.group(1).strip()
+
+            discount_match = re.search(r'bundle_discount">([^<]+)</div>', price_content)
+            if discount_match:
+                discount = discount_match.group(1).strip().replace('%', '').replace('-', '')
+                price_info['discount_pct'] = discount
+
+            final_match = re.search(r'bundle_final_price_with_discount">([^<]+)</div>', price_content)
+            if final_match:
+                price_info['final_price'] = final_match.group(1).strip()
+
+            savings_match = re.search(r'bundle_savings">([^<]+)</div>', price_content)
+            if savings_match:
+                price_info['savings'] = savings_match.group(1).strip()
+
+        return {
+            'name': bundle_name,
+            'items': games,
+            'original_price': price_info['original_price'],
+            'discount_pct': price_info['discount_pct'],
+            'final_price': price_info['final_price'],
+            'savings': price_info['savings']
+        }
+
     async def get_bundle_details(self, bundle_id: str, cc: str) -> dict | None:
         """Fetches bundle details from Steam store page."""
         cache_key = f"steam_bundle_details_{bundle_id}_{cc}"
@@ -466,60 +519,13 @@ class SteamPriceChecker:
         }
 
         try:
-            async with httpx.AsyncClient() as client:
+            async with create_custom_client() as client:
                 response = await client.get(url, headers=headers, follow_redirects=True, timeout=10)
                 response.raise_for_status()
                 content = response.text
 
-            name_match = re.search(r'<h2[^>]*class="[^"]*pageheader[^"]*"[^>]*>(.*?)</h2>', content, re.DOTALL)
-            bundle_name = name_match.group(1).strip() if name_match else "未知捆绑包"
-
-            games = []
-            for game_match in re.finditer(r'<div class="tab_item.*?tab_item_name">(.*?)</div>.*?discount_final_price">(.*?)</div>', content, re.DOTALL):
-                game_name = game_match.group(1).strip()
-                game_price = game_match.group(2).strip()
-                games.append({
-                    'name': game_name,
-                    'price': {'final_formatted': game_price}
-                })
-
-            price_info = {
-                'original_price': '未知',
-                'discount_pct': '0',
-                'final_price': '未知',
-                'savings': '0'
-            }
-
-            price_block = re.search(r'<div class="package_totals_area.*?</div>\s*</div>', content, re.DOTALL)
-            if price_block:
-                price_content = price_block.group(0)
-
-                original_match = re.search(r'bundle_final_package_price">([^<]+)</div>', price_content)
-                if original_match:
-                    price_info['original_price'] = original_match.group(1).strip()
-
-                discount_match = re.search(r'bundle_discount">([^<]+)</div>', price_content)
-                if discount_match:
-                    discount = discount_match.group(1).strip().replace('%', '').replace('-', '')
-                    price_info['discount_pct'] = discount
-
-                final_match = re.search(r'bundle_final_price_with_discount">([^<]+)</div>', price_content)
-                if final_match:
-                    price_info['final_price'] = final_match.group(1).strip()
-
-                savings_match = re.search(r'bundle_savings">([^<]+)</div>', price_content)
-                if savings_match:
-                    price_info['savings'] = savings_match.group(1).strip()
-
-            bundle_data = {
-                'name': bundle_name,
-                'url': url,
-                'items': games,
-                'original_price': price_info['original_price'],
-                'discount_pct': price_info['discount_pct'],
-                'final_price': price_info['final_price'],
-                'savings': price_info['savings']
-            }
+            bundle_data = self.parse_bundle_page(content)
+            bundle_data['url'] = url
 
             await cache_manager.save_cache(cache_key, bundle_data, subdirectory="steam")
 
@@ -876,7 +882,7 @@ class SteamPriceChecker:
 
             try:
                 headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
-                async with httpx.AsyncClient(headers=headers) as client:
+                async with create_custom_client(headers=headers) as client:
                     response = await client.get(url, follow_redirects=True, timeout=10)
                     response.raise_for_status()
                     data = response.json()
@@ -94,6 +94,7 @@ from handlers.user_cache_handler import setup_user_cache_handler  # 新增：导
 from utils.command_factory import command_factory
 from utils.error_handling import with_error_handling
 from utils.log_manager import schedule_log_maintenance
+from utils.message_manager import TracedHTTPXRequest
 from utils.mysql_user_manager import MySQLUserManager
 from utils.permissions import Permission
 from utils.rate_converter import RateConverter
@@ -168,6 +169,12 @@ async def setup_application(application: Application, config) -> None:
     """异步设置应用"""
     logger.info(" 开始初始化机器人应用...")
 
+    # 事件循环监控最先启动，覆盖之后的初始化过程
+    if config.loop_monitor_enabled:
+        from utils.loop_monitor import init_loop_monitor
+
+        init_loop_monitor(config.loop_lag_interval_ms / 1000, config.loop_slow_callback_ms / 1000)
+
     # ========================================
     # 第零步：检查并初始化数据库
     # ========================================
@@ -199,17 +206,41 @@ async def setup_application(application: Application, config) -> None:
         password=config.db_password,
     )
     await user_cache_manager.connect()
+    # 权限集合常驻内存，变更通过 Redis 通知各副本
+    user_cache_manager.attach_redis(cache_manager.redis_client)
 
     # 初始化 Redis 统计管理器
-    stats_manager = RedisStatsManager(cache_manager.redis_client)
+    stats_manager = RedisStatsManager(cache_manager.redis_client, flush_interval=config.stats_flush_interval)
+    stats_manager.start()
 
     # 初始化汇率转换器
     rate_converter = RateConverter(config.exchange_rate_api_keys, cache_manager)
 
-    # 初始化优化的 HTTP 客户端
-    from utils.http_client import get_http_client
+    # 初始化优化的 HTTP 客户端（启用基于 Redis 的条件请求缓存）
+    from utils.http_client import configure_http_cache, get_http_client
 
+    configure_http_cache(cache_manager)
     httpx_client = get_http_client()
+    if config.upstream_override_url:
+        hosts = ", ".join(config.upstream_override_hosts) or "全部主机"
+        logger.warning(f"⚠️ 上游请求 ({hosts}) 将转发到替身服务器 {config.upstream_override_url}，仅用于压测")
+
+    # 链路追踪（慢请求写入 Redis Stream）
+    from utils.tracing import get_tracer
+
+    get_tracer().configure(
+        cache_manager.redis_client,
+        enabled=config.tracing_enabled,
+        sample_rate=config.trace_sample_rate,
+        slow_threshold_ms=config.trace_slow_threshold_ms,
+        stream_maxlen=config.trace_stream_maxlen,
+        otel_export=config.trace_otel_export,
+    )
+
+    # 分布式速率限制（多个副本共享配额）
+    from utils.rate_limiter import init_rate_limiter
+
+    init_rate_limiter(cache_manager.redis_client)
 
     # 将核心组件存储到 bot_data 中
     application.bot_data["cache_manager"] = cache_manager
@@ -270,6 +301,16 @@ async def setup_application(application: Application, config) -> None:
         logger.info(" 已配置 Disney+ 每周日UTC 5:00 定时清理")
         cleanup_tasks_added += 1
 
+    # 订阅价格数据集后台刷新任务
+    from utils.price_query_service import get_price_services
+
+    for service_key in get_price_services():
+        await task_scheduler.add_dataset_refresh(service_key, config.dataset_refresh_interval)
+    logger.info(f" 已配置订阅价格数据集后台刷新，间隔 {config.dataset_refresh_interval} 秒")
+
+    # 调度日志维护任务（每个实例维护本地日志，在工作线程中执行归档和压缩）
+    await schedule_log_maintenance(task_scheduler)
+
     # 启动任务调度器（包含汇率刷新任务）
     task_scheduler.start()
     if cleanup_tasks_added > 0:
@@ -283,12 +324,20 @@ async def setup_application(application: Application, config) -> None:
     application.bot_data["message_delete_scheduler"] = message_delete_scheduler
     logger.info("️ 消息删除调度器已启动")
 
-    # 调度日志维护任务
-    schedule_log_maintenance()
-    logger.info(" 日志维护任务已调度")
-
     logger.info("✅ 任务管理系统初始化完成")
 
+    # 可选：Prometheus 指标端点（独立端口）
+    if config.metrics_enabled:
+        from utils.metrics import MetricsServer, get_metrics, register_bot_collectors
+
+        register_bot_collectors(application.bot_data)
+        metrics_server = MetricsServer(get_metrics(), config.metrics_listen, config.metrics_port)
+        try:
+            await metrics_server.start()
+            application.bot_data["metrics_server"] = metrics_server
+        except OSError as e:
+            logger.error(f"❌ 指标端点启动失败: {e}")
+
     # ========================================
     # 第四步：预加载数据
     # ========================================
@@ -299,6 +348,13 @@ async def setup_application(application: Application, config) -> None:
     except Exception as e:
         logger.warning(f"⚠️ 汇率数据预加载失败: {e}")
 
+    # 订阅价格数据集在后台预热，避免首个用户命令等待下载
+    from utils.price_query_service import warm_up_price_services
+    from utils.task_manager import create_task
+
+    create_task(warm_up_price_services(), name="warm_up_price_services", context="dataset_refresh")
+    logger.info(" 订阅价格数据集后台预热已启动")
+
     # ========================================
     # 第五步：设置命令处理器
     # ========================================
@@ -403,6 +459,16 @@ async def cleanup_application(application: Application) -> None:
             application.bot_data["message_delete_scheduler"].stop()
             logger.info("✅ 消息删除调度器已停止")
 
+        if "metrics_server" in application.bot_data:
+            await application.bot_data["metrics_server"].stop()
+            logger.info("✅ 指标端点已停止")
+
+        from utils.loop_monitor import get_loop_monitor
+
+        loop_monitor = get_loop_monitor()
+        if loop_monitor:
+            loop_monitor.stop()
+
         # ========================================
         # 第三步：关闭任务管理器
         # ========================================
@@ -414,6 +480,14 @@ async def cleanup_application(application: Application) -> None:
         # ========================================
         # 第四步：关闭数据库连接
         # ========================================
+        if "user_cache_manager" in application.bot_data:
+            flushed = await application.bot_data["user_cache_manager"].flush()
+            logger.info(f"✅ 已写入缓冲中的 {flushed} 行数据库记录")
+
+        if "stats_manager" in application.bot_data:
+            await application.bot_data["stats_manager"].stop()
+            logger.info("✅ 命令统计已写入")
+
         if "cache_manager" in application.bot_data:
             await application.bot_data["cache_manager"].close()
             logger.info("✅ Redis 连接已关闭")
@@ -469,7 +543,10 @@ def main() -> None:
     # 第二步：创建并配置应用
     # ========================================
     logger.info(" 创建 Telegram Bot 应用...")
-    application = Application.builder().token(bot_token).build()
+    # Bot API 请求经过 TracedHTTPXRequest，send/edit/delete 调用计入 trace 和指标（连接池大小同 PTB 默认）
+    application = (
+        Application.builder().token(bot_token).request(TracedHTTPXRequest(connection_pool_size=256)).build()
+    )
 
     # 设置异步初始化和清理回调
     async def init_and_run(app):
@@ -5,18 +5,57 @@
 """
 
 import logging
+import time
 from collections.abc import Callable
+from functools import wraps
 from typing import Any
 
 from telegram.ext import Application, CallbackQueryHandler, CommandHandler
 
 from utils.error_handling import RetryConfig, with_error_handling, with_rate_limit, with_retry
+from utils.metrics import metrics
 from utils.permissions import Permission, require_permission
+from utils.tracing import tracer
 
 
 logger = logging.getLogger(__name__)
 
 
+def with_command_metrics(command: str):
+    """记录命令耗时直方图和使用统计（统计写入内存缓冲，不增加 Redis 往返），同时更新进程内指标并开启 trace"""
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(update, context, *args, **kwargs):
+            start = time.perf_counter()
+            error = False
+            try:
+                async with tracer.trace(f"command.{command}"):
+                    return await func(update, context, *args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                duration = time.perf_counter() - start
+                metrics.inc("bot_commands_total", {"command": command, "status": "error" if error else "ok"})
+                metrics.observe("bot_command_duration_seconds", duration, {"command": command})
+
+                stats_manager = context.bot_data.get("stats_manager") if context else None
+                if stats_manager:
+                    try:
+                        await stats_manager.record_command_latency(command, duration, error)
+                        user = getattr(update, "effective_user", None)
+                        chat = getattr(update, "effective_chat", None)
+                        if user and chat:
+                            await stats_manager.record_command_usage(command, user.id, chat.id, chat.type)
+                    except Exception as e:
+                        logger.debug(f"记录命令统计失败: {e}")
+
+        return wrapper
+
+    return decorator
+
+
 class CommandFactory:
     """命令工厂类"""
 
@@ -48,6 +87,9 @@ class CommandFactory:
         """
         decorated_handler = handler
         if handler is not None:
+            # 记录命令耗时（在错误处理内层，才能区分异常结束的调用）
+            decorated_handler = with_command_metrics(command)(decorated_handler)
+
             # 应用错误处理装饰器
             decorated_handler = with_error_handling(decorated_handler)
 
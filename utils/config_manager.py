@@ -26,6 +26,11 @@ class BotConfig:
     webhook_key: str = ""
     webhook_cert: str = ""
 
+    # Prometheus 指标端点（独立端口，与 webhook 监听器分开）
+    metrics_enabled: bool = False
+    metrics_listen: str = "0.0.0.0"
+    metrics_port: int = 9464
+
     # 基础配置
     bot_token: str = ""
     super_admin_id: int = 0
@@ -56,6 +61,33 @@ class BotConfig:
     spotify_weekly_cleanup: bool = True  # 默认启用
     disney_weekly_cleanup: bool = True  # 默认启用
 
+    # 订阅价格数据集后台刷新间隔
+    dataset_refresh_interval: int = 21600  # 6小时
+
+    # 命令统计缓冲写入间隔（秒），0 表示每条命令立即写入
+    stats_flush_interval: int = 5
+
+    # 事件循环监控配置
+    loop_monitor_enabled: bool = True
+    loop_lag_interval_ms: int = 250  # 探测间隔
+    loop_slow_callback_ms: int = 200  # 阻塞超过此时长时记录调用栈
+
+    # 链路追踪配置
+    tracing_enabled: bool = True
+    trace_sample_rate: float = 1.0  # 记录 trace 的比例
+    trace_slow_threshold_ms: int = 3000  # 超过此耗时的 trace 写入 Redis Stream
+    trace_stream_maxlen: int = 1000
+    trace_otel_export: bool = False  # 需安装 opentelemetry-sdk
+
+    # HTTP 条件请求缓存配置（ETag / Last-Modified）
+    http_cache_enabled: bool = True
+    http_cache_duration: int = 604800  # 7天
+    http_cache_hosts: list[str] = field(default_factory=lambda: ["www.apple.com", "support.apple.com"])
+
+    # 上游替身配置（压测时把上游请求转发到本地 fake upstream）
+    upstream_override_url: str = ""  # 如 http://127.0.0.1:8900，留空不转发
+    upstream_override_hosts: list[str] = field(default_factory=list)  # 只转发这些主机，留空转发全部
+
     # API配置
     exchange_rate_api_keys: list[str] = field(default_factory=list)
 
@@ -67,6 +99,7 @@ class BotConfig:
     # 速率限制配置
     rate_limit_enabled: bool = True
     max_requests_per_minute: int = 30
+    rate_limit_admin_multiplier: int = 5  # 管理员配额倍数，0 表示不限制
 
     # 日志配置
     log_level: str = "INFO"
@@ -135,6 +168,8 @@ class BotConfig:
     # MySQL 连接池配置
     db_min_connections: int = 5  # 最小连接数
     db_max_connections: int = 20  # 最大连接数
+    db_write_flush_interval_ms: int = 500  # 批量写入刷新间隔（毫秒）
+    db_write_batch_size: int = 500  # 缓冲达到此行数时立即刷新
 
 
 class ConfigManager:
@@ -203,6 +238,35 @@ class ConfigManager:
         # 定时清理配置
         self.config.spotify_weekly_cleanup = os.getenv("SPOTIFY_WEEKLY_CLEANUP", "False").lower() == "true"
         self.config.disney_weekly_cleanup = os.getenv("DISNEY_WEEKLY_CLEANUP", "False").lower() == "true"
+        self.config.dataset_refresh_interval = int(os.getenv("DATASET_REFRESH_INTERVAL", "21600"))
+
+        # 统计配置
+        self.config.stats_flush_interval = int(os.getenv("STATS_FLUSH_INTERVAL", "5"))
+
+        # 事件循环监控配置
+        self.config.loop_monitor_enabled = os.getenv("LOOP_MONITOR_ENABLED", "True").lower() == "true"
+        self.config.loop_lag_interval_ms = int(os.getenv("LOOP_LAG_INTERVAL_MS", "250"))
+        self.config.loop_slow_callback_ms = int(os.getenv("LOOP_SLOW_CALLBACK_MS", "200"))
+
+        # 链路追踪配置
+        self.config.tracing_enabled = os.getenv("TRACING_ENABLED", "True").lower() == "true"
+        self.config.trace_sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+        self.config.trace_slow_threshold_ms = int(os.getenv("TRACE_SLOW_THRESHOLD_MS", "3000"))
+        self.config.trace_stream_maxlen = int(os.getenv("TRACE_STREAM_MAXLEN", "1000"))
+        self.config.trace_otel_export = os.getenv("TRACE_OTEL_EXPORT", "False").lower() == "true"
+
+        # HTTP 条件请求缓存配置
+        self.config.http_cache_enabled = os.getenv("HTTP_CACHE_ENABLED", "True").lower() == "true"
+        self.config.http_cache_duration = int(os.getenv("HTTP_CACHE_DURATION", "604800"))
+        http_cache_hosts_str = os.getenv("HTTP_CACHE_HOSTS", "www.apple.com,support.apple.com")
+        self.config.http_cache_hosts = [host.strip() for host in http_cache_hosts_str.split(",") if host.strip()]
+
+        # 上游替身配置
+        self.config.upstream_override_url = os.getenv("UPSTREAM_OVERRIDE_URL", "").strip()
+        override_hosts_str = os.getenv("UPSTREAM_OVERRIDE_HOSTS", "")
+        self.config.upstream_override_hosts = [
+            host.strip().lower() for host in override_hosts_str.split(",") if host.strip()
+        ]
 
         # API配置
         keys_str = os.getenv("EXCHANGE_RATE_API_KEYS") or os.getenv("EXCHANGE_RATE_API_KEY", "")
@@ -216,6 +280,7 @@ class ConfigManager:
         # 速率限制配置
         self.config.rate_limit_enabled = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
         self.config.max_requests_per_minute = int(os.getenv("MAX_REQUESTS_PER_MINUTE", "30"))
+        self.config.rate_limit_admin_multiplier = int(os.getenv("RATE_LIMIT_ADMIN_MULTIPLIER", "5"))
 
         # 日志配置
         self.config.log_level = os.getenv("LOG_LEVEL", "INFO")
@@ -277,6 +342,13 @@ class ConfigManager:
         # MySQL 连接池配置
         self.config.db_min_connections = int(os.getenv("DB_MIN_CONNECTIONS", "5"))
         self.config.db_max_connections = int(os.getenv("DB_MAX_CONNECTIONS", "20"))
+        self.config.db_write_flush_interval_ms = int(os.getenv("DB_WRITE_FLUSH_INTERVAL_MS", "500"))
+        self.config.db_write_batch_size = int(os.getenv("DB_WRITE_BATCH_SIZE", "500"))
+
+        # 指标端点配置
+        self.config.metrics_enabled = os.getenv("METRICS_ENABLED", "False").lower() == "true"
+        self.config.metrics_listen = os.getenv("METRICS_LISTEN", "0.0.0.0")
+        self.config.metrics_port = int(os.getenv("METRICS_PORT", "9464"))
 
         # Webhook 配置
         self.config.webhook_url = os.getenv("WEBHOOK_URL", "")
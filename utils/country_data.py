@@ -168,6 +168,62 @@ COUNTRY_NAME_TO_CODE = {info["name"]: code for code, info in SUPPORTED_COUNTRIES
 # Create a set of all valid country inputs (codes and names)
 VALID_COUNTRY_INPUTS = set(COUNTRY_NAME_TO_CODE.keys()) | set(SUPPORTED_COUNTRIES.keys())
 
+# Region membership of each country code, used by the region= price query filter
+REGION_COUNTRIES = {
+    "africa": [
+        "AO", "BF", "BI", "BJ", "BW", "CD", "CG", "CI", "CM", "CV", "DJ", "DZ", "EG", "ET", "GA", "GH", "GM", "GN",
+        "GQ", "GW", "KE", "KM", "LR", "LS", "LY", "MA", "MG", "ML", "MR", "MU", "MW", "MZ", "NA", "NE", "NG", "RW",
+        "SC", "SL", "SN", "ST", "SZ", "TD", "TG", "TN", "TZ", "UG", "ZA", "ZM", "ZW",
+    ],
+    "asia": [
+        "AE", "AM", "AZ", "BD", "BH", "BN", "BT", "CN", "CY", "GE", "HK", "ID", "IL", "IN", "IQ", "JO", "JP", "KG",
+        "KH", "KR", "KW", "KZ", "LA", "LB", "LK", "MM", "MN", "MO", "MV", "MY", "NP", "OM", "PH", "PK", "PS", "QA",
+        "SA", "SG", "TH", "TJ", "TL", "TM", "TR", "TW", "UZ", "VN", "YE",
+    ],
+    "europe": [
+        "AD", "AL", "AT", "BA", "BE", "BG", "BY", "CH", "CZ", "DE", "DK", "EE", "ES", "FI", "FR", "GB", "GR", "HR",
+        "HU", "IE", "IS", "IT", "LI", "LT", "LU", "LV", "MC", "MD", "ME", "MK", "MT", "NL", "NO", "PL", "PT", "RO",
+        "RS", "RU", "SE", "SI", "SK", "SM", "UA", "UK", "XK",
+    ],
+    "latin_america": [
+        "AG", "AI", "AR", "BB", "BO", "BR", "BS", "BZ", "CL", "CO", "CR", "CW", "DM", "DO", "EC", "GD", "GT", "GY",
+        "HN", "HT", "JM", "KN", "KY", "LC", "MS", "MX", "NI", "PA", "PE", "PY", "SR", "SV", "TC", "TT", "UY", "VC",
+        "VE", "VG",
+    ],
+    "north_america": [
+        "BM", "CA", "US",
+    ],
+    "oceania": [
+        "AU", "FJ", "FM", "KI", "MH", "NR", "NZ", "PG", "PW", "SB", "TO", "TV", "VU", "WS",
+    ],
+}
+
+COUNTRY_REGIONS = {code: region for region, codes in REGION_COUNTRIES.items() for code in codes}
+
+# Accepted user spellings (English and Chinese) for each region
+REGION_ALIASES = {
+    "africa": "africa",
+    "非洲": "africa",
+    "asia": "asia",
+    "亚洲": "asia",
+    "europe": "europe",
+    "eu": "europe",
+    "欧洲": "europe",
+    "latam": "latin_america",
+    "latin_america": "latin_america",
+    "latinamerica": "latin_america",
+    "south_america": "latin_america",
+    "拉美": "latin_america",
+    "拉丁美洲": "latin_america",
+    "南美": "latin_america",
+    "north_america": "north_america",
+    "northamerica": "north_america",
+    "na": "north_america",
+    "北美": "north_america",
+    "oceania": "oceania",
+    "大洋洲": "oceania",
+}
+
 # Standard Unicode flag emojis
 # Source: https://emojipedia.org/flags
 UNICODE_FLAG_EMOJIS = {
@@ -0,0 +1,96 @@
+"""
+Cron 表达式解析（UTC）
+
+支持标准 5 段格式：分 时 日 月 周，每段可使用 *、数字、范围 a-b、步长 */n 或 a-b/n，以及逗号列表。
+周字段 0 和 7 都表示周日。日和周同时受限时，满足其一即可（与 crontab 一致）。
+"""
+
+from datetime import datetime, timedelta, timezone
+
+
+# 各字段的取值范围
+_FIELD_RANGES = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),
+)
+
+# 向后查找下一次执行时间的上限，防止 "0 0 31 2 *" 这类永远不会触发的表达式死循环
+_MAX_SEARCH_DAYS = 366 * 5
+
+
+class CronError(ValueError):
+    """Cron 表达式无效"""
+
+
+def _parse_field(expr: str, name: str, low: int, high: int) -> frozenset[int]:
+    values: set[int] = set()
+    for part in expr.split(","):
+        range_part, _, step_part = part.partition("/")
+        try:
+            step = int(step_part) if step_part else 1
+            if range_part == "*":
+                start, end = low, high
+            elif "-" in range_part:
+                start_text, end_text = range_part.split("-", 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = int(range_part)
+                end = high if step_part else start
+        except ValueError:
+            raise CronError(f"无效的 {name} 字段: {expr}") from None
+
+        if step <= 0 or not (low <= start <= end <= high):
+            raise CronError(f"{name} 字段超出范围 {low}-{high}: {expr}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronExpression:
+    """解析后的 Cron 表达式"""
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise CronError(f"Cron 表达式需要 5 个字段: {expression}")
+
+        self.expression = expression
+        parsed = [_parse_field(expr, *spec) for expr, spec in zip(fields, _FIELD_RANGES, strict=True)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # 统一为 Python 的 weekday()：0 = 周一 ... 6 = 周日
+        self.weekdays = frozenset((day - 1) % 7 for day in weekdays)
+        self._day_restricted = fields[2] != "*"
+        self._weekday_restricted = fields[4] != "*"
+
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expression!r})"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = moment.weekday() in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, timestamp: float) -> float:
+        """返回严格晚于 timestamp 的下一次触发时间（Unix 时间戳）"""
+        moment = datetime.fromtimestamp(timestamp, timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=_MAX_SEARCH_DAYS)
+
+        while moment < limit:
+            if moment.month not in self.months:
+                # 跳到下个月第一天
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+
+        raise CronError(f"Cron 表达式在 {_MAX_SEARCH_DAYS} 天内不会触发: {self.expression}")
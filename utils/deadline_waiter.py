@@ -0,0 +1,112 @@
+"""
+调度器到期等待器
+
+调度工作器不再每秒轮询 Redis，而是读取有序集合中最早的到期时间并休眠到那一刻。
+本进程调度了更早的任务时通过进程内事件立即唤醒，其他进程调度的任务通过 Redis pub/sub 唤醒。
+近期的到期时间只由事件循环的定时器持有，Redis 有序集合仍是唯一的持久化来源。
+"""
+
+import asyncio
+import logging
+import math
+import time
+
+import redis.asyncio as redis
+
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineWaiter:
+    """按有序集合中最早的分数休眠，可被更早的新任务提前唤醒"""
+
+    def __init__(self, redis_client: redis.Redis, schedule_key: str, wake_channel: str, max_idle: float = 60.0):
+        """
+        Args:
+            redis_client: Redis 客户端
+            schedule_key: 以到期时间为分数的有序集合
+            wake_channel: 跨进程唤醒的 pub/sub 频道
+            max_idle: 最长休眠时间（秒），用于兜底及执行周期性维护
+        """
+        self.redis = redis_client
+        self.schedule_key = schedule_key
+        self.wake_channel = wake_channel
+        self.max_idle = max_idle
+
+        self._event = asyncio.Event()
+        self._next_deadline = math.inf
+        self._listener: asyncio.Task | None = None
+        self.stats = {"peeks": 0, "early_wakeups": 0}
+
+    def start(self):
+        """启动唤醒频道监听"""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    def stop(self):
+        """停止监听"""
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        self._event.set()
+
+    def notify(self, execute_at: float):
+        """有新任务被调度；比当前等待的到期时间更早时唤醒工作器"""
+        if execute_at < self._next_deadline:
+            self._next_deadline = execute_at
+            self._event.set()
+
+    def publish(self, pipe, execute_at: float):
+        """在调用方的 pipeline 中追加唤醒通知（不额外增加往返），其他进程据此提前唤醒"""
+        pipe.publish(self.wake_channel, repr(execute_at))
+
+    async def wait(self):
+        """休眠到最早的任务到期（最长 max_idle 秒），或被更早的任务唤醒"""
+        # 先清除事件再读取最早到期时间，读取期间到达的通知不会丢失
+        self._event.clear()
+        earliest = await self.redis.zrange(self.schedule_key, 0, 0, withscores=True)
+        self.stats["peeks"] += 1
+
+        if self._event.is_set():
+            # 读取期间已有新任务被调度
+            self._next_deadline = math.inf
+            return
+
+        self._next_deadline = earliest[0][1] if earliest else math.inf
+        timeout = min(self._next_deadline - time.time(), self.max_idle)
+        if timeout <= 0:
+            self._next_deadline = math.inf
+            await asyncio.sleep(0)
+            return
+
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            self.stats["early_wakeups"] += 1
+        except TimeoutError:
+            pass
+        finally:
+            self._next_deadline = math.inf
+
+    async def _listen(self):
+        """订阅唤醒频道，连接中断后自动重连"""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.wake_channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        self.notify(float(message["data"]))
+                    except (TypeError, ValueError):
+                        self._event.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"唤醒频道 {self.wake_channel} 监听中断，5 秒后重连: {e}")
+                await asyncio.sleep(5)
+            finally:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
@@ -11,7 +11,9 @@ from typing import Any
 
 import httpx
 
+from utils.config_manager import get_config
 from utils.message_manager import delete_user_command, send_error
+from utils.rate_limiter import RateLimit, get_rate_limiter
 
 
 logger = logging.getLogger(__name__)
@@ -185,86 +187,61 @@ class CircuitBreakerManager:
             logger.debug(f"清理不活跃的熔断器: {name}")
 
 
-class RateLimiter:
-    """速率限制器"""
-
-    def __init__(self, max_calls: int, time_window: int):
-        self.max_calls = max_calls
-        self.time_window = time_window
-        self.calls = []
-
-    async def acquire(self, user_id: int) -> bool:
-        """获取执行许可"""
-        now = time.time()
-
-        # 清理过期的调用记录
-        self.calls = [call_time for call_time in self.calls if now - call_time < self.time_window]
-
-        if len(self.calls) >= self.max_calls:
-            return False
-
-        self.calls.append(now)
-        return True
-
-
-class RateLimiterManager:
-    """速率限制器管理器，自动清理过期的限制器"""
-
-    def __init__(self, cleanup_interval: int = 1800):  # 30分钟清理一次
-        self.rate_limiters: dict[str, RateLimiter] = {}
-        self.last_cleanup = time.time()
-        self.cleanup_interval = cleanup_interval
-
-    def get_rate_limiter(self, name: str, max_calls: int = 10, time_window: int = 60) -> RateLimiter:
-        """获取或创建速率限制器"""
-        now = time.time()
-
-        # 定期清理
-        if now - self.last_cleanup > self.cleanup_interval:
-            self._cleanup_inactive_limiters()
-            self.last_cleanup = now
-
-        if name not in self.rate_limiters:
-            self.rate_limiters[name] = RateLimiter(max_calls, time_window)
-
-        return self.rate_limiters[name]
-
-    def _cleanup_inactive_limiters(self):
-        """清理长时间未使用的限制器"""
-        now = time.time()
-        inactive_names = []
-
-        for name, limiter in self.rate_limiters.items():
-            # 如果限制器超过1小时无调用记录，则清理
-            if not limiter.calls or (now - max(limiter.calls) > 3600):
-                inactive_names.append(name)
-
-        for name in inactive_names:
-            del self.rate_limiters[name]
-            logger.debug(f"清理不活跃的速率限制器: {name}")
-
-
 # 创建全局管理器实例
 circuit_breaker_manager = CircuitBreakerManager()
-rate_limiter_manager = RateLimiterManager()
 
 # 为了向后兼容，保留原有接口
 circuit_breakers = circuit_breaker_manager.circuit_breakers
-rate_limiters = rate_limiter_manager.rate_limiters
+
+
+async def _is_admin_user(user_id: int, context) -> bool:
+    """是否为管理员或超级管理员（用于速率限制分级）"""
+    if not user_id:
+        return False
+    if user_id == get_config().super_admin_id:
+        return True
+    user_manager = context.bot_data.get("user_cache_manager")
+    if not user_manager:
+        return False
+    try:
+        return await user_manager.is_admin(user_id)
+    except Exception as e:
+        logger.debug(f"检查管理员身份失败: {e}")
+        return False
 
 
 def with_rate_limit(name: str | None = None, max_calls: int = 10, time_window: int = 60):
-    """速率限制装饰器"""
+    """
+    速率限制装饰器
+
+    按 (命令, 群组, 用户) 限制 max_calls 次/time_window 秒，同时按用户限制全局每分钟请求数
+    （MAX_REQUESTS_PER_MINUTE）；管理员的配额乘以 RATE_LIMIT_ADMIN_MULTIPLIER（为 0 时不限制）。
+    """
 
     def decorator(func):
         limiter_name = name or func.__name__
 
         @wraps(func)
         async def wrapper(update, context, *args, **kwargs):
+            config = get_config()
+            if not config.rate_limit_enabled:
+                return await func(update, context, *args, **kwargs)
+
             user_id = update.effective_user.id if update.effective_user else 0
-            rate_limiter = rate_limiter_manager.get_rate_limiter(limiter_name, max_calls, time_window)
+            chat_id = update.effective_chat.id if update.effective_chat else 0
+
+            multiplier = 1
+            if await _is_admin_user(user_id, context):
+                multiplier = config.rate_limit_admin_multiplier
+                if multiplier <= 0:
+                    return await func(update, context, *args, **kwargs)
+
+            limits = [
+                RateLimit(f"{limiter_name}:{chat_id}:{user_id}", max_calls * multiplier, time_window),
+                RateLimit(f"user:{user_id}", config.max_requests_per_minute * multiplier, 60),
+            ]
 
-            if await rate_limiter.acquire(user_id):
+            if not await get_rate_limiter().check(limits, limiter_name):
                 return await func(update, context, *args, **kwargs)
             else:
                 # 使用新的消息管理API发送频率限制错误消息
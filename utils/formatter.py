@@ -4,6 +4,7 @@ import re
 from telegram.helpers import escape_markdown
 
 from .config_manager import get_config
+from .tracing import traced
 
 
 logger = logging.getLogger(__name__)
@@ -110,6 +111,7 @@ def format_with_markdown_v2(text: str) -> str:
         return escape_v2(text)  # 降级到安全转义
 
 
+@traced("format.foldable_text")
 def foldable_text_v2(body: str) -> str:
     """
     Formats text for MarkdownV2, applying folding if it exceeds the configured line threshold.
@@ -150,6 +152,7 @@ def foldable_text_v2(body: str) -> str:
         return escape_v2(body)  # Fallback to safe escaped text
 
 
+@traced("format.foldable_markdown")
 def foldable_text_with_markdown_v2(body: str) -> str:
     """
     格式化包含MarkdownV2格式的文本，支持基于行数的折叠功能。
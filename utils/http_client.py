@@ -3,16 +3,247 @@ HTTP 客户端工具模块
 提供优化的 httpx 客户端实例和便捷方法
 """
 
+import base64
+import hashlib
 import logging
+import time
 
 import httpx
 
+from utils.metrics import metrics
+from utils.tracing import span
+
 
 logger = logging.getLogger(__name__)
 
 # 全局共享的 HTTP 客户端实例
 _global_client: httpx.AsyncClient | None = None
 
+# 条件请求缓存使用的缓存管理器（由 configure_http_cache 注入）
+_http_cache_manager = None
+
+HTTP_CACHE_SUBDIRECTORY = "http_cache"
+
+# 不随缓存响应保存的逐跳/会话相关响应头
+_UNCACHED_RESPONSE_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-length", "set-cookie"}
+
+
+class MetricsTransport(httpx.AsyncBaseTransport):
+    """按主机统计上游请求数、传输错误和耗时（写入进程内指标注册表），并记录 http.request span"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        start = time.perf_counter()
+        try:
+            with span("http.request", host=host, method=request.method) as current:
+                response = await self._transport.handle_async_request(request)
+                if current:
+                    current.set_attribute("status", response.status_code)
+        except Exception as e:
+            metrics.inc("bot_upstream_errors_total", {"host": host, "error": type(e).__name__})
+            raise
+
+        metrics.inc("bot_upstream_requests_total", {"host": host, "status": f"{response.status_code // 100}xx"})
+        metrics.observe("bot_upstream_duration_seconds", time.perf_counter() - start, {"host": host})
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class UpstreamOverrideTransport(httpx.AsyncBaseTransport):
+    """
+    把上游请求转发到替身服务器（UPSTREAM_OVERRIDE_URL）
+
+    只替换连接目标的 scheme/host/port，路径、查询参数和 Host 头保持原样，
+    替身服务器据此按原始主机和 URL 形式返回响应。
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, target_url: str, hosts: list[str] | None = None):
+        """
+        Args:
+            transport: 实际发送请求的底层传输层
+            target_url: 替身服务器地址，如 http://127.0.0.1:8900
+            hosts: 需要转发的主机列表，为空则转发所有主机
+        """
+        self._transport = transport
+        self._target = httpx.URL(target_url)
+        self._hosts = {host.lower() for host in hosts} if hosts else None
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self._hosts is not None and request.url.host.lower() not in self._hosts:
+            return await self._transport.handle_async_request(request)
+
+        url = request.url.copy_with(scheme=self._target.scheme, host=self._target.host, port=self._target.port)
+        # 新建请求对象，避免改写调用方的 request.url（重定向和日志仍使用原始 URL）
+        forwarded = httpx.Request(
+            request.method, url, headers=request.headers, stream=request.stream, extensions=request.extensions
+        )
+        return await self._transport.handle_async_request(forwarded)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class ConditionalCacheTransport(httpx.AsyncBaseTransport):
+    """
+    支持 ETag / Last-Modified 条件请求的缓存传输层
+
+    对带有验证器的 GET 响应，将验证器和原始响应体保存到 RedisCacheManager；
+    下次请求时发送 If-None-Match / If-Modified-Since，收到 304 时直接复用保存的响应体。
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        cache_manager,
+        hosts: list[str] | None = None,
+        max_body_bytes: int = 5 * 1024 * 1024,
+    ):
+        """
+        Args:
+            transport: 实际发送请求的底层传输层
+            cache_manager: Redis 缓存管理器
+            hosts: 允许缓存的主机列表，为空则缓存所有主机
+            max_body_bytes: 可缓存的最大响应体（字节）
+        """
+        self._transport = transport
+        self._cache_manager = cache_manager
+        self._hosts = {host.lower() for host in hosts} if hosts else None
+        self._max_body_bytes = max_body_bytes
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "bytes_saved": 0}
+
+    def _should_cache(self, request: httpx.Request) -> bool:
+        if request.method != "GET":
+            return False
+        if "if-none-match" in request.headers or "if-modified-since" in request.headers:
+            return False
+        return self._hosts is None or request.url.host.lower() in self._hosts
+
+    @staticmethod
+    def _cache_key(request: httpx.Request) -> str:
+        # 部分页面按语言返回不同内容，Accept-Language 也参与键计算
+        raw = f"{request.url}|{request.headers.get('accept-language', '')}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self._should_cache(request):
+            return await self._transport.handle_async_request(request)
+
+        cache_key = self._cache_key(request)
+        entry = None
+        try:
+            entry = await self._cache_manager.load_cache(cache_key, subdirectory=HTTP_CACHE_SUBDIRECTORY)
+        except Exception as e:
+            logger.debug(f"读取 HTTP 缓存失败 {request.url}: {e}")
+
+        if entry:
+            if entry.get("etag"):
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = await self._transport.handle_async_request(request)
+
+        if response.status_code == 304 and entry:
+            await response.aclose()
+            body = base64.b64decode(entry["body"])
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(body)
+            metrics.inc("bot_http_cache_requests_total", {"result": "hit"})
+            logger.debug(f"HTTP 缓存命中 (304): {request.url}")
+            return httpx.Response(
+                status_code=entry.get("status", 200),
+                headers=entry.get("headers", []),
+                content=body,
+                request=request,
+                extensions=response.extensions,
+            )
+
+        self.stats["misses"] += 1
+        metrics.inc("bot_http_cache_requests_total", {"result": "miss"})
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if response.status_code != 200 or not (etag or last_modified):
+            return response
+
+        # 读取原始（未解码）响应体，保证 Content-Encoding 与保存的响应头一致
+        try:
+            raw_body = b"".join([chunk async for chunk in response.aiter_raw()])
+        finally:
+            await response.aclose()
+
+        headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in _UNCACHED_RESPONSE_HEADERS]
+        if len(raw_body) <= self._max_body_bytes:
+            entry = {
+                "url": str(request.url),
+                "status": response.status_code,
+                "etag": etag,
+                "last_modified": last_modified,
+                "headers": headers,
+                "body": base64.b64encode(raw_body).decode("ascii"),
+            }
+            try:
+                await self._cache_manager.save_cache(cache_key, entry, subdirectory=HTTP_CACHE_SUBDIRECTORY)
+                self.stats["stored"] += 1
+            except Exception as e:
+                logger.debug(f"保存 HTTP 缓存失败 {request.url}: {e}")
+
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=headers,
+            content=raw_body,
+            request=request,
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def configure_http_cache(cache_manager):
+    """
+    启用条件请求缓存（需在创建全局客户端之前调用）
+
+    Args:
+        cache_manager: Redis 缓存管理器
+    """
+    global _http_cache_manager
+
+    from utils.config_manager import get_config
+
+    if not get_config().http_cache_enabled:
+        logger.info("HTTP 条件请求缓存已禁用")
+        return
+
+    _http_cache_manager = cache_manager
+    if _global_client is not None:
+        logger.warning("全局 HTTP 客户端已创建，条件请求缓存仅对之后创建的客户端生效")
+    logger.info("✅ HTTP 条件请求缓存已启用")
+
+
+def _build_transport(
+    limits: httpx.Limits, verify: bool, conditional_cache: bool, cache_hosts: list[str] | None = None
+) -> httpx.AsyncBaseTransport:
+    """
+    构建按主机统计的传输层；启用条件请求缓存时在外层再加缓存（304 仍计入上游请求）。
+    配置了 UPSTREAM_OVERRIDE_URL 时，最内层把请求转发到替身服务器（指标仍按原始主机统计）。
+    """
+    from utils.config_manager import get_config
+
+    transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport(limits=limits, http2=True, verify=verify)
+    config = get_config()
+    if config.upstream_override_url:
+        transport = UpstreamOverrideTransport(transport, config.upstream_override_url, config.upstream_override_hosts)
+    transport = MetricsTransport(transport)
+    if not conditional_cache or _http_cache_manager is None:
+        return transport
+
+    return ConditionalCacheTransport(transport, _http_cache_manager, hosts=cache_hosts)
+
 
 def get_http_client() -> httpx.AsyncClient:
     """
@@ -24,13 +255,20 @@ def get_http_client() -> httpx.AsyncClient:
     global _global_client
 
     if _global_client is None:
+        from utils.config_manager import get_config
+
+        limits = httpx.Limits(
+            max_keepalive_connections=20,  # 最大保持连接数
+            max_connections=100,  # 最大总连接数
+            keepalive_expiry=30.0,  # 连接保持时间（秒）
+        )
+        # 全局客户端只缓存配置中允许的主机（如 Apple 服务页面）
+        transport = _build_transport(limits, True, True, cache_hosts=get_config().http_cache_hosts)
+
         # 创建优化的客户端配置
         _global_client = httpx.AsyncClient(
-            limits=httpx.Limits(
-                max_keepalive_connections=20,  # 最大保持连接数
-                max_connections=100,  # 最大总连接数
-                keepalive_expiry=30.0,  # 连接保持时间（秒）
-            ),
+            limits=limits,
+            transport=transport,
             timeout=httpx.Timeout(
                 connect=10.0,  # 连接超时
                 read=30.0,  # 读取超时
@@ -52,6 +290,7 @@ def create_custom_client(
     verify: bool = True,
     follow_redirects: bool = True,
     timeout: float | None = None,
+    conditional_cache: bool = False,
 ) -> httpx.AsyncClient:
     """
     创建自定义配置的 HTTP 客户端
@@ -61,6 +300,7 @@ def create_custom_client(
         verify: 是否验证 SSL 证书
         follow_redirects: 是否自动跟随重定向
         timeout: 超时时间（秒）
+        conditional_cache: 是否对 GET 请求启用 ETag/Last-Modified 条件请求缓存
 
     Returns:
         httpx.AsyncClient: 自定义配置的异步 HTTP 客户端
@@ -77,6 +317,7 @@ def create_custom_client(
     return httpx.AsyncClient(
         headers=headers,
         limits=limits,
+        transport=_build_transport(limits, verify, conditional_cache),
         timeout=timeout_config,
         http2=True,
         follow_redirects=follow_redirects,
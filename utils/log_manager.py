@@ -1,15 +1,23 @@
 """
 日志管理模块
 提供日志清理和归档功能
+
+维护任务是同步文件 I/O（遍历、移动、gzip 压缩），在工作线程中执行，不阻塞事件循环。
+logs/ 是每台主机各自的目录，因此每个进程都按计划维护本地日志，而不是交给只在 leader 上运行的集群任务。
 """
 
+import asyncio
 import glob
 import gzip
 import logging
 import os
 import shutil
+import time
 from datetime import datetime, timedelta
 
+from utils.cron import CronExpression
+from utils.task_manager import create_task
+
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +28,8 @@ class LogManager:
     def __init__(self, log_dir: str = "logs", archive_dir: str = "logs/archive"):
         self.log_dir = log_dir
         self.archive_dir = archive_dir
+        # 本次维护过程中的字节统计
+        self._last_run = {"archived_bytes": 0, "compressed_bytes": 0, "freed_bytes": 0}
 
         # 确保目录存在
         os.makedirs(self.log_dir, exist_ok=True)
@@ -56,7 +66,9 @@ class LogManager:
                             shutil.move(log_file, archive_path)
 
                             # 压缩归档文件
-                            self._compress_file(archive_path)
+                            original_size, compressed_size = self._compress_file(archive_path)
+                            self._last_run["archived_bytes"] += original_size
+                            self._last_run["compressed_bytes"] += compressed_size
 
                             archived_count += 1
                             logger.info(f"归档日志文件: {filename}")
@@ -69,18 +81,22 @@ class LogManager:
 
         return archived_count
 
-    def _compress_file(self, file_path: str) -> None:
-        """压缩文件"""
+    def _compress_file(self, file_path: str) -> tuple[int, int]:
+        """压缩文件，返回 (原始大小, 压缩后大小)"""
         try:
-            with open(file_path, "rb") as f_in, gzip.open(f"{file_path}.gz", "wb") as f_out:
-                shutil.copyfileobj(f_in, f_out)
+            original_size = os.path.getsize(file_path)
+            # 压缩级别 6 在日志文本上压缩率接近 9，但速度快得多
+            with open(file_path, "rb") as f_in, gzip.open(f"{file_path}.gz", "wb", compresslevel=6) as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
 
             # 删除原文件
             os.remove(file_path)
             logger.debug(f"压缩文件: {file_path}")
+            return original_size, os.path.getsize(f"{file_path}.gz")
 
         except Exception as e:
             logger.error(f"压缩文件失败 {file_path}: {e}")
+            return 0, 0
 
     def cleanup_old_archives(self, days_old: int = 90) -> int:
         """清理超过指定天数的归档文件"""
@@ -97,6 +113,7 @@ class LogManager:
                 file_mtime = datetime.fromtimestamp(os.path.getmtime(archive_file))
 
                 if file_mtime < cutoff_date:
+                    self._last_run["freed_bytes"] += os.path.getsize(archive_file)
                     os.remove(archive_file)
                     cleaned_count += 1
                     logger.info(f"删除旧归档文件: {os.path.basename(archive_file)}")
@@ -136,8 +153,10 @@ class LogManager:
         return stats
 
     def run_maintenance(self, archive_days: int = 7, cleanup_days: int = 90) -> dict:
-        """运行日志维护任务"""
+        """运行日志维护任务（同步文件 I/O，应在工作线程中调用）"""
         result = {"archived": 0, "cleaned": 0, "error": None}
+        self._last_run = {"archived_bytes": 0, "compressed_bytes": 0, "freed_bytes": 0}
+        start = time.perf_counter()
 
         try:
             logger.info("开始日志维护任务")
@@ -148,12 +167,20 @@ class LogManager:
             # 清理旧归档
             result["cleaned"] = self.cleanup_old_archives(cleanup_days)
 
-            logger.info(f"日志维护完成: 归档 {result['archived']} 个文件, 清理 {result['cleaned']} 个文件")
-
         except Exception as e:
             result["error"] = str(e)
             logger.error(f"日志维护任务失败: {e}")
 
+        result.update(self._last_run)
+        result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        result.update(self.get_log_stats())
+
+        logger.info(
+            f"日志维护完成: 归档 {result['archived']} 个文件 "
+            f"({result['archived_bytes'] / 1024 / 1024:.2f}MB -> {result['compressed_bytes'] / 1024 / 1024:.2f}MB), "
+            f"清理 {result['cleaned']} 个文件 (释放 {result['freed_bytes'] / 1024 / 1024:.2f}MB), "
+            f"耗时 {result['duration_ms']}ms; 当前日志 {result['current_size_mb']}MB, 归档 {result['archive_size_mb']}MB"
+        )
         return result
 
 
@@ -161,17 +188,31 @@ class LogManager:
 log_manager = LogManager()
 
 
-def schedule_log_maintenance():
-    """调度日志维护任务"""
-    try:
-        import schedule
+# 每周日 UTC 02:00 执行
+LOG_MAINTENANCE_CRON = "0 2 * * 0"
+# 旧版本在 Redis 任务调度器中注册的集群级任务（只在 leader 上运行）
+_LEGACY_JOB_ID = "log_maintenance"
 
-        # 每周日凌晨2点执行日志维护
-        schedule.every().sunday.at("02:00").do(log_manager.run_maintenance, archive_days=7, cleanup_days=90)
 
-        logger.info("日志维护任务已调度: 每周日 02:00 执行")
+async def _log_maintenance_loop(archive_days: int, cleanup_days: int):
+    """按计划在本进程内维护本地日志目录"""
+    cron = CronExpression(LOG_MAINTENANCE_CRON)
+    while True:
+        await asyncio.sleep(max(0.0, cron.next_after(time.time()) - time.time()))
+        try:
+            await asyncio.to_thread(log_manager.run_maintenance, archive_days=archive_days, cleanup_days=cleanup_days)
+        except Exception as e:
+            logger.error(f"日志维护任务失败: {e}")
 
-    except Exception as e:
-        logger.error(f"调度日志维护任务失败: {e}")
 
+async def schedule_log_maintenance(task_scheduler, archive_days: int = 7, cleanup_days: int = 90):
+    """在本进程启动日志维护循环（每周日 UTC 02:00），并移除旧版本注册的集群级任务"""
+    try:
+        await task_scheduler.cancel_task(_LEGACY_JOB_ID)
+        create_task(
+            _log_maintenance_loop(archive_days, cleanup_days), name="log_maintenance", context="log_maintenance"
+        )
+        logger.info("日志维护任务已调度: 每周日 UTC 02:00 在本实例执行")
 
+    except Exception as e:
+        logger.error(f"调度日志维护任务失败: {e}")
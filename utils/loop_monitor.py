@@ -0,0 +1,162 @@
+"""
+事件循环延迟监控
+事件循环内的探测协程按固定间隔睡眠，实际醒来时间与预期之差即调度延迟，保存最近的样本用于计算分位数。
+
+同时由一个守护线程检查探测协程的心跳：心跳停止超过阈值说明有回调阻塞了事件循环，
+此时线程通过 sys._current_frames() 抓取事件循环线程的调用栈（即正在阻塞的代码），
+事件循环恢复后与阻塞时长一起写入日志。与 asyncio debug 模式不同，它不包装每个回调，可在生产环境常开。
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+# 保留的延迟样本数（默认间隔下约 5 分钟）
+LAG_SAMPLE_SIZE = 1200
+# 保留的阻塞记录数
+STALL_HISTORY_SIZE = 20
+# 日志中保留的调用栈帧数
+STACK_LIMIT = 25
+
+
+class LoopMonitor:
+    """事件循环延迟与阻塞回调监控"""
+
+    def __init__(self, interval: float = 0.25, slow_threshold: float = 0.2):
+        """
+        Args:
+            interval: 探测间隔（秒）
+            slow_threshold: 心跳停止超过此时长（秒）视为阻塞，抓取调用栈
+        """
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.lag_samples: deque[float] = deque(maxlen=LAG_SAMPLE_SIZE)
+        self.stalls: deque[dict] = deque(maxlen=STALL_HISTORY_SIZE)
+        self.stall_count = 0
+
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        self._loop_thread_id: int | None = None
+        self._heartbeat = time.monotonic()
+        self._pending_stack: str | None = None
+
+    def start(self):
+        """在当前事件循环中启动探测协程和看门狗线程"""
+        if self._task is not None:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        metrics.register_collector(self._collect)
+        logger.info(
+            f"事件循环监控已启动，探测间隔 {self.interval * 1000:.0f}ms，阻塞阈值 {self.slow_threshold * 1000:.0f}ms"
+        )
+
+    def stop(self):
+        """停止监控"""
+        self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._watchdog = None
+
+    async def _probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._heartbeat = time.monotonic()
+            self.lag_samples.append(lag)
+
+            if lag >= self.slow_threshold:
+                self._record_stall(lag)
+
+    def _record_stall(self, lag: float):
+        stack, self._pending_stack = self._pending_stack, None
+        self.stall_count += 1
+        self.stalls.append({"time": time.time(), "lag": lag, "stack": stack})
+        metrics.inc("bot_event_loop_stalls_total")
+
+        if stack:
+            logger.warning(f"事件循环阻塞 {lag * 1000:.0f}ms，阻塞时的调用栈:\n{stack}")
+        else:
+            logger.warning(f"事件循环阻塞 {lag * 1000:.0f}ms（未抓取到调用栈）")
+
+    def _watch(self):
+        """看门狗线程：心跳超时时抓取事件循环线程的调用栈（每次阻塞只抓一次）"""
+        check_interval = min(self.interval, self.slow_threshold) / 2
+        captured_for = None
+        while not self._stop_event.wait(check_interval):
+            heartbeat = self._heartbeat
+            stalled_for = time.monotonic() - heartbeat
+            if stalled_for < self.interval + self.slow_threshold or captured_for == heartbeat:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._pending_stack = "".join(traceback.format_stack(frame, limit=STACK_LIMIT))
+            captured_for = heartbeat
+
+    def get_lag_percentiles(self) -> dict[str, float]:
+        """最近样本的延迟分位数（秒）"""
+        samples = sorted(self.lag_samples)
+        if not samples:
+            return {}
+
+        def pick(quantile: float) -> float:
+            return samples[min(len(samples) - 1, int(quantile * len(samples)))]
+
+        return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "max": samples[-1]}
+
+    def get_stats(self) -> dict:
+        """监控统计：延迟分位数、阻塞次数和最近的阻塞记录"""
+        return {
+            "lag": self.get_lag_percentiles(),
+            "samples": len(self.lag_samples),
+            "stall_count": self.stall_count,
+            "recent_stalls": list(self.stalls),
+        }
+
+    async def _collect(self) -> list[tuple[str, dict[str, str], float]]:
+        percentiles = self.get_lag_percentiles()
+        samples = [
+            ("bot_event_loop_lag_seconds", {"quantile": quantile}, percentiles[key])
+            for key, quantile in (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99"))
+            if key in percentiles
+        ]
+        if percentiles:
+            samples.append(("bot_event_loop_lag_max_seconds", {}, percentiles["max"]))
+        return samples
+
+
+_loop_monitor: LoopMonitor | None = None
+
+
+def init_loop_monitor(interval: float = 0.25, slow_threshold: float = 0.2) -> LoopMonitor:
+    """创建并启动全局事件循环监控（需在事件循环中调用）"""
+    global _loop_monitor
+    if _loop_monitor is None:
+        _loop_monitor = LoopMonitor(interval, slow_threshold)
+        _loop_monitor.start()
+    return _loop_monitor
+
+
+def get_loop_monitor() -> LoopMonitor | None:
+    """获取全局事件循环监控（未启动时为 None）"""
+    return _loop_monitor
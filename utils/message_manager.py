@@ -7,11 +7,27 @@ import logging
 from enum import Enum
 
 from telegram.ext import ContextTypes
+from telegram.request import HTTPXRequest
+
+from utils.metrics import metrics
+from utils.tracing import span
 
 
 logger = logging.getLogger(__name__)
 
 
+class TracedHTTPXRequest(HTTPXRequest):
+    """Bot API 请求：每次调用记录一个 telegram.<方法> span，并按方法统计调用次数"""
+
+    async def do_request(self, url: str, method: str, request_data=None, **kwargs) -> tuple[int, bytes]:
+        # URL 形如 https://api.telegram.org/bot<token>/sendMessage，只取方法名
+        endpoint = url.rsplit("/", 1)[-1]
+        with span(f"telegram.{endpoint}"):
+            status, payload = await super().do_request(url, method, request_data, **kwargs)
+        metrics.inc("bot_telegram_requests_total", {"method": endpoint, "status": f"{status // 100}xx"})
+        return status, payload
+
+
 class MessageType(Enum):
     """消息类型枚举"""
     ERROR = "❌"           # 错误消息
@@ -0,0 +1,274 @@
+"""
+Prometheus 指标模块
+进程内维护计数器、直方图和仪表，通过独立端口的 HTTP /metrics 以 Prometheus 文本格式导出
+
+计数器和直方图在热路径上只做内存累加；队列深度、任务数、连接池等仪表由采集函数在抓取时读取，
+不增加平时的 Redis/MySQL 往返。
+"""
+
+import asyncio
+import bisect
+import logging
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+
+
+logger = logging.getLogger(__name__)
+
+# 默认直方图桶上界（秒），与命令耗时直方图的毫秒桶一致
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = tuple[tuple[str, str], ...]
+Sample = tuple[str, dict[str, str], float]
+Collector = Callable[[], Awaitable[list[Sample]]]
+
+
+def _label_key(labels: dict[str, str] | None) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: LabelKey | dict[str, str], extra: tuple[str, str] | None = None) -> str:
+    items = list(labels.items() if isinstance(labels, dict) else labels)
+    if extra:
+        items.append(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._help: dict[str, tuple[str, str]] = {}
+        self._counters: dict[str, dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._gauges: dict[str, dict[LabelKey, float]] = defaultdict(dict)
+        self._histograms: dict[str, dict[LabelKey, list]] = defaultdict(dict)
+        self._histogram_buckets: dict[str, tuple[float, ...]] = {}
+        self._collectors: list[Collector] = []
+
+    def describe(self, name: str, metric_type: str, help_text: str, buckets: tuple[float, ...] | None = None):
+        """
+        声明指标
+
+        Args:
+            name: 指标名称
+            metric_type: counter/gauge/histogram
+            help_text: 指标说明
+            buckets: 直方图桶上界（仅 histogram）
+        """
+        self._help[name] = (metric_type, help_text)
+        if metric_type == "histogram":
+            self._histogram_buckets[name] = tuple(buckets or DEFAULT_BUCKETS)
+
+    def inc(self, name: str, labels: dict[str, str] | None = None, amount: float = 1):
+        """计数器累加"""
+        self._counters[name][_label_key(labels)] += amount
+
+    def set(self, name: str, value: float, labels: dict[str, str] | None = None):
+        """设置仪表值"""
+        self._gauges[name][_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, labels: dict[str, str] | None = None):
+        """直方图记录一次观测值"""
+        buckets = self._histogram_buckets.get(name, DEFAULT_BUCKETS)
+        key = _label_key(labels)
+        series = self._histograms[name].get(key)
+        if series is None:
+            # [各桶计数..., 溢出桶, 总和]
+            series = self._histograms[name][key] = [0] * (len(buckets) + 1) + [0.0]
+        series[bisect.bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+    def register_collector(self, collector: Collector):
+        """注册抓取时调用的采集函数，返回 [(指标名, 标签, 值), ...]"""
+        self._collectors.append(collector)
+
+    async def _collect(self) -> dict[str, dict[LabelKey, float]]:
+        collected: dict[str, dict[LabelKey, float]] = defaultdict(dict)
+        results = await asyncio.gather(*(collector() for collector in self._collectors), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.debug(f"指标采集失败: {result}")
+                continue
+            for name, labels, value in result:
+                collected[name][_label_key(labels)] = value
+        return collected
+
+    def _header(self, name: str, default_type: str) -> list[str]:
+        metric_type, help_text = self._help.get(name, (default_type, ""))
+        lines = []
+        if help_text:
+            lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        return lines
+
+    async def render(self) -> str:
+        """以 Prometheus 文本格式导出全部指标"""
+        lines: list[str] = []
+
+        for name, series in sorted(self._counters.items()):
+            lines.extend(self._header(name, "counter"))
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        gauges: dict[str, dict[LabelKey, float]] = defaultdict(dict)
+        for name, series in self._gauges.items():
+            gauges[name].update(series)
+        for name, series in (await self._collect()).items():
+            gauges[name].update(series)
+        for name, series in sorted(gauges.items()):
+            lines.extend(self._header(name, "gauge"))
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name, histogram in sorted(self._histograms.items()):
+            lines.extend(self._header(name, "histogram"))
+            buckets = self._histogram_buckets.get(name, DEFAULT_BUCKETS)
+            for key, series in histogram.items():
+                cumulative = 0
+                for bound, count in zip((*buckets, float("inf")), series[:-1], strict=True):
+                    cumulative += count
+                    labels = _format_labels(key, ("le", _format_value(bound)))
+                    lines.append(f"{name}_bucket{labels} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(series[-1])}")
+                lines.append(f"{name}_count{_format_labels(key)} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """在独立端口上提供 /metrics 的极简 HTTP 服务（不依赖 webhook 监听器）"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "0.0.0.0", port: int = 9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self):
+        """开始监听"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"✅ 指标端点已启动: http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        """停止监听"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # 丢弃请求头
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+
+            parts = request_line.decode("latin-1").split()
+            path = parts[1].split("?", 1)[0] if len(parts) >= 2 else ""
+            if len(parts) >= 2 and parts[0] == "GET" and path == "/metrics":
+                status, content_type = "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+                body = (await self.registry.render()).encode("utf-8")
+            else:
+                status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"not found\n"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (TimeoutError, ConnectionError) as e:
+            logger.debug(f"指标请求处理失败: {e}")
+        except Exception as e:
+            logger.error(f"指标请求处理失败: {e}")
+        finally:
+            writer.close()
+
+
+def register_bot_collectors(bot_data: dict):
+    """
+    注册依赖运行时组件的采集函数（抓取时从 bot_data 读取，组件未初始化时跳过）
+
+    Args:
+        bot_data: Application.bot_data
+    """
+
+    async def collect_delete_queue() -> list[Sample]:
+        scheduler = bot_data.get("message_delete_scheduler")
+        if not scheduler:
+            return []
+        return [("bot_delete_queue_depth", {}, await scheduler.get_pending_deletions_count())]
+
+    async def collect_tasks() -> list[Sample]:
+        from utils.task_manager import get_task_manager
+
+        stats = get_task_manager().get_stats()
+        samples = [
+            ("bot_tasks", {"state": "running"}, stats["running_tasks"]),
+            ("bot_tasks", {"state": "completed"}, stats["completed_tasks"]),
+            ("bot_tasks", {"state": "cancelled"}, stats["cancelled_tasks"]),
+            ("bot_tasks", {"state": "failed"}, stats["failed_tasks"]),
+            ("bot_tasks_max", {}, stats["max_tasks"]),
+        ]
+        samples.extend(("bot_tasks_by_context", {"context": ctx}, n) for ctx, n in stats["context_breakdown"].items())
+        return samples
+
+    async def collect_db_pool() -> list[Sample]:
+        user_manager = bot_data.get("user_cache_manager")
+        pool = getattr(user_manager, "pool", None)
+        if pool is None:
+            return []
+        return [
+            ("bot_db_pool_connections", {"state": "used"}, pool.size - pool.freesize),
+            ("bot_db_pool_connections", {"state": "free"}, pool.freesize),
+            ("bot_db_pool_max_connections", {}, pool.maxsize),
+        ]
+
+    for collector in (collect_delete_queue, collect_tasks, collect_db_pool):
+        metrics.register_collector(collector)
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+metrics.describe("bot_commands_total", "counter", "Commands handled, by command and status")
+metrics.describe(
+    "bot_command_duration_seconds", "histogram", "Command handler duration in seconds", buckets=DEFAULT_BUCKETS
+)
+metrics.describe("bot_cache_requests_total", "counter", "RedisCacheManager lookups, by subdirectory and result")
+metrics.describe("bot_upstream_requests_total", "counter", "Upstream HTTP responses, by host and status class")
+metrics.describe("bot_upstream_errors_total", "counter", "Upstream HTTP transport errors, by host and error type")
+metrics.describe(
+    "bot_upstream_duration_seconds", "histogram", "Upstream HTTP request duration in seconds", buckets=DEFAULT_BUCKETS
+)
+metrics.describe("bot_telegram_requests_total", "counter", "Bot API calls, by method and status class")
+metrics.describe("bot_delete_queue_depth", "gauge", "Scheduled message deletions (ZCARD msg:delete:schedule)")
+metrics.describe("bot_tasks", "gauge", "TaskManager tracked tasks, by state")
+metrics.describe("bot_tasks_max", "gauge", "TaskManager task limit")
+metrics.describe("bot_tasks_by_context", "gauge", "TaskManager tracked tasks, by context")
+metrics.describe("bot_db_pool_connections", "gauge", "MySQL pool connections, by state")
+metrics.describe("bot_db_pool_max_connections", "gauge", "MySQL pool size limit")
+metrics.describe("bot_http_cache_requests_total", "counter", "Conditional HTTP cache lookups, by result")
+metrics.describe("bot_rate_limited_total", "counter", "Requests rejected by the rate limiter, by limiter name")
+metrics.describe("bot_rate_limit_fallback_total", "counter", "Rate limit checks served in-process because Redis failed")
+metrics.describe("bot_event_loop_lag_seconds", "gauge", "Event loop scheduling lag percentiles in seconds")
+metrics.describe("bot_event_loop_lag_max_seconds", "gauge", "Largest recent event loop scheduling lag in seconds")
+metrics.describe("bot_event_loop_stalls_total", "counter", "Event loop stalls longer than the slow-callback threshold")
+
+
+def get_metrics() -> MetricsRegistry:
+    """获取全局指标注册表"""
+    return metrics
@@ -1,9 +1,17 @@
 """
 MySQL 用户管理器
 保持与现有 UserCacheManager 相同的接口，底层改用 MySQL
+
+管理员、用户白名单和群组白名单集合常驻内存，权限检查不访问数据库；
+任一副本修改权限后通过 Redis pub/sub 通知所有副本重新加载，另有定时全量重载兜底。
+
+用户信息、命令统计和管理员日志采用延迟批量写入：按用户去重、跳过未变化的资料，
+定时或缓冲满时合并为多行 INSERT 一次写入，关闭时写完剩余数据。
 """
 
+import asyncio
 import logging
+import time
 from contextlib import asynccontextmanager
 
 from aiomysql import DictCursor, create_pool
@@ -11,6 +19,32 @@ from aiomysql import DictCursor, create_pool
 
 logger = logging.getLogger(__name__)
 
+# 权限变更通知频道
+PERMISSIONS_CHANNEL = "perm:changed"
+# 定时全量重载间隔（秒），防止错过通知
+PERMISSIONS_RELOAD_INTERVAL = 300
+
+# 资料未变化的用户至少间隔多久更新一次 last_seen（秒）
+USER_SEEN_REFRESH_INTERVAL = 3600
+# 数据库不可用时每类缓冲最多保留的行数（相对批量大小的倍数）
+MAX_BUFFER_BATCHES = 20
+
+# 时间列写入缓冲时的 Unix 时间戳，由 FROM_UNIXTIME 按会话时区转换，与数据库侧 NOW() 的语义一致
+_UPSERT_USERS_PREFIX = "INSERT INTO users (user_id, username, first_name, last_name, last_seen) VALUES "
+_USER_ROW = "(%s, %s, %s, %s, FROM_UNIXTIME(%s))"
+_UPSERT_USERS_SUFFIX = """ AS new_user
+    ON DUPLICATE KEY UPDATE
+        username = new_user.username,
+        first_name = new_user.first_name,
+        last_name = new_user.last_name,
+        last_seen = new_user.last_seen"""
+_INSERT_COMMANDS_PREFIX = "INSERT INTO command_stats (command, user_id, chat_id, chat_type, executed_at) VALUES "
+_COMMAND_ROW = "(%s, %s, %s, %s, FROM_UNIXTIME(%s))"
+_INSERT_ADMIN_LOGS_PREFIX = (
+    "INSERT INTO admin_logs (admin_id, action, target_type, target_id, details, created_at) VALUES "
+)
+_ADMIN_LOG_ROW = "(%s, %s, %s, %s, %s, FROM_UNIXTIME(%s))"
+
 
 class MySQLUserManager:
     """MySQL 用户管理器"""
@@ -25,6 +59,29 @@ class MySQLUserManager:
         self.pool = None
         self._connected = False
 
+        # 内存中的权限集合（启动时加载，变更时通过 Redis 通知重载）
+        self._super_admins: set[int] = set()
+        self._admins: set[int] = set()
+        self._whitelisted_users: set[int] = set()
+        self._whitelisted_groups: set[int] = set()
+        self._permissions_loaded = False
+        self._redis = None
+        self._permission_tasks: list[asyncio.Task] = []
+
+        # 延迟批量写入缓冲
+        self._pending_users: dict[int, tuple] = {}
+        self._pending_commands: list[tuple] = []
+        self._pending_admin_logs: list[tuple] = []
+        # 最近写入的用户资料及写入时间，用于跳过未变化的更新
+        self._written_profiles: dict[int, tuple[tuple, float]] = {}
+        self._flush_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        self._closing = False
+        self._flush_interval = 0.5
+        self._batch_size = 500
+        self.write_stats = {"buffered": 0, "skipped_unchanged": 0, "flushed_rows": 0, "flushes": 0, "dropped": 0}
+
     async def connect(self):
         """创建连接池"""
         try:
@@ -49,15 +106,37 @@ class MySQLUserManager:
             self._connected = True
             logger.info("✅ MySQL 连接池创建成功")
 
+            # 启动批量写入任务
+            self._flush_interval = config.db_write_flush_interval_ms / 1000
+            self._batch_size = max(1, config.db_write_batch_size)
+            self._closing = False
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
             # 初始化超级管理员（如果配置了）
             await self._init_super_admin()
 
+            # 加载权限集合到内存
+            await self.load_permissions()
+
         except Exception as e:
             logger.error(f"❌ MySQL 连接失败: {e}")
             raise
 
     async def close(self):
         """关闭连接池"""
+        for task in self._permission_tasks:
+            task.cancel()
+        self._permission_tasks.clear()
+
+        # 先让刷新循环完成当前这次写入后退出（取消会丢失已从缓冲取出的行），再写完剩余缓冲
+        if self._flush_task:
+            self._closing = True
+            self._flush_event.set()
+            await self._flush_task
+            self._flush_task = None
+        if self.pool and self._connected:
+            await self.flush()
+
         if self.pool:
             self.pool.close()
             await self.pool.wait_closed()
@@ -70,6 +149,82 @@ class MySQLUserManager:
         async with self.pool.acquire() as conn, conn.cursor(DictCursor) as cursor:
             yield cursor
 
+    async def load_permissions(self) -> bool:
+        """从数据库加载管理员和白名单集合（整体替换，检查方不会看到半更新状态）"""
+        if not self._connected:
+            return False
+
+        try:
+            async with self.get_cursor() as cursor:
+                await cursor.execute("SELECT user_id FROM super_admins")
+                super_admins = {row["user_id"] for row in await cursor.fetchall()}
+                await cursor.execute("SELECT user_id FROM admin_permissions")
+                admins = {row["user_id"] for row in await cursor.fetchall()}
+                await cursor.execute("SELECT user_id FROM user_whitelist")
+                whitelisted_users = {row["user_id"] for row in await cursor.fetchall()}
+                await cursor.execute("SELECT group_id FROM group_whitelist")
+                whitelisted_groups = {row["group_id"] for row in await cursor.fetchall()}
+
+            self._super_admins = super_admins
+            self._admins = admins
+            self._whitelisted_users = whitelisted_users
+            self._whitelisted_groups = whitelisted_groups
+            self._permissions_loaded = True
+            logger.debug(
+                f"权限集合已加载: 超级管理员 {len(super_admins)}, 管理员 {len(admins)}, "
+                f"白名单用户 {len(whitelisted_users)}, 白名单群组 {len(whitelisted_groups)}"
+            )
+            return True
+
+        except Exception as e:
+            logger.error(f"加载权限集合失败: {e}")
+            return False
+
+    def attach_redis(self, redis_client):
+        """订阅权限变更通知，并启动定时重载"""
+        self._redis = redis_client
+        self._permission_tasks = [
+            asyncio.create_task(self._listen_permission_changes()),
+            asyncio.create_task(self._periodic_permission_reload()),
+        ]
+        logger.info("✅ 权限缓存已启用 Redis 变更通知")
+
+    async def _notify_permission_change(self, kind: str):
+        """权限变更后通知所有副本重载"""
+        if not self._redis:
+            return
+        try:
+            await self._redis.publish(PERMISSIONS_CHANNEL, kind)
+        except Exception as e:
+            logger.warning(f"发布权限变更通知失败: {e}")
+
+    async def _listen_permission_changes(self):
+        """监听权限变更通知，连接中断后自动重连"""
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(PERMISSIONS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        logger.debug(f"收到权限变更通知: {message.get('data')}")
+                        await self.load_permissions()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"权限变更通知监听中断，5 秒后重连: {e}")
+                await asyncio.sleep(5)
+            finally:
+                try:
+                    await pubsub.reset()
+                except Exception:
+                    pass
+
+    async def _periodic_permission_reload(self):
+        """定时全量重载权限集合"""
+        while True:
+            await asyncio.sleep(PERMISSIONS_RELOAD_INTERVAL)
+            await self.load_permissions()
+
     async def _init_super_admin(self):
         """初始化超级管理员"""
         from utils.config_manager import get_config
@@ -94,36 +249,131 @@ class MySQLUserManager:
     async def update_user_cache(
         self, user_id: int, username: str | None = None, first_name: str | None = None, last_name: str | None = None
     ):
-        """更新用户缓存，保持与原接口相同"""
+        """更新用户缓存，保持与原接口相同（写入缓冲，由后台批量写入）"""
         if not self._connected:
             logger.warning("MySQL 未连接")
             return
 
-        try:
-            async with self.get_cursor() as cursor:
-                await cursor.execute(
-                    """
-                    INSERT INTO users (user_id, username, first_name, last_name, last_seen)
-                    VALUES (%s, %s, %s, %s, NOW()) AS new_user
-                    ON DUPLICATE KEY UPDATE
-                        username = new_user.username,
-                        first_name = new_user.first_name,
-                        last_name = new_user.last_name,
-                        last_seen = NOW()
-                """,
-                    (user_id, username, first_name, last_name),
-                )
+        profile = (username, first_name, last_name)
+        written = self._written_profiles.get(user_id)
+        if (
+            user_id not in self._pending_users
+            and written
+            and written[0] == profile
+            and time.monotonic() - written[1] < USER_SEEN_REFRESH_INTERVAL
+        ):
+            self.write_stats["skipped_unchanged"] += 1
+            return
+
+        # 同一用户只保留最新资料
+        self._pending_users[user_id] = (user_id, username, first_name, last_name, time.time())
+        self.write_stats["buffered"] += 1
+        if len(self._pending_users) >= self._batch_size:
+            self._flush_event.set()
+
+    def _buffer_row(self, buffer: list[tuple], row: tuple):
+        """追加一行到缓冲；数据库长时间不可用时丢弃最旧的行"""
+        buffer.append(row)
+        self.write_stats["buffered"] += 1
+        overflow = len(buffer) - self._batch_size * MAX_BUFFER_BATCHES
+        if overflow > 0:
+            del buffer[:overflow]
+            self.write_stats["dropped"] += overflow
+            logger.warning(f"写入缓冲已满，丢弃 {overflow} 行最旧的数据")
+        if len(buffer) >= self._batch_size:
+            self._flush_event.set()
+
+    async def _flush_loop(self):
+        """每隔刷新间隔或缓冲满时写入数据库"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), self._flush_interval)
+            except TimeoutError:
+                pass
+            self._flush_event.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"批量写入失败: {e}")
+
+    def _remember_written_profiles(self, user_rows: list[tuple]):
+        """记录已写入的用户资料，过多时清理过期记录"""
+        now = time.monotonic()
+        for row in user_rows:
+            self._written_profiles[row[0]] = (row[1:4], now)
+        if len(self._written_profiles) > 100_000:
+            self._written_profiles = {
+                user_id: entry
+                for user_id, entry in self._written_profiles.items()
+                if now - entry[1] < USER_SEEN_REFRESH_INTERVAL
+            }
+
+    async def _insert_rows(self, cursor, prefix: str, row_template: str, rows: list[tuple], suffix: str = ""):
+        """按批量大小拼接多行 VALUES 写入（executemany 只能合并纯占位符的行，含 FROM_UNIXTIME 时会逐行执行）"""
+        for i in range(0, len(rows), self._batch_size):
+            chunk = rows[i : i + self._batch_size]
+            params = [value for row in chunk for value in row]
+            await cursor.execute(prefix + ", ".join([row_template] * len(chunk)) + suffix, params)
+
+    async def flush(self) -> int:
+        """把缓冲中的用户信息、命令统计和管理员日志写入数据库，返回写入行数"""
+        async with self._flush_lock:
+            if not (self._pending_users or self._pending_commands or self._pending_admin_logs):
+                return 0
+
+            users, self._pending_users = self._pending_users, {}
+            commands, self._pending_commands = self._pending_commands, []
+            admin_logs, self._pending_admin_logs = self._pending_admin_logs, []
+            user_rows = list(users.values())
+            users_written = False
+            written = 0
 
-            logger.debug(f"用户缓存已更新: {user_id}")
+            try:
+                async with self.get_cursor() as cursor:
+                    # 多行 upsert：保留 "AS new_user" 别名写法
+                    await self._insert_rows(cursor, _UPSERT_USERS_PREFIX, _USER_ROW, user_rows, _UPSERT_USERS_SUFFIX)
+                    users_written = True
+                    written += len(user_rows)
 
-        except Exception as e:
-            logger.error(f"更新用户缓存失败: {e}")
+                    if commands:
+                        await self._insert_rows(cursor, _INSERT_COMMANDS_PREFIX, _COMMAND_ROW, commands)
+                        written += len(commands)
+                        commands = []
+
+                    if admin_logs:
+                        await self._insert_rows(cursor, _INSERT_ADMIN_LOGS_PREFIX, _ADMIN_LOG_ROW, admin_logs)
+                        written += len(admin_logs)
+                        admin_logs = []
+
+            except Exception as e:
+                logger.error(f"批量写入数据库失败，稍后重试: {e}")
+                # 放回未写入的数据（缓冲中更新的用户资料优先）
+                if not users_written:
+                    for row in user_rows:
+                        self._pending_users.setdefault(row[0], row)
+                self._pending_commands[:0] = commands
+                self._pending_admin_logs[:0] = admin_logs
+
+            if users_written:
+                self._remember_written_profiles(user_rows)
+            if not written:
+                return 0
+
+            self.write_stats["flushed_rows"] += written
+            self.write_stats["flushes"] += 1
+            logger.debug(f"批量写入完成: {written} 行")
+            return written
 
     async def get_user_from_cache(self, user_id: int) -> dict | None:
         """从缓存获取用户信息"""
         if not self._connected:
             return None
 
+        # 尚未写入数据库的最新资料
+        pending = self._pending_users.get(user_id)
+        if pending:
+            return {"user_id": user_id, "username": pending[1], "first_name": pending[2], "last_name": pending[3]}
+
         try:
             async with self.get_cursor() as cursor:
                 await cursor.execute(
@@ -141,6 +391,10 @@ class MySQLUserManager:
         if not self._connected:
             return None
 
+        for pending in self._pending_users.values():
+            if pending[1] == username:
+                return {"user_id": pending[0], "username": username, "first_name": pending[2], "last_name": pending[3]}
+
         try:
             async with self.get_cursor() as cursor:
                 await cursor.execute(
@@ -156,6 +410,9 @@ class MySQLUserManager:
     # 管理员相关方法
     async def is_admin(self, user_id: int) -> bool:
         """检查是否为管理员"""
+        if self._permissions_loaded:
+            return user_id in self._super_admins or user_id in self._admins
+
         if not self._connected:
             return False
 
@@ -176,6 +433,9 @@ class MySQLUserManager:
 
     async def is_super_admin(self, user_id: int) -> bool:
         """检查是否为超级管理员"""
+        if self._permissions_loaded:
+            return user_id in self._super_admins
+
         if not self._connected:
             return False
 
@@ -223,6 +483,8 @@ class MySQLUserManager:
                     "INSERT IGNORE INTO admin_permissions (user_id, granted_by) VALUES (%s, %s)", (user_id, granted_by)
                 )
 
+            self._admins.add(user_id)
+            await self._notify_permission_change("admin")
             logger.info(f"管理员已添加: {user_id}")
             return True
 
@@ -239,6 +501,8 @@ class MySQLUserManager:
             async with self.get_cursor() as cursor:
                 await cursor.execute("DELETE FROM admin_permissions WHERE user_id = %s", (user_id,))
 
+            self._admins.discard(user_id)
+            await self._notify_permission_change("admin")
             logger.info(f"管理员已移除: {user_id}")
             return True
 
@@ -249,6 +513,9 @@ class MySQLUserManager:
     # 白名单相关方法
     async def is_whitelisted(self, user_id: int) -> bool:
         """检查用户是否在白名单中"""
+        if self._permissions_loaded:
+            return user_id in self._whitelisted_users
+
         if not self._connected:
             return False
 
@@ -263,6 +530,9 @@ class MySQLUserManager:
 
     async def is_group_whitelisted(self, group_id: int) -> bool:
         """检查群组是否在白名单中"""
+        if self._permissions_loaded:
+            return group_id in self._whitelisted_groups
+
         if not self._connected:
             return False
 
@@ -290,6 +560,8 @@ class MySQLUserManager:
                     "INSERT IGNORE INTO user_whitelist (user_id, added_by) VALUES (%s, %s)", (user_id, added_by)
                 )
 
+            self._whitelisted_users.add(user_id)
+            await self._notify_permission_change("user_whitelist")
             logger.info(f"用户已添加到白名单: {user_id}")
             return True
 
@@ -306,6 +578,8 @@ class MySQLUserManager:
             async with self.get_cursor() as cursor:
                 await cursor.execute("DELETE FROM user_whitelist WHERE user_id = %s", (user_id,))
 
+            self._whitelisted_users.discard(user_id)
+            await self._notify_permission_change("user_whitelist")
             logger.info(f"用户已从白名单移除: {user_id}")
             return True
 
@@ -326,6 +600,8 @@ class MySQLUserManager:
                     (group_id, group_name, added_by),
                 )
 
+            self._whitelisted_groups.add(group_id)
+            await self._notify_permission_change("group_whitelist")
             logger.info(f"群组已添加到白名单: {group_id}")
             return True
 
@@ -342,6 +618,8 @@ class MySQLUserManager:
             async with self.get_cursor() as cursor:
                 await cursor.execute("DELETE FROM group_whitelist WHERE group_id = %s", (group_id,))
 
+            self._whitelisted_groups.discard(group_id)
+            await self._notify_permission_change("group_whitelist")
             logger.info(f"群组已从白名单移除: {group_id}")
             return True
 
@@ -381,19 +659,11 @@ class MySQLUserManager:
 
     # 统计相关方法
     async def log_command(self, command: str, user_id: int, chat_id: int, chat_type: str):
-        """记录命令使用情况"""
+        """记录命令使用情况（写入缓冲，由后台批量写入）"""
         if not self._connected:
             return
 
-        try:
-            async with self.get_cursor() as cursor:
-                await cursor.execute(
-                    "INSERT INTO command_stats (command, user_id, chat_id, chat_type) VALUES (%s, %s, %s, %s)",
-                    (command, user_id, chat_id, chat_type),
-                )
-
-        except Exception as e:
-            logger.error(f"记录命令失败: {e}")
+        self._buffer_row(self._pending_commands, (command, user_id, chat_id, chat_type, time.time()))
 
     async def log_admin_action(
         self,
@@ -403,17 +673,10 @@ class MySQLUserManager:
         target_id: int | None = None,
         details: str | None = None,
     ):
-        """记录管理员操作"""
+        """记录管理员操作（写入缓冲，由后台批量写入）"""
         if not self._connected:
             return
 
-        try:
-            async with self.get_cursor() as cursor:
-                await cursor.execute(
-                    "INSERT INTO admin_logs (admin_id, action, target_type, target_id, details) "
-                    "VALUES (%s, %s, %s, %s, %s)",
-                    (admin_id, action, target_type, target_id, details),
-                )
-
-        except Exception as e:
-            logger.error(f"记录管理员操作失败: {e}")
+        self._buffer_row(
+            self._pending_admin_logs, (admin_id, action, target_type, target_id, details, time.time())
+        )
@@ -0,0 +1,281 @@
+"""
+订阅价格数据集的紧凑列式表示
+
+将 Netflix / Spotify / Disney+ 等嵌套的字符串字典投影为定长类型列：
+国家、套餐、币种以 uint16 编号存储（字符串在全局标签表中驻留），
+本币价格与基准币种（CNY）价格以 float64 存储。排名和筛选可直接在列上进行，
+安装了 NumPy 时使用零拷贝视图做向量化计算，否则退化为纯 Python 实现。
+"""
+
+import logging
+import math
+import re
+from array import array
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+    logger.warning("NumPy not available, price columns will use pure Python fallbacks")
+
+# 基准币种：所有服务的 base_price 列均以此币种计价
+BASE_CURRENCY = "CNY"
+
+NAN = float("nan")
+
+# 不同数据源对同一国家使用的非标准代码（如 Netflix 使用 UK 表示英国）
+COUNTRY_CODE_ALIASES = {"UK": "GB"}
+
+
+class LabelTable:
+    """字符串驻留表：标签 <-> 紧凑整数编号"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.labels: list[str] = []
+        self._ids: dict[str, int] = {}
+
+    def intern(self, label: str) -> int:
+        """返回标签编号，不存在时分配新编号"""
+        label_id = self._ids.get(label)
+        if label_id is None:
+            if len(self.labels) >= 0xFFFF:
+                raise OverflowError(f"标签表 {self.name} 已满")
+            label_id = len(self.labels)
+            self.labels.append(label)
+            self._ids[label] = label_id
+        return label_id
+
+    def lookup(self, label: str) -> int | None:
+        """查找标签编号，不存在时返回 None"""
+        return self._ids.get(label)
+
+    def label(self, label_id: int) -> str:
+        return self.labels[label_id]
+
+    def matching(self, predicate: Callable[[str], bool]) -> list[int]:
+        """返回满足条件的所有标签编号"""
+        return [label_id for label_id, label in enumerate(self.labels) if predicate(label)]
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+
+# 全局标签表：跨服务共享，保证同一国家/币种在所有服务中编号一致
+COUNTRIES = LabelTable("country")
+PLANS = LabelTable("plan")
+CURRENCIES = LabelTable("currency")
+
+
+def parse_price(value: Any) -> float:
+    """把价格字段（数字或 "¥ 12.34" 之类的字符串）解析为浮点数，无法解析时返回 NaN"""
+    if value is None:
+        return NAN
+    if isinstance(value, int | float):
+        return float(value)
+    cleaned = re.sub(r"[^\d.]", "", str(value))
+    if not cleaned:
+        return NAN
+    try:
+        return float(cleaned)
+    except ValueError:
+        return NAN
+
+
+class PriceColumns:
+    """
+    一个数据集的列式快照
+
+    每一行对应 (国家, 套餐) 的一个价格；entry_ids 指回原始数据中的国家条目，
+    便于在排名后取回原始字段用于格式化输出。
+    """
+
+    __slots__ = (
+        "country_ids",
+        "plan_ids",
+        "currency_ids",
+        "local_prices",
+        "base_prices",
+        "entry_ids",
+        "entries",
+        "_distinct_plan_ids",
+    )
+
+    def __init__(self, entries: Sequence[Any] | None = None):
+        self.country_ids = array("H")
+        self.plan_ids = array("H")
+        self.currency_ids = array("H")
+        self.local_prices = array("d")
+        self.base_prices = array("d")
+        self.entry_ids = array("I")
+        self.entries: Sequence[Any] = entries or []
+        self._distinct_plan_ids: list[int] | None = None
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[tuple[int, str, str, float, str, float]], entries: Sequence[Any]
+    ) -> "PriceColumns":
+        """
+        从投影行构建列
+
+        Args:
+            rows: (条目下标, 国家代码, 套餐, 本币价格, 币种, 基准币种价格) 的可迭代对象
+            entries: 原始国家条目列表
+        """
+        columns = cls(entries)
+        for entry_id, country, plan, local_price, currency, base_price in rows:
+            country_code = country.upper()
+            columns.entry_ids.append(entry_id)
+            columns.country_ids.append(COUNTRIES.intern(COUNTRY_CODE_ALIASES.get(country_code, country_code)))
+            columns.plan_ids.append(PLANS.intern(plan))
+            columns.currency_ids.append(CURRENCIES.intern((currency or "").upper()))
+            columns.local_prices.append(local_price)
+            columns.base_prices.append(base_price)
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.base_prices)
+
+    @property
+    def nbytes(self) -> int:
+        """列数据占用的字节数（不含原始条目）"""
+        return sum(
+            col.itemsize * len(col)
+            for col in (
+                self.country_ids,
+                self.plan_ids,
+                self.currency_ids,
+                self.local_prices,
+                self.base_prices,
+                self.entry_ids,
+            )
+        )
+
+    def country(self, row: int) -> str:
+        return COUNTRIES.label(self.country_ids[row])
+
+    def plan(self, row: int) -> str:
+        return PLANS.label(self.plan_ids[row])
+
+    def currency(self, row: int) -> str:
+        return CURRENCIES.label(self.currency_ids[row])
+
+    def distinct_plan_ids(self) -> list[int]:
+        """本数据集中出现过的套餐编号"""
+        if self._distinct_plan_ids is None:
+            self._distinct_plan_ids = sorted(set(self.plan_ids))
+        return self._distinct_plan_ids
+
+    def entry(self, row: int) -> Any:
+        """返回该行对应的原始国家条目"""
+        return self.entries[self.entry_ids[row]]
+
+    def numpy(self) -> dict[str, Any] | None:
+        """返回各列的 NumPy 零拷贝视图；未安装 NumPy 时返回 None"""
+        if not NUMPY_AVAILABLE:
+            return None
+        return {
+            "country_ids": np.frombuffer(self.country_ids, dtype=np.uint16),
+            "plan_ids": np.frombuffer(self.plan_ids, dtype=np.uint16),
+            "currency_ids": np.frombuffer(self.currency_ids, dtype=np.uint16),
+            "local_prices": np.frombuffer(self.local_prices, dtype=np.float64),
+            "base_prices": np.frombuffer(self.base_prices, dtype=np.float64),
+            "entry_ids": np.frombuffer(self.entry_ids, dtype=np.dtype(f"u{self.entry_ids.itemsize}")),
+        }
+
+    def rank(
+        self, plan_ids: Iterable[int] | None = None, top_n: int | None = 10, distinct_countries: bool = True
+    ) -> list[int]:
+        """
+        按基准币种价格升序排名
+
+        Args:
+            plan_ids: 只保留这些套餐，None 表示不限
+            top_n: 返回的最大行数，None 表示全部
+            distinct_countries: 每个国家只保留最便宜的一行
+
+        Returns:
+            行号列表
+        """
+        return self.query(plan_ids=plan_ids, top_n=top_n, distinct_countries=distinct_countries)
+
+    def query(
+        self,
+        *,
+        plan_ids: Iterable[int] | None = None,
+        currency_ids: Iterable[int] | None = None,
+        country_ids: Iterable[int] | None = None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        descending: bool = False,
+        top_n: int | None = 10,
+        distinct_countries: bool = True,
+    ) -> list[int]:
+        """
+        筛选并按基准币种价格排序
+
+        编号过滤条件为 None 表示不限；传入空集合表示没有任何可匹配的取值（结果为空）。
+        distinct_countries 为 True 时每个国家只保留排序后的第一行。
+
+        Returns:
+            行号列表
+        """
+        plan_filter = set(plan_ids) if plan_ids is not None else None
+        currency_filter = set(currency_ids) if currency_ids is not None else None
+        country_filter = set(country_ids) if country_ids is not None else None
+
+        if NUMPY_AVAILABLE and len(self):
+            cols = self.numpy()
+            base = cols["base_prices"]
+            mask = ~np.isnan(base)
+            for name, id_filter in (
+                ("plan_ids", plan_filter),
+                ("currency_ids", currency_filter),
+                ("country_ids", country_filter),
+            ):
+                if id_filter is not None:
+                    wanted = np.fromiter(id_filter, dtype=np.uint16, count=len(id_filter))
+                    mask &= np.isin(cols[name], wanted)
+            if min_price is not None:
+                mask &= base >= min_price
+            if max_price is not None:
+                mask &= base <= max_price
+
+            candidates = np.flatnonzero(mask)
+            keys = -base[candidates] if descending else base[candidates]
+            order = candidates[np.argsort(keys, kind="stable")]
+            if distinct_countries and len(order):
+                _, first = np.unique(cols["country_ids"][order], return_index=True)
+                order = order[np.sort(first)]
+            if top_n is not None:
+                order = order[:top_n]
+            return order.tolist()
+
+        rows = [
+            row
+            for row in range(len(self))
+            if not math.isnan(self.base_prices[row])
+            and (plan_filter is None or self.plan_ids[row] in plan_filter)
+            and (currency_filter is None or self.currency_ids[row] in currency_filter)
+            and (country_filter is None or self.country_ids[row] in country_filter)
+            and (min_price is None or self.base_prices[row] >= min_price)
+            and (max_price is None or self.base_prices[row] <= max_price)
+        ]
+        rows.sort(key=self.base_prices.__getitem__, reverse=descending)
+        if distinct_countries:
+            seen: set[int] = set()
+            unique_rows = []
+            for row in rows:
+                if self.country_ids[row] not in seen:
+                    seen.add(self.country_ids[row])
+                    unique_rows.append(row)
+            rows = unique_rows
+        return rows if top_n is None else rows[:top_n]
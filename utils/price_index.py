@@ -0,0 +1,239 @@
+"""
+跨服务订阅价格索引
+
+把各订阅服务（Netflix / Spotify / Disney+）的列式数据合并为一张连接表：
+(服务, 套餐, 国家) -> 基准币种（CNY）价格。索引在任一服务数据集或汇率变化后自动重建，
+组合查询（如 "Netflix + Spotify + Disney+ 哪个国家最便宜"）只需在索引上计算一次。
+索引本身不访问上游；数据集由各服务的 load_or_fetch_data 提供，缓存为空时仍会下载。
+"""
+
+import logging
+import math
+from array import array
+from dataclasses import dataclass, field
+
+from utils.price_columns import NUMPY_AVAILABLE, PriceColumns, np
+from utils.price_query_service import PriceQueryService, get_price_services
+
+
+logger = logging.getLogger(__name__)
+
+# 命令中可用的服务别名 -> 服务注册键
+SERVICE_ALIASES = {
+    "nf": "netflix",
+    "netflix": "netflix",
+    "奈飞": "netflix",
+    "sp": "spotify",
+    "spotify": "spotify",
+    "ds": "disney_plus",
+    "disney": "disney_plus",
+    "disney+": "disney_plus",
+    "disneyplus": "disney_plus",
+    "disney_plus": "disney_plus",
+    "迪士尼": "disney_plus",
+}
+
+
+@dataclass
+class BundleSelection:
+    """组合中的一个服务及其套餐"""
+
+    service_key: str
+    plan_ids: list[int] | None
+
+
+@dataclass
+class BundleResult:
+    """某个国家的组合总价"""
+
+    country_id: int
+    total: float
+    # 每个服务一项：(服务键, 该服务在本国选中的行号)
+    rows: list[tuple[str, int]] = field(default_factory=list)
+
+
+class SubscriptionPriceIndex:
+    """跨服务价格连接表"""
+
+    def __init__(self):
+        self.service_keys: list[str] = []
+        self.service_ids = array("H")
+        self.plan_ids = array("H")
+        self.country_ids = array("H")
+        self.base_prices = array("d")
+        # 每行在所属服务列式数据中的行号，用于回查本币价格等明细
+        self.source_rows = array("I")
+
+        self._columns: dict[str, PriceColumns] = {}
+        self._version: tuple | None = None
+
+    def __len__(self) -> int:
+        return len(self.base_prices)
+
+    def columns_for(self, service_key: str) -> PriceColumns | None:
+        return self._columns.get(service_key)
+
+    async def refresh(self, services: dict[str, PriceQueryService] | None = None) -> bool:
+        """
+        从各服务的列式数据重建索引（数据未变化时直接返回）
+
+        Returns:
+            索引是否被重建
+        """
+        services = services if services is not None else get_price_services()
+        columns_by_service: dict[str, PriceColumns] = {}
+        for key, service in services.items():
+            columns = await service.get_columns()
+            if columns is not None and len(columns):
+                columns_by_service[key] = columns
+
+        version = tuple((key, id(columns)) for key, columns in sorted(columns_by_service.items()))
+        if version == self._version:
+            return False
+
+        service_keys: list[str] = []
+        service_ids = array("H")
+        plan_ids = array("H")
+        country_ids = array("H")
+        base_prices = array("d")
+        source_rows = array("I")
+
+        for service_id, (key, columns) in enumerate(sorted(columns_by_service.items())):
+            service_keys.append(key)
+            row_count = len(columns)
+            service_ids.extend([service_id] * row_count)
+            plan_ids.extend(columns.plan_ids)
+            country_ids.extend(columns.country_ids)
+            base_prices.extend(columns.base_prices)
+            source_rows.extend(range(row_count))
+
+        # 一次性替换，查询方不会看到半构建状态
+        self.service_keys = service_keys
+        self.service_ids = service_ids
+        self.plan_ids = plan_ids
+        self.country_ids = country_ids
+        self.base_prices = base_prices
+        self.source_rows = source_rows
+        self._columns = columns_by_service
+        self._version = version
+
+        logger.info(f"订阅价格索引已重建: {len(service_keys)} 个服务, {len(self)} 行")
+        return True
+
+    def cheapest_bundle(
+        self, selections: list[BundleSelection], country_ids: list[int] | None = None, top_n: int = 10
+    ) -> list[BundleResult]:
+        """
+        计算组合在每个国家的总价，返回最便宜的 top_n 个国家
+
+        每个服务在每个国家取所选套餐中的最低价；任一服务在某国无价格时该国不参与排名。
+        """
+        if not selections or not len(self):
+            return []
+
+        if NUMPY_AVAILABLE:
+            return self._cheapest_bundle_numpy(selections, country_ids, top_n)
+        return self._cheapest_bundle_python(selections, country_ids, top_n)
+
+    def _selection_mask(self, selection: BundleSelection, service_id: int):
+        service_ids = np.frombuffer(self.service_ids, dtype=np.uint16)
+        mask = (service_ids == service_id) & ~np.isnan(np.frombuffer(self.base_prices, dtype=np.float64))
+        if selection.plan_ids is not None:
+            wanted = np.array(selection.plan_ids, dtype=np.uint16)
+            mask &= np.isin(np.frombuffer(self.plan_ids, dtype=np.uint16), wanted)
+        return mask
+
+    def _cheapest_bundle_numpy(
+        self, selections: list[BundleSelection], country_ids: list[int] | None, top_n: int
+    ) -> list[BundleResult]:
+        countries = np.frombuffer(self.country_ids, dtype=np.uint16)
+        prices = np.frombuffer(self.base_prices, dtype=np.float64)
+        width = int(countries.max()) + 1
+
+        totals = np.zeros(width, dtype=np.float64)
+        chosen_rows = []
+        for selection in selections:
+            if selection.service_key not in self.service_keys:
+                return []
+            service_id = self.service_keys.index(selection.service_key)
+            candidates = np.flatnonzero(self._selection_mask(selection, service_id))
+
+            # 按 (国家, 价格, 行号) 排序，每个国家的第一行即最低价；同价时取行号最小者，与纯 Python 实现一致
+            candidates = candidates[np.lexsort((candidates, prices[candidates], countries[candidates]))]
+            candidate_countries, first = np.unique(countries[candidates], return_index=True)
+            best_price = np.full(width, np.inf)
+            best_row = np.full(width, -1, dtype=np.int64)
+            best_price[candidate_countries] = prices[candidates[first]]
+            best_row[candidate_countries] = candidates[first]
+
+            totals += best_price
+            chosen_rows.append((selection.service_key, best_row))
+
+        valid = np.isfinite(totals)
+        if country_ids is not None:
+            allowed = np.zeros(width, dtype=bool)
+            allowed[[cid for cid in country_ids if cid < width]] = True
+            valid &= allowed
+
+        ranked = np.flatnonzero(valid)
+        ranked = ranked[np.argsort(totals[ranked], kind="stable")][:top_n]
+
+        return [
+            BundleResult(
+                country_id=int(country_id),
+                total=float(totals[country_id]),
+                rows=[(key, int(self.source_rows[best_row[country_id]])) for key, best_row in chosen_rows],
+            )
+            for country_id in ranked
+        ]
+
+    def _cheapest_bundle_python(
+        self, selections: list[BundleSelection], country_ids: list[int] | None, top_n: int
+    ) -> list[BundleResult]:
+        allowed = set(country_ids) if country_ids is not None else None
+        per_service: list[tuple[str, dict[int, int]]] = []
+
+        for selection in selections:
+            if selection.service_key not in self.service_keys:
+                return []
+            service_id = self.service_keys.index(selection.service_key)
+            plan_filter = set(selection.plan_ids) if selection.plan_ids is not None else None
+
+            best: dict[int, int] = {}
+            for row in range(len(self)):
+                price = self.base_prices[row]
+                if self.service_ids[row] != service_id or math.isnan(price):
+                    continue
+                if plan_filter is not None and self.plan_ids[row] not in plan_filter:
+                    continue
+                country_id = self.country_ids[row]
+                if country_id not in best or price < self.base_prices[best[country_id]]:
+                    best[country_id] = row
+            per_service.append((selection.service_key, best))
+
+        common = set.intersection(*(set(best) for _, best in per_service))
+        if allowed is not None:
+            common &= allowed
+
+        results = [
+            BundleResult(
+                country_id=country_id,
+                total=sum(self.base_prices[best[country_id]] for _, best in per_service),
+                rows=[(key, self.source_rows[best[country_id]]) for key, best in per_service],
+            )
+            for country_id in common
+        ]
+        results.sort(key=lambda result: result.total)
+        return results[:top_n]
+
+
+# 全局索引实例
+_price_index: SubscriptionPriceIndex | None = None
+
+
+def get_price_index() -> SubscriptionPriceIndex:
+    """获取全局订阅价格索引"""
+    global _price_index
+    if _price_index is None:
+        _price_index = SubscriptionPriceIndex()
+    return _price_index
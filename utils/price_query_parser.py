@@ -0,0 +1,166 @@
+"""
+订阅价格查询小语言解析器
+
+示例：
+    /sp top 20 plan=individual currency=EUR region=asia
+    /nf top 5 plan=basic region=europe max=30
+    /ds bottom 10 plan=premium
+
+语法：
+    top N / bottom N          按基准币种（CNY）价格升序 / 降序取前 N 条
+    plan=a,b                  套餐（服务提供别名，plan=all 表示全部套餐）
+    currency=EUR,USD          本币币种
+    region=asia,europe        大区
+    country=US,TR             国家/地区代码
+    min=10 max=50             基准币种价格区间
+    sort=asc|desc             排序方向
+"""
+
+import re
+from dataclasses import dataclass, field
+
+from utils.country_data import REGION_ALIASES
+
+
+# 单次查询最多返回的条数，避免消息过长
+MAX_QUERY_RESULTS = 50
+
+_KEY_ALIASES = {
+    "plan": "plan",
+    "p": "plan",
+    "套餐": "plan",
+    "currency": "currency",
+    "cur": "currency",
+    "货币": "currency",
+    "币种": "currency",
+    "region": "region",
+    "r": "region",
+    "地区": "region",
+    "大区": "region",
+    "country": "country",
+    "cc": "country",
+    "国家": "country",
+    "min": "min",
+    "max": "max",
+    "sort": "sort",
+    "排序": "sort",
+}
+
+
+class PriceQuerySyntaxError(ValueError):
+    """查询语句无法解析"""
+
+
+@dataclass
+class PriceQuery:
+    """解析后的价格查询"""
+
+    top_n: int = 10
+    plans: list[str] = field(default_factory=list)
+    currencies: list[str] = field(default_factory=list)
+    regions: list[str] = field(default_factory=list)
+    countries: list[str] = field(default_factory=list)
+    min_price: float | None = None
+    max_price: float | None = None
+    descending: bool = False
+
+    @property
+    def all_plans(self) -> bool:
+        return any(plan.lower() == "all" for plan in self.plans)
+
+    def describe(self) -> str:
+        """生成查询条件的简短描述（用于结果标题）"""
+        parts = [f"{'最贵' if self.descending else '最低'} {self.top_n}"]
+        if self.plans:
+            parts.append(f"套餐={','.join(self.plans)}")
+        if self.currencies:
+            parts.append(f"币种={','.join(self.currencies)}")
+        if self.regions:
+            parts.append(f"地区={','.join(self.regions)}")
+        if self.countries:
+            parts.append(f"国家={','.join(self.countries)}")
+        if self.min_price is not None:
+            parts.append(f"≥¥{self.min_price:g}")
+        if self.max_price is not None:
+            parts.append(f"≤¥{self.max_price:g}")
+        return " ".join(parts)
+
+
+def is_price_query(args: list[str]) -> bool:
+    """判断命令参数是否为查询语句（而不是国家列表）"""
+    if not args:
+        return False
+    return bool(re.fullmatch(r"(top|bottom)\d*", args[0].lower())) or any("=" in arg for arg in args)
+
+
+def _split_values(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _parse_number(key: str, value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        raise PriceQuerySyntaxError(f"{key} 需要是数字: {value}") from None
+
+
+def parse_price_query(args: list[str]) -> PriceQuery:
+    """
+    解析查询参数
+
+    Raises:
+        PriceQuerySyntaxError: 语法错误或取值无效
+    """
+    query = PriceQuery()
+    tokens = list(args)
+    i = 0
+
+    while i < len(tokens):
+        token = tokens[i]
+        lowered = token.lower()
+
+        if lowered in ("top", "bottom"):
+            query.descending = lowered == "bottom"
+            if i + 1 < len(tokens) and tokens[i + 1].isdigit():
+                query.top_n = int(tokens[i + 1])
+                i += 1
+        elif match := re.fullmatch(r"(top|bottom)(\d+)", lowered):
+            # 兼容 top20 / bottom5 写法
+            query.descending = match.group(1) == "bottom"
+            query.top_n = int(match.group(2))
+        elif "=" in token:
+            raw_key, _, value = token.partition("=")
+            key = _KEY_ALIASES.get(raw_key.strip().lower())
+            if not key:
+                raise PriceQuerySyntaxError(f"未知的查询条件: {raw_key}")
+            if not value.strip():
+                raise PriceQuerySyntaxError(f"查询条件 {raw_key} 缺少取值")
+
+            if key == "plan":
+                query.plans.extend(_split_values(value))
+            elif key == "currency":
+                query.currencies.extend(v.upper() for v in _split_values(value))
+            elif key == "region":
+                for region in _split_values(value):
+                    region_key = REGION_ALIASES.get(region.lower())
+                    if not region_key:
+                        raise PriceQuerySyntaxError(f"未知的地区: {region}")
+                    query.regions.append(region_key)
+            elif key == "country":
+                query.countries.extend(v.upper() for v in _split_values(value))
+            elif key == "min":
+                query.min_price = _parse_number(raw_key, value)
+            elif key == "max":
+                query.max_price = _parse_number(raw_key, value)
+            elif key == "sort":
+                if value.lower() not in ("asc", "desc"):
+                    raise PriceQuerySyntaxError("sort 只支持 asc 或 desc")
+                query.descending = value.lower() == "desc"
+        else:
+            raise PriceQuerySyntaxError(f"无法识别的查询参数: {token}")
+        i += 1
+
+    if not 1 <= query.top_n <= MAX_QUERY_RESULTS:
+        raise PriceQuerySyntaxError(f"结果数量需在 1 到 {MAX_QUERY_RESULTS} 之间")
+
+    return query
@@ -1,8 +1,11 @@
 # utils/price_query_service.py
 
+import asyncio
 import logging
+import math
 import time
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
 from datetime import datetime
 from typing import Any
 
@@ -10,19 +13,68 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 # Note: CacheManager import removed - now uses injected Redis cache manager
-from utils.formatter import escape_v2, foldable_text_v2
+from utils.config_manager import get_config
+from utils.country_data import REGION_COUNTRIES, SUPPORTED_COUNTRIES, get_country_flag
+from utils.formatter import escape_v2, foldable_text_v2, foldable_text_with_markdown_v2
 from utils.message_manager import delete_user_command, send_error, send_search_result, send_success
+from utils.price_columns import COUNTRIES, COUNTRY_CODE_ALIASES, CURRENCIES, PLANS, PriceColumns
+from utils.price_query_parser import PriceQuery, PriceQuerySyntaxError, is_price_query, parse_price_query
 from utils.rate_converter import RateConverter
 
 
 logger = logging.getLogger(__name__)
 
+# 刷新失败后的重试间隔（秒），避免上游故障时每条命令都触发一次下载
+REFRESH_RETRY_BACKOFF = 300
+# 内存数据过期后重新读取 Redis 副本的最小间隔（秒）
+CACHE_RECHECK_INTERVAL = 60
+
+# 已注册的价格服务，键为缓存子目录（如 "netflix"、"spotify"、"disney_plus"）
+_price_services: dict[str, "PriceQueryService"] = {}
+
+
+def get_price_service(key: str) -> "PriceQueryService | None":
+    """按缓存子目录获取已注册的价格服务"""
+    return _price_services.get(key)
+
+
+def get_price_services() -> dict[str, "PriceQueryService"]:
+    """获取所有已注册的价格服务"""
+    return dict(_price_services)
+
+
+def rank_emoji(idx: int) -> str:
+    """排名序号对应的表情（1-3 为奖牌，4-10 为数字表情）"""
+    rank_emojis = ["🥇", "🥈", "🥉", "4️⃣", "5️⃣", "6️⃣", "7️⃣", "8️⃣", "9️⃣", "🔟"]
+    return rank_emojis[idx - 1] if idx <= len(rank_emojis) else f"{idx}."
+
+
+async def warm_up_price_services():
+    """预热所有已注册服务的数据集（后台执行，不阻塞启动）"""
+    services = list(_price_services.values())
+    results = await asyncio.gather(*(service.load_or_fetch_data() for service in services), return_exceptions=True)
+    for service, result in zip(services, results, strict=True):
+        if isinstance(result, Exception):
+            logger.warning(f"预热 {service.service_name} 数据失败: {result}")
+        elif service.data:
+            logger.info(f"✅ {service.service_name} 数据已预热")
+
 
 class PriceQueryService(ABC):
     """
     Abstract base class for services that query prices, cache them, and format them for Telegram.
+
+    Datasets are refreshed in the background (scheduled via RedisTaskScheduler or triggered when the
+    in-memory copy goes stale); user commands only wait for a download when no copy exists at all.
     """
 
+    # 新数据集至少需要这么多条可解析的比较价格才会替换旧数据
+    min_valid_entries: int = 5
+    # 列式投影是否依赖汇率（基准币种价格需要换算时为 True）
+    columns_require_rates: bool = False
+    # 查询语言中 plan= 的别名 -> 套餐名称（优先完全匹配，否则按子串匹配）
+    PLAN_ALIASES: dict[str, tuple[str, ...]] = {}
+
     def __init__(
         self,
         service_name: str,
@@ -30,6 +82,7 @@ class PriceQueryService(ABC):
         rate_converter: RateConverter,
         cache_duration_seconds: int = 4 * 3600,
         subdirectory: str | None = None,
+        refresh_interval_seconds: int | None = None,
     ):
         self.service_name = service_name
         self.cache_manager = cache_manager
@@ -37,13 +90,29 @@ class PriceQueryService(ABC):
         self.cache_duration = cache_duration_seconds
         self.subdirectory = subdirectory
         self.cache_key = f"{service_name.lower().replace(' ', '_')}_prices"
+        self.refresh_interval = refresh_interval_seconds or get_config().dataset_refresh_interval
 
         self.data: Any = None
         self.cache_timestamp: int = 0
         self.country_mapping: dict[str, Any] = {}
 
+        self._refresh_lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+        self._last_refresh_attempt: float = 0
+        self._last_cache_check: float = 0
+
+        self._columns: PriceColumns | None = None
+        self._columns_key: tuple | None = None
+
+        _price_services[self.registry_key] = self
+
+    @property
+    def registry_key(self) -> str:
+        """服务注册键，同时用作调度任务的标识"""
+        return self.subdirectory or self.cache_key
+
     @abstractmethod
-    async def _fetch_data(self, context: ContextTypes.DEFAULT_TYPE) -> Any:
+    async def _fetch_data(self, context: ContextTypes.DEFAULT_TYPE | None) -> Any:
         """
         Fetches the raw data for the service from the network.
         Must be implemented by subclasses.
@@ -82,47 +151,264 @@ class PriceQueryService(ABC):
         """
         pass
 
-    async def load_or_fetch_data(self, context: ContextTypes.DEFAULT_TYPE):
+    def _is_stale(self, timestamp: float) -> bool:
+        """数据是否超过刷新间隔（或缓存有效期）"""
+        return time.time() - timestamp >= min(self.cache_duration, self.refresh_interval)
+
+    def _iter_price_rows(
+        self, items: list[tuple[str | None, Any]]
+    ) -> Iterable[tuple[int, str, str, float, str, float]]:
         """
-        Loads data from cache or fetches new data from the network.
-        This is a generic implementation that should work for most services.
+        Projects the dataset items ((key, entry) pairs) into rows of
+        (entry index, country code, plan, local price, currency, base-currency price).
+        Subclasses implement this to enable columnar rankings.
         """
+        return ()
+
+    def _is_comparison_plan(self, plan: str) -> bool:
+        """排名默认使用的套餐（与 _extract_comparison_price 保持一致）"""
+        return False
+
+    def comparison_plan_ids(self) -> list[int]:
+        """默认排名套餐在全局标签表中的编号"""
+        return PLANS.matching(self._is_comparison_plan)
+
+    async def get_columns(self) -> PriceColumns | None:
+        """
+        Returns the columnar projection of the current dataset, rebuilding it lazily
+        when the dataset (or the exchange rates it depends on) changed.
+        """
+        if not self.data:
+            return None
+
+        if self.columns_require_rates and not self.rate_converter.rates:
+            await self.rate_converter.get_rates()
+
+        key = (self.cache_timestamp, id(self.data), self.rate_converter.rates_timestamp)
+        if self._columns is None or self._columns_key != key:
+            items = self._dataset_items(self.data)
+            self._columns = PriceColumns.from_rows(self._iter_price_rows(items), [entry for _, entry in items])
+            self._columns_key = key
+            logger.debug(f"{self.service_name} 列式数据已构建: {len(self._columns)} 行, {self._columns.nbytes} 字节")
+        return self._columns
+
+    def _dataset_items(self, data: Any) -> list[tuple[str | None, Any]]:
+        """返回数据集中的 (键, 国家条目) 列表，跳过以下划线开头的元数据键；列表型数据集的键为 None"""
+        if isinstance(data, dict):
+            return [(key, value) for key, value in data.items() if not str(key).startswith("_")]
+        if isinstance(data, list):
+            return [(None, value) for value in data]
+        return []
+
+    def _validate_data(self, data: Any) -> bool:
+        """
+        Checks that freshly fetched data parses before it replaces the current dataset.
+        Subclasses may override for stricter checks.
+        """
+        valid = 0
+        for _, entry in self._dataset_items(data):
+            try:
+                if isinstance(entry, dict) and self._extract_comparison_price(entry) is not None:
+                    valid += 1
+            except Exception:
+                continue
+        if valid < self.min_valid_entries:
+            logger.warning(
+                f"{self.service_name} 新数据校验失败：仅 {valid} 条有效价格（至少需要 {self.min_valid_entries} 条）"
+            )
+            return False
+        return True
+
+    def _swap_data(self, data: Any, timestamp: float):
+        """原子替换内存中的数据集及其索引（同步执行，期间不会让出事件循环）"""
+        self.data = data
+        self.cache_timestamp = int(timestamp)
+        self.country_mapping = self._init_country_mapping()
+        self._columns = None
+
+    async def _load_from_cache(self) -> bool:
+        """从 Redis 读取数据集（不检查过期，过期数据仍可作为旧版本使用）"""
+        self._last_cache_check = time.time()
         cached_data = await self.cache_manager.load_cache(
-            self.cache_key, max_age_seconds=self.cache_duration, subdirectory=self.subdirectory
+            self.cache_key, max_age_seconds=None, subdirectory=self.subdirectory
         )
+        if not cached_data:
+            return False
+
+        timestamp = await self.cache_manager.get_cache_timestamp(self.cache_key, subdirectory=self.subdirectory)
+        if self.data and timestamp and timestamp <= self.cache_timestamp:
+            return True
+
+        self._swap_data(cached_data, timestamp or 0)
+        logger.info(f"Loaded {self.service_name} data from cache.")
+        return True
+
+    async def refresh_data(self, context: ContextTypes.DEFAULT_TYPE | None = None, force: bool = False) -> bool:
+        """
+        Fetches, validates and swaps in a new dataset. The current dataset is kept if the
+        download or validation fails. Concurrent callers share a single download.
+
+        Returns:
+            True if usable data is available after the call.
+        """
+        async with self._refresh_lock:
+            if not force and self.data and not self._is_stale(self.cache_timestamp):
+                return True
+
+            self._last_refresh_attempt = time.time()
+            logger.info(f"Refreshing {self.service_name} data from network...")
+            try:
+                fetched_data = await self._fetch_data(context)
+            except Exception as e:
+                logger.error(f"Error fetching {self.service_name} data: {e}")
+                fetched_data = None
+
+            if not fetched_data or not self._validate_data(fetched_data):
+                logger.error(f"Failed to refresh {self.service_name} data, keeping the current version.")
+                return bool(self.data)
+
+            await self.cache_manager.save_cache(self.cache_key, fetched_data, subdirectory=self.subdirectory)
+            self._swap_data(fetched_data, time.time())
+            logger.info(f"Fetched {self.service_name} data from network and cached successfully.")
+            return True
+
+    def schedule_refresh(self, force: bool = False):
+        """在后台刷新数据集（同一时间只运行一个刷新任务）"""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        if not force and time.time() - self._last_refresh_attempt < REFRESH_RETRY_BACKOFF:
+            return
 
-        if cached_data:
-            self.data = cached_data
-            self.cache_timestamp = await self.cache_manager.get_cache_timestamp(
-                self.cache_key, subdirectory=self.subdirectory
+        from utils.task_manager import create_task
+
+        try:
+            self._refresh_task = create_task(
+                self.refresh_data(force=force), name=f"refresh_{self.registry_key}", context="dataset_refresh"
             )
-            logger.info(f"Loaded {self.service_name} data from cache.")
-        else:
-            logger.info(f"{self.service_name} cache is stale or non-existent. Fetching from network...")
-            fetched_data = await self._fetch_data(context)
-            if fetched_data:
-                self.data = fetched_data
-                await self.cache_manager.save_cache(self.cache_key, fetched_data, subdirectory=self.subdirectory)
-                self.cache_timestamp = int(time.time())
-                logger.info(f"Fetched {self.service_name} data from network and cached successfully.")
-            else:
-                logger.error(
-                    f"Failed to fetch {self.service_name} data from network. Attempting to load expired cache as fallback."
-                )
-                expired_cache = await self.cache_manager.load_cache(
-                    self.cache_key, max_age_seconds=None, subdirectory=self.subdirectory
-                )
-                if expired_cache:
-                    self.data = expired_cache
-                    self.cache_timestamp = await self.cache_manager.get_cache_timestamp(
-                        self.cache_key, subdirectory=self.subdirectory
-                    )
-                    logger.warning(f"Loaded expired {self.service_name} cache as fallback.")
-                else:
-                    logger.critical(f"Could not load any {self.service_name} data (neither fresh nor expired cache).")
+        except RuntimeError as e:
+            logger.warning(f"无法调度 {self.service_name} 后台刷新: {e}")
+
+    async def load_or_fetch_data(self, context: ContextTypes.DEFAULT_TYPE | None = None):
+        """
+        Makes sure a dataset is available without blocking on the network when possible.
+
+        Order: fresh in-memory copy -> Redis copy (any age) -> network. Stale copies are served
+        immediately while a background refresh runs; only a cold start waits for the download.
+        """
+        if self.data and not self._is_stale(self.cache_timestamp):
+            return
+
+        if self.data and time.time() - self._last_cache_check < CACHE_RECHECK_INTERVAL:
+            self.schedule_refresh()
+            return
+
+        await self._load_from_cache()
 
         if self.data:
-            self.country_mapping = self._init_country_mapping()
+            if self._is_stale(self.cache_timestamp):
+                logger.info(f"{self.service_name} data is stale, refreshing in background.")
+                self.schedule_refresh()
+            return
+
+        logger.info(f"{self.service_name} has no cached data. Fetching from network...")
+        if not await self.refresh_data(context):
+            logger.critical(f"Could not load any {self.service_name} data (neither cache nor network).")
+
+    def resolve_plan_ids(self, columns: PriceColumns, terms: list[str]) -> list[int] | None:
+        """把 plan= 条件解析为套餐编号；未指定时使用默认排名套餐，plan=all 返回 None（不限）"""
+        if not terms:
+            return self.comparison_plan_ids()
+        if any(term.lower() == "all" for term in terms):
+            return None
+
+        own_plan_ids = columns.distinct_plan_ids()
+        plan_ids: set[int] = set()
+        for term in terms:
+            patterns = [pattern.lower() for pattern in self.PLAN_ALIASES.get(term.lower(), (term,))]
+            exact = [plan_id for plan_id in own_plan_ids if PLANS.label(plan_id).lower() in patterns]
+            plan_ids.update(
+                exact
+                or [
+                    plan_id
+                    for plan_id in own_plan_ids
+                    if any(pattern in PLANS.label(plan_id).lower() for pattern in patterns)
+                ]
+            )
+        return sorted(plan_ids)
+
+    @staticmethod
+    def _resolve_country_ids(query: PriceQuery) -> list[int] | None:
+        """把 region= / country= 条件解析为国家编号（两者同时指定时取交集）"""
+        if not query.regions and not query.countries:
+            return None
+
+        selected: set[str] | None = None
+        if query.regions:
+            selected = {code for region in query.regions for code in REGION_COUNTRIES.get(region, [])}
+        if query.countries:
+            requested = {COUNTRY_CODE_ALIASES.get(code, code) for code in query.countries}
+            selected = requested if selected is None else selected & requested
+
+        return [country_id for code in selected if (country_id := COUNTRIES.lookup(code)) is not None]
+
+    async def run_price_query(self, args: list[str]) -> str:
+        """
+        Evaluates a query-language request (e.g. ``top 20 plan=individual currency=EUR region=asia``)
+        against the columnar dataset.
+
+        Raises:
+            PriceQuerySyntaxError: if the query cannot be parsed
+        """
+        query = parse_price_query(args)
+        columns = await self.get_columns()
+        if not columns:
+            return foldable_text_v2(f"❌ 错误：未能加载 {self.service_name} 价格数据。请稍后再试或检查日志。")
+
+        currency_ids = None
+        if query.currencies:
+            currency_ids = [
+                currency_id for code in query.currencies if (currency_id := CURRENCIES.lookup(code)) is not None
+            ]
+
+        plan_ids = self.resolve_plan_ids(columns, query.plans)
+        rows = columns.query(
+            plan_ids=plan_ids,
+            currency_ids=currency_ids,
+            country_ids=self._resolve_country_ids(query),
+            min_price=query.min_price,
+            max_price=query.max_price,
+            descending=query.descending,
+            top_n=query.top_n,
+            distinct_countries=plan_ids is not None and len(query.plans) <= 1,
+        )
+        return self._format_query_result(columns, rows, query)
+
+    def _format_query_result(self, columns: PriceColumns, rows: list[int], query: PriceQuery) -> str:
+        """格式化查询语言的结果"""
+        lines = [f"*📊 {self.service_name} 价格查询*", f"🔎 条件：{query.describe()}", ""]
+
+        if not rows:
+            lines.append("未找到符合条件的价格信息。")
+
+        for idx, row in enumerate(rows, 1):
+            country_code = columns.country(row)
+            country_name = SUPPORTED_COUNTRIES.get(country_code, {}).get("name", country_code)
+            local_price = columns.local_prices[row]
+            local_text = "N/A" if math.isnan(local_price) else f"{local_price:,.2f}"
+
+            lines.append(f"{rank_emoji(idx)} {country_name} ({country_code}) {get_country_flag(country_code)}")
+            lines.append(
+                f"💰 {columns.plan(row)}: {local_text} {columns.currency(row)} ≈ ¥{columns.base_prices[row]:.2f}"
+            )
+            if idx < len(rows):
+                lines.append("")
+
+        if self.cache_timestamp:
+            update_time_str = datetime.fromtimestamp(self.cache_timestamp).strftime("%Y-%m-%d %H:%M:%S")
+            lines.append("")
+            lines.append(f"⏱ 数据更新时间 (缓存)：{update_time_str}")
+
+        return foldable_text_with_markdown_v2("\n".join(lines).strip())
 
     async def query_prices(self, query_list: list[str]) -> str:
         """
@@ -213,6 +499,18 @@ class PriceQueryService(ABC):
 
             if not context.args:
                 result = await self.get_top_cheapest()
+            elif is_price_query(context.args):
+                try:
+                    result = await self.run_price_query(context.args)
+                except PriceQuerySyntaxError as e:
+                    await send_error(
+                        context,
+                        update.message.chat_id,
+                        escape_v2(f"❌ 查询语法错误: {e}\n示例: top 20 plan=family currency=EUR region=asia"),
+                        parse_mode="MarkdownV2",
+                    )
+                    await delete_user_command(context, update.message.chat_id, update.message.message_id)
+                    return
             else:
                 result = await self.query_prices(context.args)
 
@@ -231,7 +529,9 @@ class PriceQueryService(ABC):
 
         try:
             await self.cache_manager.clear_cache(key=self.cache_key, subdirectory=self.subdirectory)
-            await send_success(context, update.message.chat_id, escape_v2(f"✅ {self.service_name} 缓存已清理。"), parse_mode="MarkdownV2")
+            # 内存中的旧数据继续提供服务，直到后台刷新成功
+            self.schedule_refresh(force=True)
+            await send_success(context, update.message.chat_id, escape_v2(f"✅ {self.service_name} 缓存已清理，正在后台刷新数据。"), parse_mode="MarkdownV2")
             await delete_user_command(context, update.message.chat_id, update.message.message_id)
         except Exception as e:
             logger.error(f"Error clearing {self.service_name} cache: {e}")
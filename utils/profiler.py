@@ -0,0 +1,174 @@
+"""
+进程内采样分析器
+后台线程定时读取 sys._current_frames()，按调用栈累计采样次数，输出 collapsed stack 格式
+（每行 "帧;帧;帧 次数"，可直接交给 flamegraph.pl 或 speedscope 生成火焰图）。
+采样期间同时开启 tracemalloc，结束时给出按分配位置汇总的内存增量。
+
+采样线程不注入事件循环，对被分析的代码几乎没有影响；tracemalloc 有一定开销，只在采样窗口内开启。
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+
+
+logger = logging.getLogger(__name__)
+
+# 事件循环空闲等待时的栈顶函数，不计入热点统计
+_IDLE_FUNCTIONS = {"select", "poll", "epoll", "_run_once", "wait", "_worker"}
+
+
+@dataclass
+class ProfileResult:
+    """一次采样的结果"""
+
+    duration: float
+    samples: int
+    collapsed: str
+    top_functions: list[tuple[str, int]]
+    allocations: str | None
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    # 项目内文件显示相对路径，第三方库只显示包内路径
+    if filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """基于线程的栈采样器"""
+
+    def __init__(self, interval: float = 0.005, all_threads: bool = False):
+        """
+        Args:
+            interval: 采样间隔（秒）
+            all_threads: 是否采样所有线程，默认只采样事件循环所在线程
+        """
+        self.interval = interval
+        self.all_threads = all_threads
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._target_thread_id = threading.get_ident()
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        frames = sys._current_frames()
+        for thread_id, frame in frames.items():
+            if thread_id == own_id or (not self.all_threads and thread_id != self._target_thread_id):
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if not stack:
+                continue
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    def run(self, duration: float):
+        """在当前线程中采样 duration 秒（阻塞，应在工作线程中调用）"""
+        deadline = time.monotonic() + duration
+        while not self._stop_event.is_set() and time.monotonic() < deadline:
+            self._sample()
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def collapsed(self) -> str:
+        """collapsed stack 格式的结果"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def top_functions(self, limit: int = 15) -> list[tuple[str, int]]:
+        """按栈顶帧（自身耗时）统计的热点函数，忽略空闲等待"""
+        self_time: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            if leaf.split(" ", 1)[0] in _IDLE_FUNCTIONS:
+                continue
+            self_time[leaf] += count
+        return self_time.most_common(limit)
+
+
+def _format_allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int = 25) -> str:
+    # 排除采样器自身的分配
+    own_filters = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(own_filters).compare_to(before.filter_traces(own_filters), "lineno")
+    lines = [f"Top {limit} allocation sites by growth during the profile window", ""]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        lines.append(
+            f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  "
+            f"{frame.filename}:{frame.lineno} (now {stat.size / 1024:.1f} KiB)"
+        )
+    current, peak = tracemalloc.get_traced_memory()
+    lines.extend(["", f"traced memory: current {current / 1024 / 1024:.1f} MiB, peak {peak / 1024 / 1024:.1f} MiB"])
+    return "\n".join(lines) + "\n"
+
+
+_profile_lock = asyncio.Lock()
+
+
+def is_profiling() -> bool:
+    """是否已有采样在进行"""
+    return _profile_lock.locked()
+
+
+async def profile(duration: float, interval: float = 0.005, trace_memory: bool = True) -> ProfileResult:
+    """
+    对当前进程采样 duration 秒（同一时间只允许一个采样）
+
+    Args:
+        duration: 采样时长（秒）
+        interval: 采样间隔（秒）
+        trace_memory: 是否同时记录内存分配
+
+    Returns:
+        ProfileResult
+    """
+    async with _profile_lock:
+        profiler = SamplingProfiler(interval)
+
+        started_tracemalloc = False
+        before = None
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracemalloc = True
+            before = tracemalloc.take_snapshot()
+
+        start = time.monotonic()
+        try:
+            await asyncio.to_thread(profiler.run, duration)
+            allocations = None
+            if before is not None:
+                after = tracemalloc.take_snapshot()
+                allocations = await asyncio.to_thread(_format_allocations, before, after)
+        finally:
+            profiler.stop()
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+        elapsed = time.monotonic() - start
+        logger.info(f"采样完成: {elapsed:.1f}s, {profiler.samples} 次采样, {len(profiler.stacks)} 个不同调用栈")
+        return ProfileResult(
+            duration=elapsed,
+            samples=profiler.samples,
+            collapsed=profiler.collapsed(),
+            top_functions=profiler.top_functions(),
+            allocations=allocations,
+        )
@@ -4,6 +4,8 @@ import time
 
 import httpx
 
+from utils.tracing import span
+
 
 # Note: CacheManager import removed - now uses injected cache manager from main.py
 
@@ -99,7 +101,8 @@ class RateConverter:
         """Converts an amount from one currency to another."""
         # 快速检查数据可用性，如果数据太旧才加载
         if not await self.is_data_available():
-            await self.get_rates()  # Ensure rates are loaded
+            with span("rate.load"):
+                await self.get_rates()  # Ensure rates are loaded
 
         from_currency = from_currency.upper()
         to_currency = to_currency.upper()
@@ -0,0 +1,161 @@
+"""
+分布式速率限制器
+
+基于 GCRA（通用信元速率算法）：每个键只保存一个"理论到达时间"（TAT），
+检查和更新在一个 Lua 脚本中完成，一次往返即可同时检查多个限制（如用户+群组+命令、用户全局），
+多个副本共享 Redis 中的状态。Redis 不可用时退化为进程内的同一算法。
+"""
+
+import logging
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from utils.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ratelimit:"
+
+# 同时检查多个 GCRA 限制，全部通过才更新；使用 Redis 服务器时间，避免副本间时钟偏差
+# KEYS[i] = 限制键；ARGV[2i-1] = 发射间隔（毫秒），ARGV[2i] = 时间窗口（毫秒）
+# 返回 0 表示允许，否则返回需要等待的毫秒数
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local new_tats = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local emission = tonumber(ARGV[i * 2 - 1])
+    local window = tonumber(ARGV[i * 2])
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + emission
+    local allow_at = new_tat - window
+    if allow_at > now then
+        retry_after = math.max(retry_after, allow_at - now)
+    end
+    new_tats[i] = new_tat
+end
+if retry_after > 0 then
+    return math.ceil(retry_after)
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, new_tats[i], 'PX', math.ceil(new_tats[i] - now))
+end
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """一个限制：键在 window 秒内最多 max_calls 次"""
+
+    key: str
+    max_calls: int
+    window: float
+
+    @property
+    def emission_ms(self) -> float:
+        return self.window * 1000 / self.max_calls
+
+
+class RedisRateLimiter:
+    """Redis GCRA 速率限制器（带进程内降级）"""
+
+    def __init__(self, redis_client: redis.Redis | None = None):
+        self.redis = redis_client
+        self._script = redis_client.register_script(GCRA_SCRIPT) if redis_client else None
+        # 进程内降级状态：键 -> (TAT 毫秒, 过期时间)
+        self._local_tats: dict[str, tuple[float, float]] = {}
+        self._last_cleanup = time.time()
+        self.stats = {"allowed": 0, "throttled": 0, "fallback": 0}
+        # 各命令被限流的次数
+        self.throttled_by_name: Counter[str] = Counter()
+
+    async def check(self, limits: list[RateLimit], name: str = "") -> float:
+        """
+        检查并占用一次配额
+
+        Args:
+            limits: 需要同时满足的限制
+            name: 统计用名称（通常为命令名）
+
+        Returns:
+            0 表示允许；否则为需要等待的秒数
+        """
+        retry_after_ms = None
+        if self._script is not None:
+            try:
+                args = []
+                for limit in limits:
+                    args.extend((limit.emission_ms, limit.window * 1000))
+                retry_after_ms = await self._script(keys=[f"{KEY_PREFIX}{limit.key}" for limit in limits], args=args)
+            except RedisError as e:
+                logger.warning(f"Redis 速率限制不可用，使用本地限制: {e}")
+                metrics.inc("bot_rate_limit_fallback_total")
+
+        if retry_after_ms is None:
+            self.stats["fallback"] += 1
+            retry_after_ms = self._check_local(limits)
+
+        if retry_after_ms:
+            self.stats["throttled"] += 1
+            self.throttled_by_name[name] += 1
+            metrics.inc("bot_rate_limited_total", {"limiter": name or "unknown"})
+            logger.debug(f"请求被限流: {name}, 需等待 {retry_after_ms / 1000:.1f} 秒")
+            return retry_after_ms / 1000
+
+        self.stats["allowed"] += 1
+        return 0.0
+
+    def _check_local(self, limits: list[RateLimit]) -> float:
+        """进程内 GCRA，与 Lua 脚本逻辑一致"""
+        now = time.time() * 1000
+        if now / 1000 - self._last_cleanup > 600:
+            self._local_tats = {key: value for key, value in self._local_tats.items() if value[1] > now}
+            self._last_cleanup = now / 1000
+
+        new_tats = []
+        retry_after = 0.0
+        for limit in limits:
+            tat, expires_at = self._local_tats.get(limit.key, (now, now))
+            tat = max(tat if expires_at > now else now, now)
+            new_tat = tat + limit.emission_ms
+            allow_at = new_tat - limit.window * 1000
+            if allow_at > now:
+                retry_after = max(retry_after, allow_at - now)
+            new_tats.append(new_tat)
+
+        if retry_after > 0:
+            return math.ceil(retry_after)
+
+        for limit, new_tat in zip(limits, new_tats, strict=True):
+            self._local_tats[limit.key] = (new_tat, new_tat)
+        return 0
+
+
+# 全局实例
+_rate_limiter: RedisRateLimiter | None = None
+
+
+def init_rate_limiter(redis_client: redis.Redis) -> RedisRateLimiter:
+    """使用 Redis 初始化全局速率限制器"""
+    global _rate_limiter
+    _rate_limiter = RedisRateLimiter(redis_client)
+    return _rate_limiter
+
+
+def get_rate_limiter() -> RedisRateLimiter:
+    """获取全局速率限制器（未初始化 Redis 时使用进程内限制）"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RedisRateLimiter()
+    return _rate_limiter
@@ -12,6 +12,8 @@ from redis.asyncio.connection import ConnectionPool
 from redis.exceptions import RedisError
 
 from utils.config_manager import get_config
+from utils.metrics import metrics
+from utils.tracing import span
 
 
 logger = logging.getLogger(__name__)
@@ -78,6 +80,7 @@ class RedisCacheManager:
             "netflix": self.config.netflix_cache_duration,
             "spotify": self.config.spotify_cache_duration,  # 8天，配合周日清理
             "disney_plus": self.config.disney_cache_duration,  # 8天，配合周日清理
+            "http_cache": self.config.http_cache_duration,
         }
 
         # 对于搜索结果特殊处理
@@ -107,11 +110,14 @@ class RedisCacheManager:
             return None
 
         cache_key = self._get_cache_key(key, subdirectory)
+        metric_labels = {"subdirectory": subdirectory or "root"}
 
         try:
             # 获取数据
-            data = await self.redis_client.get(cache_key)
+            with span("cache.load", subdirectory=metric_labels["subdirectory"]):
+                data = await self.redis_client.get(cache_key)
             if data is None:
+                metrics.inc("bot_cache_requests_total", {**metric_labels, "result": "miss"})
                 return None
 
             # 解析 JSON
@@ -127,8 +133,11 @@ class RedisCacheManager:
                     logger.debug(f"缓存已过期 {cache_key}，缓存年龄: {cache_age:.1f}s > {max_age_seconds}s")
                     # 删除过期的缓存
                     await self.redis_client.delete(cache_key)
+                    metrics.inc("bot_cache_requests_total", {**metric_labels, "result": "expired"})
                     return None
 
+            metrics.inc("bot_cache_requests_total", {**metric_labels, "result": "hit"})
+
             # 为了兼容性，保持返回数据格式
             # 原 CacheManager 返回的是 data 字段的内容
             if isinstance(cache_data, dict) and "data" in cache_data:
@@ -137,6 +146,7 @@ class RedisCacheManager:
 
         except (json.JSONDecodeError, RedisError) as e:
             logger.error(f"加载缓存失败 {cache_key}: {e}")
+            metrics.inc("bot_cache_requests_total", {**metric_labels, "result": "error"})
             return None
 
     async def save_cache(self, key: str, data: dict, subdirectory: str | None = None):
@@ -160,7 +170,8 @@ class RedisCacheManager:
             cache_data = {"timestamp": time.time(), "data": data}
 
             # 保存到 Redis，设置过期时间
-            await self.redis_client.setex(cache_key, ttl, json.dumps(cache_data, ensure_ascii=False))
+            with span("cache.save", subdirectory=subdirectory or "root"):
+                await self.redis_client.setex(cache_key, ttl, json.dumps(cache_data, ensure_ascii=False))
 
             logger.debug(f"缓存已保存 {cache_key}，TTL: {ttl}秒")
 
@@ -6,14 +6,154 @@ Redis 消息删除管理器
 import asyncio
 import json
 import logging
+import os
+import socket
+import time
+import uuid
 
 import redis.asyncio as redis
 from telegram import Bot
-from telegram.error import TelegramError
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+from utils.deadline_waiter import DeadlineWaiter
 
 
 logger = logging.getLogger(__name__)
 
+SCHEDULE_KEY = "msg:delete:schedule"
+TASKS_KEY = "msg:delete:tasks"
+SESSION_KEY_PREFIX = "msg:session:"
+DEAD_LETTER_KEY = "msg:delete:dead"
+INFLIGHT_KEY_PREFIX = "msg:delete:inflight:"
+WORKERS_KEY = "msg:delete:workers"
+WAKE_CHANNEL = "msg:delete:wake"
+
+# 领取任务的租约时长（秒），超时未确认的任务会被放回调度队列
+LEASE_SECONDS = 120
+# 回收过期租约的间隔（秒）
+RECLAIM_INTERVAL = 30
+
+# Telegram deleteMessages 单次最多 100 条
+DELETE_MESSAGES_LIMIT = 100
+# 单条删除的最大尝试次数，超过后进入死信队列
+MAX_DELETE_ATTEMPTS = 3
+# 死信队列保留条数
+DEAD_LETTER_MAX_LENGTH = 1000
+
+# 表示消息已不存在（视为删除成功）的错误信息
+_ALREADY_GONE_ERRORS = ("message to delete not found", "message can't be deleted", "message_id_invalid")
+
+# 原子领取到期任务：把最多 N 个到期任务从调度表移入当前工作器的在途集合（分数为租约到期时间），
+# 任务数据保留在任务表中，直到删除成功后确认（ack）才清理
+# KEYS[1] = 调度有序集合, KEYS[2] = 任务哈希表, KEYS[3] = 本工作器在途集合, KEYS[4] = 工作器登记表
+# ARGV[1] = 当前时间戳, ARGV[2] = 最大领取数量, ARGV[3] = 租约到期时间, ARGV[4] = 工作器ID
+# 返回 [key1, payload1, key2, payload2, ...]
+CLAIM_DUE_SCRIPT = """
+redis.call('ZADD', KEYS[4], ARGV[3], ARGV[4])
+local keys = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #keys == 0 then
+    return {}
+end
+local payloads = redis.call('HMGET', KEYS[2], unpack(keys))
+redis.call('ZREM', KEYS[1], unpack(keys))
+local result = {}
+for i, key in ipairs(keys) do
+    redis.call('ZADD', KEYS[3], ARGV[3], key)
+    result[#result + 1] = key
+    result[#result + 1] = payloads[i]
+end
+return result
+"""
+
+# 回收过期租约：遍历各工作器的在途集合，把租约已过期的任务放回调度表（立即到期），
+# 并注销已无在途任务且心跳过期的工作器。在途集合由调用方先读取工作器登记表后在 KEYS 中声明，
+# 脚本不访问未声明的键；这些键没有共同的 hash tag，不支持 Redis Cluster
+# KEYS[1] = 调度有序集合, KEYS[2] = 工作器登记表, KEYS[3..] = 各工作器的在途集合
+# ARGV[1] = 当前时间戳, ARGV[2..] = 工作器ID（与 KEYS[3..] 一一对应）
+# 返回回收的任务数
+RECLAIM_EXPIRED_SCRIPT = """
+local reclaimed = 0
+for i = 3, #KEYS do
+    local inflight_key = KEYS[i]
+    local worker_id = ARGV[i - 1]
+    local expired = redis.call('ZRANGEBYSCORE', inflight_key, '-inf', ARGV[1])
+    for _, key in ipairs(expired) do
+        redis.call('ZADD', KEYS[1], ARGV[1], key)
+        redis.call('ZREM', inflight_key, key)
+        reclaimed = reclaimed + 1
+    end
+    local heartbeat = redis.call('ZSCORE', KEYS[2], worker_id)
+    if heartbeat and tonumber(heartbeat) < tonumber(ARGV[1]) and redis.call('ZCARD', inflight_key) == 0 then
+        redis.call('ZREM', KEYS[2], worker_id)
+    end
+end
+return reclaimed
+"""
+
+# 把任务加入会话索引，会话键的过期时间只延长不缩短：同一会话中其他消息可能更晚才删除，
+# 缩短后 cancel_session_deletions 会找不到它们（键刚被 SADD 创建时 TTL 为 -1，同样需要设置）
+# KEYS[1] = 会话索引键; ARGV[1] = 任务键, ARGV[2] = 会话键至少保留的秒数
+ADD_TO_SESSION_SCRIPT = """
+redis.call('SADD', KEYS[1], ARGV[1])
+if redis.call('TTL', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 1
+"""
+
+
+def _add_to_session(pipe, session_id: str, key: str, ttl: int):
+    """在 pipeline 中把任务加入会话索引（直接 EVAL：注册脚本在 pipeline 中每次执行前会多一次 SCRIPT EXISTS 往返）"""
+    pipe.eval(ADD_TO_SESSION_SCRIPT, 1, f"{SESSION_KEY_PREFIX}{session_id}", key, ttl)
+
+
+def _retry_after_seconds(error: RetryAfter) -> float:
+    """RetryAfter.retry_after 可能是秒数或 timedelta（取决于 PTB 配置）"""
+    retry_after = error.retry_after
+    if hasattr(retry_after, "total_seconds"):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class DeletePacer:
+    """
+    Bot API 删除请求节流器（AIMD）
+
+    成功时逐步缩短请求间隔，收到 429 时按 retry_after 暂停并加倍间隔。
+    """
+
+    def __init__(self, min_interval: float = 0.0, max_interval: float = 5.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._last_call = 0.0
+        self._blocked_until = 0.0
+
+    @property
+    def is_blocked(self) -> bool:
+        return self._blocked_until > time.monotonic()
+
+    @property
+    def remaining_wait(self) -> float:
+        """距离允许发送下一个请求还需等待的秒数"""
+        return max(0.0, self._blocked_until - time.monotonic(), self._last_call + self.interval - time.monotonic())
+
+    async def wait(self):
+        """等待到允许发送下一个请求"""
+        now = time.monotonic()
+        ready_at = max(self._blocked_until, self._last_call + self.interval)
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+        self._last_call = time.monotonic()
+
+    def on_success(self):
+        self.interval = max(self.min_interval, self.interval * 0.9 - 0.01)
+
+    def on_rate_limited(self, retry_after: float):
+        self._blocked_until = time.monotonic() + retry_after
+        self.interval = min(self.max_interval, max(self.interval * 2, 0.1))
+        logger.warning(f"删除消息触发限流，暂停 {retry_after:.1f} 秒，请求间隔调整为 {self.interval:.2f} 秒")
+
 
 class RedisMessageDeleteScheduler:
     """Redis 消息删除调度器，替代文件系统版本"""
@@ -24,6 +164,26 @@ class RedisMessageDeleteScheduler:
         self.bot: Bot | None = None
         self._running = False
         self._task: asyncio.Task | None = None
+        # 每次领取的最大任务数
+        self.claim_batch_size = 100
+        self._claim_script = self.redis.register_script(CLAIM_DUE_SCRIPT)
+        self._reclaim_script = self.redis.register_script(RECLAIM_EXPIRED_SCRIPT)
+        # 多个进程共享 Redis 时，每个工作器有独立的在途集合
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.inflight_key = f"{INFLIGHT_KEY_PREFIX}{self.worker_id}"
+        self._last_reclaim = 0.0
+        # 休眠到最早的删除任务到期，而不是每秒轮询
+        self._waiter = DeadlineWaiter(self.redis, SCHEDULE_KEY, WAKE_CHANNEL, max_idle=RECLAIM_INTERVAL)
+        self._pacer = DeletePacer()
+        self.stats = {
+            "batches": 0,
+            "deleted": 0,
+            "fallbacks": 0,
+            "retried": 0,
+            "dead_lettered": 0,
+            "rate_limited": 0,
+            "reclaimed": 0,
+        }
 
     def start(self, bot: Bot):
         """启动调度器"""
@@ -31,67 +191,203 @@ class RedisMessageDeleteScheduler:
         self._running = True
 
         # 启动监听任务
+        self._waiter.start()
         self._task = asyncio.create_task(self._deletion_worker())
         logger.info("✅ Redis 消息删除调度器已启动")
 
-        # 启动时处理遗留的删除任务
+        # 启动时回收上次运行（或其他已退出进程）遗留的在途任务
         asyncio.create_task(self._process_existing_deletions())
 
     async def _process_existing_deletions(self):
-        """处理启动时存在的遗留删除任务"""
+        """回收启动时遗留的过期租约，由工作器统一领取执行"""
         try:
-            # 等待1秒确保调度器完全启动
-            await asyncio.sleep(1)
-
-            import time
-
-            current_time = time.time()
-            processed_count = 0
-
             logger.info("🔍 检查遗留的消息删除任务...")
+            reclaimed = await self._reclaim_expired_leases()
 
-            # 获取所有已到期的任务（包括遗留任务）
-            expired_tasks = await self.redis.zrangebyscore("msg:delete:schedule", 0, current_time, withscores=False)
-
-            if expired_tasks:
-                for key in expired_tasks:
-                    # 获取任务数据
-                    task_data_str = await self.redis.hget("msg:delete:tasks", key)
-                    if task_data_str:
-                        try:
-                            task_data = json.loads(task_data_str)
-                            chat_id = task_data.get("chat_id")
-                            message_id = task_data.get("message_id")
-                            session_id = task_data.get("session_id")
-
-                            if chat_id and message_id:
-                                # 删除消息
-                                await self._delete_message(chat_id, message_id)
-                                processed_count += 1
-
-                                # 从会话集合中移除
-                                if session_id:
-                                    session_key = f"msg:session:{session_id}"
-                                    await self.redis.srem(session_key, key)
-
-                        except (json.JSONDecodeError, TypeError) as e:
-                            logger.error(f"解析遗留任务数据失败 {key}: {e}")
-
-                    # 清理任务
-                    await self.redis.hdel("msg:delete:tasks", key)
-                    await self.redis.zrem("msg:delete:schedule", key)
-
-            if processed_count > 0:
-                logger.info(f"📧 已处理 {processed_count} 个遗留的消息删除任务")
+            if reclaimed > 0:
+                logger.info(f"📧 已回收 {reclaimed} 个遗留的消息删除任务")
             else:
                 logger.info("✅ 没有遗留的消息删除任务")
 
         except Exception as e:
             logger.error(f"处理遗留删除任务时出错: {e}")
 
+    async def _claim_due_tasks(self, now: float, limit: int) -> list[tuple[str, dict | None]]:
+        """原子领取最多 limit 个到期任务（带租约），返回 [(任务键, 任务数据)]"""
+        raw = await self._claim_script(
+            keys=[SCHEDULE_KEY, TASKS_KEY, self.inflight_key, WORKERS_KEY],
+            args=[now, limit, now + LEASE_SECONDS, self.worker_id],
+        )
+
+        claimed = []
+        for i in range(0, len(raw), 2):
+            key, payload = raw[i], raw[i + 1]
+            task_data = None
+            if payload:
+                try:
+                    task_data = json.loads(payload)
+                except (json.JSONDecodeError, TypeError) as e:
+                    logger.error(f"解析任务数据失败 {key}: {e}")
+            claimed.append((key, task_data))
+        return claimed
+
+    async def _reclaim_expired_leases(self) -> int:
+        """把所有工作器中租约过期的任务放回调度队列，返回回收数量"""
+        self._last_reclaim = time.monotonic()
+        worker_ids = await self.redis.zrange(WORKERS_KEY, 0, -1)
+        if not worker_ids:
+            return 0
+        reclaimed = await self._reclaim_script(
+            keys=[SCHEDULE_KEY, WORKERS_KEY, *(f"{INFLIGHT_KEY_PREFIX}{worker_id}" for worker_id in worker_ids)],
+            args=[time.time(), *worker_ids],
+        )
+        if reclaimed:
+            self.stats["reclaimed"] += reclaimed
+            logger.warning(f"已回收 {reclaimed} 个租约过期的消息删除任务")
+        return reclaimed
+
+    async def _extend_lease(self, tasks: list[tuple[str, dict | None]]):
+        """延长在途任务的租约，覆盖节流器剩余的等待时间（429 的 retry_after 可能超过租约时长）"""
+        expires_at = time.time() + self._pacer.remaining_wait + LEASE_SECONDS
+        await self.redis.zadd(self.inflight_key, {key: expires_at for key, _ in tasks}, xx=True)
+
+    async def _ack(self, tasks: list[tuple[str, dict | None]]):
+        """确认任务完成：清理在途集合、任务表和会话索引"""
+        if not tasks:
+            return
+        keys = [key for key, _ in tasks]
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrem(self.inflight_key, *keys)
+            pipe.hdel(TASKS_KEY, *keys)
+            for key, task_data in tasks:
+                if task_data and task_data.get("session_id"):
+                    pipe.srem(f"{SESSION_KEY_PREFIX}{task_data['session_id']}", key)
+            await pipe.execute()
+
+    async def _process_due_tasks(self) -> int:
+        """领取并执行所有到期任务，按聊天分组批量删除，返回处理的消息数"""
+        processed_count = 0
+
+        while True:
+            claimed = await self._claim_due_tasks(time.time(), self.claim_batch_size)
+
+            by_chat: dict[int, list[tuple[str, dict]]] = {}
+            invalid = []
+            for key, task_data in claimed:
+                if task_data and task_data.get("chat_id") and task_data.get("message_id"):
+                    by_chat.setdefault(task_data["chat_id"], []).append((key, task_data))
+                else:
+                    # 任务已被取消或数据损坏，直接确认
+                    invalid.append((key, task_data))
+            await self._ack(invalid)
+
+            for chat_id, tasks in by_chat.items():
+                for i in range(0, len(tasks), DELETE_MESSAGES_LIMIT):
+                    await self._delete_batch(chat_id, tasks[i : i + DELETE_MESSAGES_LIMIT])
+                processed_count += len(tasks)
+
+            # 不足一批说明已没有更多到期任务
+            if len(claimed) < self.claim_batch_size:
+                return processed_count
+
+    async def _delete_batch(self, chat_id: int, tasks: list[tuple[str, dict]]):
+        """使用 deleteMessages 批量删除同一聊天的消息，失败时逐条删除"""
+        if not self.bot:
+            logger.warning("Bot 未初始化，无法删除消息")
+            return
+
+        if self._pacer.interval > 1 or self._pacer.is_blocked:
+            await self._extend_lease(tasks)
+
+        if len(tasks) > 1:
+            await self._pacer.wait()
+            try:
+                await self.bot.delete_messages(chat_id=chat_id, message_ids=[task["message_id"] for _, task in tasks])
+                self._pacer.on_success()
+                await self._ack(tasks)
+                self.stats["batches"] += 1
+                self.stats["deleted"] += len(tasks)
+                logger.debug(f"批量删除消息: chat_id={chat_id}, 数量={len(tasks)}")
+                return
+            except RetryAfter as e:
+                retry_after = _retry_after_seconds(e)
+                self._pacer.on_rate_limited(retry_after)
+                self.stats["rate_limited"] += 1
+                await self._requeue_many(tasks, retry_after)
+                return
+            except TelegramError as e:
+                logger.debug(f"批量删除失败，改为逐条删除: chat_id={chat_id}, 错误: {e}")
+                self.stats["fallbacks"] += 1
+
+        for i, (key, task_data) in enumerate(tasks):
+            # 逐条删除途中可能被限流，等待前为剩余任务续租，避免租约过期后被其他工作器重复删除
+            if self._pacer.interval > 1 or self._pacer.is_blocked:
+                await self._extend_lease(tasks[i:])
+            await self._delete_single(key, task_data)
+
+    async def _delete_single(self, key: str, task_data: dict):
+        """逐条删除消息，失败时重试，多次失败后进入死信队列"""
+        await self._pacer.wait()
+        try:
+            await self.bot.delete_message(chat_id=task_data["chat_id"], message_id=task_data["message_id"])
+            self._pacer.on_success()
+            self.stats["deleted"] += 1
+            await self._ack([(key, task_data)])
+        except RetryAfter as e:
+            retry_after = _retry_after_seconds(e)
+            self._pacer.on_rate_limited(retry_after)
+            self.stats["rate_limited"] += 1
+            await self._requeue_many([(key, task_data)], retry_after)
+        except TelegramError as e:
+            error_text = str(e).lower()
+            if isinstance(e, BadRequest) and any(msg in error_text for msg in _ALREADY_GONE_ERRORS):
+                await self._ack([(key, task_data)])
+                return
+
+            attempts = task_data.get("attempts", 0) + 1
+            if isinstance(e, Forbidden) or attempts >= MAX_DELETE_ATTEMPTS:
+                await self._dead_letter(key, task_data, str(e))
+                return
+
+            task_data["attempts"] = attempts
+            self.stats["retried"] += 1
+            await self._requeue_many([(key, task_data)], 5 * 2**attempts)
+
+    async def _requeue_many(self, tasks: list[tuple[str, dict]], delay: float):
+        """把在途任务重新放回调度队列"""
+        execute_at = time.time() + delay
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrem(self.inflight_key, *[key for key, _ in tasks])
+            for key, task_data in tasks:
+                task_data["execute_at"] = execute_at
+                pipe.hset(TASKS_KEY, key, json.dumps(task_data))
+                pipe.zadd(SCHEDULE_KEY, {key: execute_at})
+                if task_data.get("session_id"):
+                    _add_to_session(pipe, task_data["session_id"], key, int(delay) + 60)
+            await pipe.execute()
+        self._waiter.notify(execute_at)
+        logger.debug(f"已重新调度 {len(tasks)} 个删除任务，延迟 {delay:.1f} 秒")
+
+    async def _dead_letter(self, key: str, task_data: dict, error: str):
+        """记录无法删除的消息到死信队列（有上限）"""
+        entry = {**task_data, "key": key, "error": error, "failed_at": time.time()}
+        await self._ack([(key, task_data)])
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lpush(DEAD_LETTER_KEY, json.dumps(entry))
+            pipe.ltrim(DEAD_LETTER_KEY, 0, DEAD_LETTER_MAX_LENGTH - 1)
+            await pipe.execute()
+        self.stats["dead_lettered"] += 1
+        logger.warning(f"消息删除失败，已移入死信队列: {key}, 错误: {error}")
+
+    async def get_dead_letters(self, limit: int = 50) -> list[dict]:
+        """获取最近的死信记录"""
+        entries = await self.redis.lrange(DEAD_LETTER_KEY, 0, limit - 1)
+        return [json.loads(entry) for entry in entries]
+
     def stop(self):
         """停止调度器"""
         self._running = False
+        self._waiter.stop()
         if self._task:
             self._task.cancel()
         logger.info("Redis 消息删除调度器已停止")
@@ -106,13 +402,12 @@ class RedisMessageDeleteScheduler:
             delay: 延迟时间（秒）
             session_id: 会话ID（可选）
         """
-        if delay <= 0:
-            # 立即删除
+        if delay <= 0 and not self._running:
+            # 工作器未运行时直接删除
             await self._delete_message(chat_id, message_id)
         else:
-            # 计算执行时间
-            import time
-
+            # 立即删除的任务也进入队列，以便与同一聊天的其他消息合并为一次批量删除
+            delay = max(delay, 0)
             execute_at = time.time() + delay
 
             # 创建删除任务的数据
@@ -123,20 +418,21 @@ class RedisMessageDeleteScheduler:
                 "execute_at": execute_at,
             }
 
-            # 使用不过期的键存储任务数据，并在 sorted set 中管理时间
+            # 使用不过期的键存储任务数据，并在 sorted set 中管理时间；全部写入在一次往返中完成
             key = f"msg:delete:{chat_id}:{message_id}"
-            await self.redis.hset("msg:delete:tasks", key, json.dumps(task_data))
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hset(TASKS_KEY, key, json.dumps(task_data))
+                pipe.zadd(SCHEDULE_KEY, {key: execute_at})
 
-            # 添加到时间排序集合
-            await self.redis.zadd("msg:delete:schedule", {key: execute_at})
+                # 如果有 session_id，维护会话索引（会话键比会话中最晚删除的消息稍晚过期）
+                if session_id:
+                    _add_to_session(pipe, session_id, key, int(delay) + 60)
 
-            # 如果有 session_id，维护会话索引
-            if session_id:
-                session_key = f"msg:session:{session_id}"
-                # 添加消息键到会话集合
-                await self.redis.sadd(session_key, key)
-                # 设置会话键的过期时间（比消息稍长）
-                await self.redis.expire(session_key, delay + 60)
+                # 唤醒等待中的工作器（包括其他进程）
+                self._waiter.publish(pipe, execute_at)
+                await pipe.execute()
+
+            self._waiter.notify(execute_at)
 
             logger.debug(f"已调度消息删除: {key}, 延迟: {delay}秒, 会话: {session_id}")
 
@@ -146,42 +442,15 @@ class RedisMessageDeleteScheduler:
 
         while self._running:
             try:
-                import time
-
-                current_time = time.time()
-
-                # 获取所有到期的任务
-                expired_tasks = await self.redis.zrangebyscore("msg:delete:schedule", 0, current_time, withscores=False)
+                # 定期回收其他（已退出的）工作器遗留的过期租约
+                if time.monotonic() - self._last_reclaim >= RECLAIM_INTERVAL:
+                    await self._reclaim_expired_leases()
 
-                if expired_tasks:
-                    for key in expired_tasks:
-                        # 获取任务数据
-                        task_data_str = await self.redis.hget("msg:delete:tasks", key)
-                        if task_data_str:
-                            try:
-                                task_data = json.loads(task_data_str)
-                                chat_id = task_data.get("chat_id")
-                                message_id = task_data.get("message_id")
-                                session_id = task_data.get("session_id")
+                # 批量领取并处理所有到期的任务
+                await self._process_due_tasks()
 
-                                if chat_id and message_id:
-                                    # 删除消息
-                                    await self._delete_message(chat_id, message_id)
-
-                                    # 从会话集合中移除
-                                    if session_id:
-                                        session_key = f"msg:session:{session_id}"
-                                        await self.redis.srem(session_key, key)
-
-                            except (json.JSONDecodeError, TypeError) as e:
-                                logger.error(f"解析任务数据失败 {key}: {e}")
-
-                        # 清理任务
-                        await self.redis.hdel("msg:delete:tasks", key)
-                        await self.redis.zrem("msg:delete:schedule", key)
-
-                # 每秒检查一次
-                await asyncio.sleep(1)
+                # 休眠到下一个任务到期，或被新调度的更早任务唤醒
+                await self._waiter.wait()
 
             except asyncio.CancelledError:
                 break
@@ -198,8 +467,13 @@ class RedisMessageDeleteScheduler:
             return
 
         try:
+            await self._pacer.wait()
             await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            self._pacer.on_success()
             logger.debug(f"消息已删除: chat_id={chat_id}, message_id={message_id}")
+        except RetryAfter as e:
+            self._pacer.on_rate_limited(_retry_after_seconds(e))
+            logger.warning(f"删除消息被限流: chat_id={chat_id}, message_id={message_id}")
         except TelegramError as e:
             # 忽略消息已删除的错误
             if "message to delete not found" not in str(e).lower():
@@ -210,23 +484,23 @@ class RedisMessageDeleteScheduler:
         key = f"msg:delete:{chat_id}:{message_id}"
 
         # 获取任务数据以获取 session_id
-        task_data_str = await self.redis.hget("msg:delete:tasks", key)
+        session_id = None
+        task_data_str = await self.redis.hget(TASKS_KEY, key)
         if task_data_str:
             try:
-                task_data = json.loads(task_data_str)
-                session_id = task_data.get("session_id")
-
-                # 从会话集合中移除
-                if session_id:
-                    session_key = f"msg:session:{session_id}"
-                    await self.redis.srem(session_key, key)
-            except (json.JSONDecodeError, TypeError):
+                session_id = json.loads(task_data_str).get("session_id")
+            except (json.JSONDecodeError, TypeError, AttributeError):
                 pass
 
-        # 删除任务
-        await self.redis.hdel("msg:delete:tasks", key)
-        result = await self.redis.zrem("msg:delete:schedule", key)
-        if result:
+        # 删除任务（单次往返）
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if session_id:
+                pipe.srem(f"{SESSION_KEY_PREFIX}{session_id}", key)
+            pipe.hdel(TASKS_KEY, key)
+            pipe.zrem(SCHEDULE_KEY, key)
+            results = await pipe.execute()
+
+        if results[-1]:
             logger.debug(f"已取消消息删除: {key}")
 
     async def cancel_session_deletions(self, session_id: str) -> int:
@@ -234,7 +508,7 @@ class RedisMessageDeleteScheduler:
         if not session_id:
             return 0
 
-        session_key = f"msg:session:{session_id}"
+        session_key = f"{SESSION_KEY_PREFIX}{session_id}"
 
         # 获取会话中的所有消息键
         message_keys = await self.redis.smembers(session_key)
@@ -242,52 +516,44 @@ class RedisMessageDeleteScheduler:
         if not message_keys:
             return 0
 
-        cancelled_count = 0
-
-        # 删除所有相关的消息任务
-        for key in message_keys:
-            # 从任务表中删除
-            result1 = await self.redis.hdel("msg:delete:tasks", key)
-            # 从调度表中删除
-            result2 = await self.redis.zrem("msg:delete:schedule", key)
-            if result1 or result2:
-                cancelled_count += 1
-
-        # 删除会话键
-        await self.redis.delete(session_key)
+        # 批量删除所有相关的消息任务和会话键
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hdel(TASKS_KEY, *message_keys)
+            pipe.zrem(SCHEDULE_KEY, *message_keys)
+            pipe.delete(session_key)
+            _, cancelled_count, _ = await pipe.execute()
 
         logger.info(f"已取消会话 {session_id} 的 {cancelled_count} 个删除任务")
         return cancelled_count
 
     async def get_pending_deletions_count(self) -> int:
         """获取待删除消息数量"""
-        return await self.redis.zcard("msg:delete:schedule")
+        return await self.redis.zcard(SCHEDULE_KEY)
 
     async def get_session_deletions_count(self, session_id: str) -> int:
         """获取特定会话的待删除消息数量"""
         if not session_id:
             return 0
 
-        session_key = f"msg:session:{session_id}"
+        session_key = f"{SESSION_KEY_PREFIX}{session_id}"
         return await self.redis.scard(session_key)
 
     async def clear_all_pending_deletions(self):
         """清除所有待删除的消息"""
         # 清除任务表
-        await self.redis.delete("msg:delete:tasks")
+        await self.redis.delete(TASKS_KEY)
         # 清除调度表
-        await self.redis.delete("msg:delete:schedule")
-
-        # 清除所有会话索引
-        cursor = 0
-        pattern = "msg:session:*"
-
-        while True:
-            cursor, keys = await self.redis.scan(cursor, match=pattern, count=100)
-            if keys:
-                await self.redis.delete(*keys)
-            if cursor == 0:
-                break
+        await self.redis.delete(SCHEDULE_KEY)
+
+        # 清除所有会话索引和在途集合
+        for pattern in (f"{SESSION_KEY_PREFIX}*", f"{INFLIGHT_KEY_PREFIX}*"):
+            cursor = 0
+            while True:
+                cursor, keys = await self.redis.scan(cursor, match=pattern, count=100)
+                if keys:
+                    await self.redis.delete(*keys)
+                if cursor == 0:
+                    break
 
         logger.info("已清除所有待删除消息和会话索引")
 
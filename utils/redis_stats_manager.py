@@ -1,11 +1,20 @@
 """
 Redis 统计管理器
 用于命令使用统计和活跃用户追踪
+
+命令统计先在内存中累加，定期通过一个 pipeline 写入 Redis（每条命令不产生往返）；
+未启动定期刷新时，每条命令的所有写入也合并为一次 pipeline 往返。
+
+命令耗时以对数分桶直方图记录，同时写入分钟、小时、天三个粒度（写入时即完成汇总），
+查询时合并所需时间片的直方图计算 p50/p95/p99。
 """
 
+import asyncio
+import bisect
 import json
 import logging
 import time
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 
 import redis.asyncio as redis
@@ -13,13 +22,177 @@ import redis.asyncio as redis
 
 logger = logging.getLogger(__name__)
 
+DAILY_STATS_TTL = 7 * 24 * 60 * 60
+DAU_TTL = 30 * 24 * 60 * 60
+USER_HISTORY_TTL = 30 * 24 * 60 * 60
+USER_HISTORY_LENGTH = 10
+
+LATENCY_COMMANDS_KEY = "stats:latency:commands"
+# 延迟直方图桶上界（毫秒），超过最后一个上界的计入溢出桶
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+# 粒度 -> (时间片格式, 保留秒数)
+LATENCY_RESOLUTIONS = {
+    "minute": ("%Y%m%d%H%M", 2 * 24 * 60 * 60),
+    "hour": ("%Y%m%d%H", 14 * 24 * 60 * 60),
+    "day": ("%Y%m%d", 90 * 24 * 60 * 60),
+}
+# 查询窗口 -> (粒度, 时间片数, 时间片长度)
+LATENCY_WINDOWS = {
+    "hour": ("minute", 60, timedelta(minutes=1)),
+    "day": ("hour", 24, timedelta(hours=1)),
+    "week": ("day", 7, timedelta(days=1)),
+    "month": ("day", 30, timedelta(days=1)),
+}
+
+
+def latency_bucket(duration_ms: float) -> int:
+    """返回耗时所在的桶编号"""
+    return bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)
+
+
+def histogram_percentile(buckets: list[int], quantile: float) -> float | None:
+    """根据分桶计数估算分位数（毫秒），桶内线性插值"""
+    total = sum(buckets)
+    if not total:
+        return None
+
+    rank = quantile * total
+    cumulative = 0
+    for index, count in enumerate(buckets):
+        if count and cumulative + count >= rank:
+            lower = LATENCY_BUCKETS_MS[index - 1] if index > 0 else 0
+            upper = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else LATENCY_BUCKETS_MS[-1] * 2
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+    return float(LATENCY_BUCKETS_MS[-1] * 2)
+
+
+def _summarize_histogram(raw: dict) -> dict:
+    """把一个或多个时间片合并后的原始字段整理为摘要"""
+    buckets = [int(raw.get(f"b{index}", 0)) for index in range(len(LATENCY_BUCKETS_MS) + 1)]
+    count = int(raw.get("count", 0))
+    return {
+        "count": count,
+        "errors": int(raw.get("errors", 0)),
+        "avg_ms": int(raw.get("sum_ms", 0)) / count if count else None,
+        "p50_ms": histogram_percentile(buckets, 0.50),
+        "p95_ms": histogram_percentile(buckets, 0.95),
+        "p99_ms": histogram_percentile(buckets, 0.99),
+    }
+
 
 class RedisStatsManager:
     """Redis 统计管理器"""
 
-    def __init__(self, redis_client: redis.Redis):
-        """初始化统计管理器"""
+    def __init__(self, redis_client: redis.Redis, flush_interval: float = 5.0):
+        """
+        初始化统计管理器
+
+        Args:
+            redis_client: Redis 客户端
+            flush_interval: 内存缓冲刷新间隔（秒），调用 start() 后生效
+        """
         self.redis = redis_client
+        self.flush_interval = flush_interval
+        self._flush_task: asyncio.Task | None = None
+
+        # 内存缓冲
+        self._pending_counts: Counter[tuple[str, str]] = Counter()
+        self._pending_ttls: dict[str, int] = {}
+        self._pending_latency_commands: set[str] = set()
+        self._pending_active: dict[str, float] = {}
+        self._pending_dau: dict[str, set[int]] = defaultdict(set)
+        self._pending_history: dict[str, list[str]] = defaultdict(list)
+
+    def start(self):
+        """启动定期刷新（之后命令统计只写内存缓冲）"""
+        if self._flush_task is None and self.flush_interval > 0:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+            logger.info(f"统计缓冲已启用，每 {self.flush_interval} 秒写入一次")
+
+    async def stop(self):
+        """停止定期刷新并写入剩余缓冲"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _buffer_usage(self, command: str, user_id: int, chat_id: int, chat_type: str):
+        """把一次命令使用累加到内存缓冲"""
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        now = time.time()
+
+        self._pending_counts[("stats:commands:total", command)] += 1
+        self._pending_counts[(f"stats:commands:daily:{today}", command)] += 1
+        self._pending_ttls[f"stats:commands:daily:{today}"] = DAILY_STATS_TTL
+        self._pending_counts[(f"stats:chat_type:{chat_type}", command)] += 1
+        self._pending_active[str(user_id)] = now
+        self._pending_dau[today].add(user_id)
+
+        history_entry = {"command": command, "chat_id": chat_id, "chat_type": chat_type, "timestamp": now}
+        history = self._pending_history[f"stats:user_history:{user_id}"]
+        history.append(json.dumps(history_entry))
+        del history[:-USER_HISTORY_LENGTH]
+
+    async def flush(self) -> bool:
+        """把内存缓冲通过一个 pipeline 写入 Redis"""
+        if not (self._pending_counts or self._pending_active or self._pending_dau or self._pending_history):
+            return True
+
+        counts, self._pending_counts = self._pending_counts, Counter()
+        ttls, self._pending_ttls = self._pending_ttls, {}
+        latency_commands, self._pending_latency_commands = self._pending_latency_commands, set()
+        active, self._pending_active = self._pending_active, {}
+        dau, self._pending_dau = self._pending_dau, defaultdict(set)
+        histories, self._pending_history = self._pending_history, defaultdict(list)
+
+        try:
+            # MULTI/EXEC：失败时要么全部写入、要么全部未写入，放回缓冲重试不会重复累加已写入的计数
+            # （仅在 EXEC 已执行但响应丢失、或个别命令执行出错时仍可能多计一次）
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for (key, field), amount in counts.items():
+                    pipe.hincrby(key, field, amount)
+                for key, ttl in ttls.items():
+                    pipe.expire(key, ttl)
+                if latency_commands:
+                    pipe.sadd(LATENCY_COMMANDS_KEY, *latency_commands)
+
+                if active:
+                    pipe.zadd("stats:active_users", active)
+
+                for date, user_ids in dau.items():
+                    pipe.pfadd(f"stats:dau:{date}", *user_ids)
+                    pipe.expire(f"stats:dau:{date}", DAU_TTL)
+
+                for key, entries in histories.items():
+                    # 列表头部为最新记录
+                    pipe.lpush(key, *entries)
+                    pipe.ltrim(key, 0, USER_HISTORY_LENGTH - 1)
+                    pipe.expire(key, USER_HISTORY_TTL)
+
+                await pipe.execute()
+            return True
+
+        except Exception as e:
+            logger.error(f"写入命令统计失败: {e}")
+            # 计数放回缓冲，下次重试；活跃度等可覆盖的数据放回不影响正确性
+            self._pending_counts.update(counts)
+            self._pending_ttls.update(ttls)
+            self._pending_latency_commands |= latency_commands
+            for user_id, ts in active.items():
+                self._pending_active.setdefault(user_id, ts)
+            for date, user_ids in dau.items():
+                self._pending_dau[date] |= user_ids
+            # 历史记录按时间从旧到新排列，失败的这批早于之后新缓冲的记录
+            for key, entries in histories.items():
+                merged = entries + self._pending_history[key]
+                self._pending_history[key] = merged[-USER_HISTORY_LENGTH:]
+            return False
 
     async def record_command_usage(self, command: str, user_id: int, chat_id: int, chat_type: str):
         """
@@ -31,41 +204,87 @@ class RedisStatsManager:
             chat_id: 聊天ID
             chat_type: 聊天类型（private/group/supergroup）
         """
-        try:
-            # 获取当前日期
-            today = datetime.utcnow().strftime("%Y-%m-%d")
-
-            # 1. 增加命令总计数
-            await self.redis.hincrby("stats:commands:total", command, 1)
-
-            # 2. 增加今日命令计数
-            await self.redis.hincrby(f"stats:commands:daily:{today}", command, 1)
-            # 设置过期时间（保留7天）
-            await self.redis.expire(f"stats:commands:daily:{today}", 7 * 24 * 60 * 60)
+        self._buffer_usage(command, user_id, chat_id, chat_type)
 
-            # 3. 记录用户活跃度
-            await self.redis.zadd("stats:active_users", {str(user_id): time.time()})
+        # 未启用定期刷新时立即写入（一次 pipeline 往返）
+        if self._flush_task is None:
+            await self.flush()
 
-            # 4. 记录每日活跃用户（使用 HyperLogLog）
-            await self.redis.pfadd(f"stats:dau:{today}", user_id)
-            await self.redis.expire(f"stats:dau:{today}", 30 * 24 * 60 * 60)  # 保留30天
+        logger.debug(f"命令使用已记录: {command} by {user_id}")
 
-            # 5. 记录聊天类型统计
-            await self.redis.hincrby(f"stats:chat_type:{chat_type}", command, 1)
+    async def record_command_latency(self, command: str, duration: float, error: bool = False):
+        """
+        记录命令耗时（写入分钟/小时/天三个粒度的直方图）
 
-            # 6. 记录用户命令历史（最近10条）
-            user_history_key = f"stats:user_history:{user_id}"
-            history_entry = {"command": command, "chat_id": chat_id, "chat_type": chat_type, "timestamp": time.time()}
+        Args:
+            command: 命令名称
+            duration: 耗时（秒）
+            error: 是否以异常结束
+        """
+        duration_ms = duration * 1000
+        bucket_field = f"b{latency_bucket(duration_ms)}"
+        now = datetime.utcnow()
+
+        for resolution, (time_format, ttl) in LATENCY_RESOLUTIONS.items():
+            key = f"stats:latency:{resolution}:{now.strftime(time_format)}:{command}"
+            self._pending_counts[(key, bucket_field)] += 1
+            self._pending_counts[(key, "count")] += 1
+            self._pending_counts[(key, "sum_ms")] += round(duration_ms)
+            if error:
+                self._pending_counts[(key, "errors")] += 1
+            self._pending_ttls[key] = ttl
+        self._pending_latency_commands.add(command)
+
+        if self._flush_task is None:
+            await self.flush()
+
+    async def get_latency_report(self, window: str = "hour", command: str | None = None) -> dict:
+        """
+        获取命令耗时报告
 
-            # 使用列表存储，保持最近10条
-            await self.redis.lpush(user_history_key, json.dumps(history_entry))
-            await self.redis.ltrim(user_history_key, 0, 9)  # 只保留最近10条
-            await self.redis.expire(user_history_key, 30 * 24 * 60 * 60)  # 30天过期
+        Args:
+            window: 时间窗口（hour/day/week/month）
+            command: 指定命令时额外返回按时间片的序列
 
-            logger.debug(f"命令使用已记录: {command} by {user_id}")
+        Returns:
+            {"commands": {命令: 摘要}, "series": [(时间片, 摘要), ...]}
+        """
+        if window not in LATENCY_WINDOWS:
+            raise ValueError(f"不支持的时间窗口: {window}")
+
+        await self.flush()
+
+        resolution, slots, step = LATENCY_WINDOWS[window]
+        time_format = LATENCY_RESOLUTIONS[resolution][0]
+        now = datetime.utcnow()
+        periods = [(now - step * i).strftime(time_format) for i in range(slots)]
+
+        commands = [command] if command else sorted(await self.redis.smembers(LATENCY_COMMANDS_KEY))
+        if not commands:
+            return {"commands": {}, "series": []}
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for cmd in commands:
+                for period in periods:
+                    pipe.hgetall(f"stats:latency:{resolution}:{period}:{cmd}")
+            results = await pipe.execute()
+
+        report = {}
+        series = []
+        for cmd_index, cmd in enumerate(commands):
+            merged: Counter[str] = Counter()
+            for period_index, period in enumerate(periods):
+                raw = results[cmd_index * slots + period_index]
+                if not raw:
+                    continue
+                merged.update({field: int(value) for field, value in raw.items()})
+                if command:
+                    series.append((period, _summarize_histogram(raw)))
+            if merged:
+                report[cmd] = _summarize_histogram(merged)
 
-        except Exception as e:
-            logger.error(f"记录命令使用失败: {e}")
+        series.reverse()
+        return {"commands": report, "series": series}
 
     async def get_command_stats(self, period: str = "total") -> dict[str, int]:
         """
@@ -78,6 +297,9 @@ class RedisStatsManager:
             命令使用次数字典
         """
         try:
+            # 读取前先写入缓冲，保证结果包含最近的命令
+            await self.flush()
+
             if period == "total":
                 # 获取总计数
                 stats = await self.redis.hgetall("stats:commands:total")
@@ -90,18 +312,19 @@ class RedisStatsManager:
                 return {cmd: int(count) for cmd, count in stats.items()}
 
             elif period == "week":
-                # 获取最近7天统计
-                week_stats = {}
-                for i in range(7):
-                    date = (datetime.utcnow() - timedelta(days=i)).strftime("%Y-%m-%d")
-                    daily_stats = await self.redis.hgetall(f"stats:commands:daily:{date}")
-
+                # 获取最近7天统计（一次 pipeline 读取）
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for i in range(7):
+                        date = (datetime.utcnow() - timedelta(days=i)).strftime("%Y-%m-%d")
+                        pipe.hgetall(f"stats:commands:daily:{date}")
+                    daily_results = await pipe.execute()
+
+                week_stats = Counter()
+                for daily_stats in daily_results:
                     for cmd, count in daily_stats.items():
-                        if cmd not in week_stats:
-                            week_stats[cmd] = 0
                         week_stats[cmd] += int(count)
 
-                return week_stats
+                return dict(week_stats)
 
             else:
                 return {}
@@ -121,6 +344,8 @@ class RedisStatsManager:
             活跃用户ID列表
         """
         try:
+            await self.flush()
+
             # 计算时间阈值
             threshold = time.time() - (hours * 60 * 60)
 
@@ -136,6 +361,7 @@ class RedisStatsManager:
     async def get_active_users_count(self, hours: int = 24) -> int:
         """获取活跃用户数量"""
         try:
+            await self.flush()
             threshold = time.time() - (hours * 60 * 60)
             return await self.redis.zcount("stats:active_users", threshold, "+inf")
         except Exception as e:
@@ -153,6 +379,7 @@ class RedisStatsManager:
             活跃用户数
         """
         try:
+            await self.flush()
             if date is None:
                 date = datetime.utcnow().strftime("%Y-%m-%d")
 
@@ -188,6 +415,7 @@ class RedisStatsManager:
             命令历史列表
         """
         try:
+            await self.flush()
             history_key = f"stats:user_history:{user_id}"
             history_json = await self.redis.lrange(history_key, 0, -1)
 
@@ -212,12 +440,18 @@ class RedisStatsManager:
             {chat_type: {command: count}}
         """
         try:
-            stats = {}
-            for chat_type in ["private", "group", "supergroup"]:
-                type_stats = await self.redis.hgetall(f"stats:chat_type:{chat_type}")
-                stats[chat_type] = {cmd: int(count) for cmd, count in type_stats.items()}
+            await self.flush()
+
+            chat_types = ["private", "group", "supergroup"]
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for chat_type in chat_types:
+                    pipe.hgetall(f"stats:chat_type:{chat_type}")
+                results = await pipe.execute()
 
-            return stats
+            return {
+                chat_type: {cmd: int(count) for cmd, count in type_stats.items()}
+                for chat_type, type_stats in zip(chat_types, results, strict=True)
+            }
 
         except Exception as e:
             logger.error(f"获取聊天类型统计失败: {e}")
@@ -226,15 +460,18 @@ class RedisStatsManager:
     async def cleanup_old_stats(self, days: int = 30):
         """清理旧的统计数据"""
         try:
-            # 清理过期的每日统计
-            for i in range(days, days + 30):  # 清理30-60天前的数据
+            # 清理过期的每日统计（30-60天前的数据），与不活跃用户清理合并为一次往返
+            stale_keys = []
+            for i in range(days, days + 30):
                 date = (datetime.utcnow() - timedelta(days=i)).strftime("%Y-%m-%d")
-                await self.redis.delete(f"stats:commands:daily:{date}")
-                await self.redis.delete(f"stats:dau:{date}")
+                stale_keys.extend((f"stats:commands:daily:{date}", f"stats:dau:{date}"))
 
             # 清理不活跃用户（超过30天）
             threshold = time.time() - (30 * 24 * 60 * 60)
-            await self.redis.zremrangebyscore("stats:active_users", 0, threshold)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.delete(*stale_keys)
+                pipe.zremrangebyscore("stats:active_users", 0, threshold)
+                await pipe.execute()
 
             logger.info("旧统计数据清理完成")
 
@@ -1,19 +1,78 @@
 """
 Redis 任务调度器
 使用 Redis Sorted Set 实现定时任务调度
+
+周期任务在任务详情中保存调度规则（cron 表达式或固定间隔），领取时即计算并写入下一次执行时间。
+多个副本共享 Redis 时通过 Redis 租约选出唯一的 leader，只有 leader 执行到期任务，
+保证每个周期任务在集群内每次只运行一次。执行记录写入有上限的 Redis Stream。
 """
 
 import asyncio
 import json
 import logging
+import os
+import socket
 import time
+import uuid
 from collections.abc import Callable
 
 import redis.asyncio as redis
 
+from utils.cron import CronExpression
+from utils.deadline_waiter import DeadlineWaiter
+
 
 logger = logging.getLogger(__name__)
 
+SCHEDULED_KEY = "tasks:scheduled"
+DETAILS_KEY = "tasks:details"
+WAKE_CHANNEL = "tasks:wake"
+LEADER_KEY = "tasks:leader"
+HISTORY_STREAM = "tasks:history"
+
+# leader 租约时长及续约间隔（秒）
+LEADER_LEASE_SECONDS = 30
+LEADER_RENEW_INTERVAL = 10
+# 执行记录保留条数（近似）
+HISTORY_MAX_LENGTH = 1000
+
+# 续约：仅当租约仍属于本实例时延长
+RENEW_LEADER_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# 领取到期任务：任务仍在队列中且已到期时，周期任务改写为下一次执行时间，一次性任务移出队列
+# KEYS[1] = 调度有序集合；ARGV[1] = 任务ID, ARGV[2] = 当前时间, ARGV[3] = 下一次执行时间（空表示一次性）
+# 返回 1 表示领取成功
+CLAIM_TASK_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not score or tonumber(score) > tonumber(ARGV[2]) then
+    return 0
+end
+if ARGV[3] == '' then
+    redis.call('ZREM', KEYS[1], ARGV[1])
+else
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+end
+return 1
+"""
+
+
+def next_run_time(schedule: dict, after: float) -> float:
+    """
+    根据调度规则计算下一次执行时间
+
+    Args:
+        schedule: {"cron": "分 时 日 月 周"}（UTC）或 {"interval": 秒数}
+        after: 基准时间戳
+    """
+    if "cron" in schedule:
+        return CronExpression(schedule["cron"]).next_after(after)
+    return after + float(schedule["interval"])
+
 
 class RedisTaskScheduler:
     """Redis 任务调度器，替代文件系统版本"""
@@ -25,6 +84,15 @@ class RedisTaskScheduler:
         self._task: asyncio.Task | None = None
         self._cache_manager = None
         self._handlers: dict[str, Callable] = {}
+        # 休眠到最早的任务到期，而不是每秒轮询；最长休眠不超过 leader 续约间隔
+        self._waiter = DeadlineWaiter(self.redis, SCHEDULED_KEY, WAKE_CHANNEL, max_idle=LEADER_RENEW_INTERVAL)
+
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._renew_script = self.redis.register_script(RENEW_LEADER_SCRIPT)
+        self._claim_script = self.redis.register_script(CLAIM_TASK_SCRIPT)
+        # 每个任务正在运行的实例，用于并发限制
+        self._running_jobs: dict[str, set[asyncio.Task]] = {}
 
         # 注册默认处理器
         self._register_default_handlers()
@@ -42,10 +110,12 @@ class RedisTaskScheduler:
         self._handlers["cache_cleanup"] = self._handle_cache_cleanup
         self._handlers["weekly_cleanup"] = self._handle_cache_cleanup
         self._handlers["rate_refresh"] = self._handle_rate_refresh
+        self._handlers["dataset_refresh"] = self._handle_dataset_refresh
 
     def start(self):
         """启动调度器"""
         self._running = True
+        self._waiter.start()
         self._task = asyncio.create_task(self._scheduler_worker())
         # 自动启动汇率刷新任务
         asyncio.create_task(self._ensure_rate_refresh_task())
@@ -54,11 +124,22 @@ class RedisTaskScheduler:
     def stop(self):
         """停止调度器"""
         self._running = False
+        self._waiter.stop()
         if self._task:
             self._task.cancel()
+        if self.is_leader:
+            asyncio.create_task(self._release_leadership())
         logger.info("Redis 任务调度器已停止")
 
-    async def schedule_task(self, task_id: str, task_type: str, execute_at: float, data: dict | None = None):
+    async def schedule_task(
+        self,
+        task_id: str,
+        task_type: str,
+        execute_at: float,
+        data: dict | None = None,
+        schedule: dict | None = None,
+        max_concurrency: int = 1,
+    ):
         """
         调度任务
 
@@ -67,17 +148,67 @@ class RedisTaskScheduler:
             task_type: 任务类型
             execute_at: 执行时间（时间戳）
             data: 任务数据
+            schedule: 周期规则 {"cron": ...} 或 {"interval": 秒数}，None 表示一次性任务
+            max_concurrency: 同一任务允许同时运行的实例数
         """
         # 任务数据
-        task_data = {"id": task_id, "type": task_type, "data": data or {}}
+        task_data = {
+            "id": task_id,
+            "type": task_type,
+            "data": data or {},
+            "schedule": schedule,
+            "max_concurrency": max_concurrency,
+        }
+
+        # 存储任务详情、加入调度队列并唤醒工作器，一次往返完成
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(DETAILS_KEY, task_id, json.dumps(task_data))
+            pipe.zadd(SCHEDULED_KEY, {task_id: execute_at})
+            self._waiter.publish(pipe, execute_at)
+            await pipe.execute()
+        self._waiter.notify(execute_at)
 
-        # 存储任务详情
-        await self.redis.hset("tasks:details", task_id, json.dumps(task_data))
+        logger.debug(f"任务已调度: {task_id}, 执行时间: {execute_at}")
 
-        # 添加到调度队列
-        await self.redis.zadd("tasks:scheduled", {task_id: execute_at})
+    async def schedule_job(
+        self,
+        job_id: str,
+        task_type: str,
+        schedule: dict,
+        data: dict | None = None,
+        max_concurrency: int = 1,
+        first_run_at: float | None = None,
+    ):
+        """
+        添加周期任务（已存在时只更新规则和数据，保留已排定的下一次执行时间）
 
-        logger.debug(f"任务已调度: {task_id}, 执行时间: {execute_at}")
+        Args:
+            job_id: 任务ID
+            task_type: 任务类型（对应已注册的处理器）
+            schedule: {"cron": "分 时 日 月 周"}（UTC）或 {"interval": 秒数}
+            data: 任务数据
+            max_concurrency: 同一任务允许同时运行的实例数
+            first_run_at: 首次执行时间，默认按规则计算
+        """
+        # 提前校验规则，避免写入无法执行的任务
+        execute_at = first_run_at if first_run_at is not None else next_run_time(schedule, time.time())
+
+        if await self.redis.zscore(SCHEDULED_KEY, job_id) is not None:
+            task_data = {
+                "id": job_id,
+                "type": task_type,
+                "data": data or {},
+                "schedule": schedule,
+                "max_concurrency": max_concurrency,
+            }
+            await self.redis.hset(DETAILS_KEY, job_id, json.dumps(task_data))
+            logger.debug(f"周期任务已存在，更新规则: {job_id} -> {schedule}")
+            return
+
+        await self.schedule_task(
+            job_id, task_type, execute_at, data, schedule=schedule, max_concurrency=max_concurrency
+        )
+        logger.info(f"已添加周期任务: {job_id}, 规则: {schedule}, 首次执行: {time.ctime(execute_at)}")
 
     async def add_weekly_cache_cleanup(
         self, task_id: str, cache_key: str, weekday: int = 6, hour: int = 5, minute: int = 0
@@ -92,30 +223,54 @@ class RedisTaskScheduler:
             hour: 小时（UTC）
             minute: 分钟
         """
-        # 计算下次执行时间
-        import datetime
-
-        now = datetime.datetime.utcnow()
-        days_ahead = weekday - now.weekday()
-        if days_ahead <= 0:
-            days_ahead += 7
-
-        next_run = now + datetime.timedelta(days=days_ahead)
-        next_run = next_run.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        # cron 的周字段以周日为 0
+        cron = f"{minute} {hour} * * {(weekday + 1) % 7}"
+        await self.schedule_job(
+            f"weekly_cleanup_{task_id}",
+            "weekly_cleanup",
+            {"cron": cron},
+            data={"cache_key": cache_key},
+        )
 
-        # 如果计算出的时间已过，推迟到下周
-        if next_run <= now:
-            next_run += datetime.timedelta(days=7)
+    async def add_dataset_refresh(self, service_key: str, interval_seconds: int, initial_delay: int = 60):
+        """
+        添加价格数据集定时刷新任务（已存在则只更新刷新间隔，保留下次执行时间）
 
-        # 调度任务
-        await self.schedule_task(
-            task_id=f"weekly_cleanup_{cache_key}",
-            task_type="weekly_cleanup",
-            execute_at=next_run.timestamp(),
-            data={"cache_key": cache_key, "weekday": weekday, "hour": hour, "minute": minute},
+        Args:
+            service_key: 价格服务注册键（缓存子目录，如 netflix / spotify / disney_plus）
+            interval_seconds: 刷新间隔（秒）
+            initial_delay: 首次执行延迟（秒）
+        """
+        await self.schedule_job(
+            f"dataset_refresh_{service_key}",
+            "dataset_refresh",
+            {"interval": interval_seconds},
+            data={"service": service_key},
+            first_run_at=time.time() + initial_delay,
         )
 
-        logger.info(f"已添加每周清理任务: {cache_key}, 下次执行: {next_run}")
+    async def _refresh_leadership(self) -> bool:
+        """获取或续约 leader 租约，返回本实例是否为 leader"""
+        lease_ms = LEADER_LEASE_SECONDS * 1000
+        if self.is_leader and await self._renew_script(keys=[LEADER_KEY], args=[self.instance_id, lease_ms]):
+            return True
+
+        acquired = bool(await self.redis.set(LEADER_KEY, self.instance_id, nx=True, px=lease_ms))
+        if acquired != self.is_leader:
+            logger.info(f"任务调度器 {'成为' if acquired else '失去'} leader: {self.instance_id}")
+        self.is_leader = acquired
+        return acquired
+
+    async def _release_leadership(self):
+        """主动释放 leader 租约，让其他副本尽快接管"""
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        try:
+            if await self.redis.get(LEADER_KEY) == self.instance_id:
+                await self.redis.delete(LEADER_KEY)
+        except Exception as e:
+            logger.debug(f"释放 leader 租约失败: {e}")
 
     async def _scheduler_worker(self):
         """调度工作器"""
@@ -123,22 +278,15 @@ class RedisTaskScheduler:
 
         while self._running:
             try:
-                # 获取当前时间
-                current_time = time.time()
-
-                # 获取到期任务
-                due_tasks = await self.redis.zrangebyscore("tasks:scheduled", 0, current_time, withscores=False)
-
-                if due_tasks:
-                    # 处理到期任务
-                    for task_id in due_tasks:
-                        await self._execute_task(task_id)
-
-                        # 从调度队列移除
-                        await self.redis.zrem("tasks:scheduled", task_id)
-
-                # 每秒检查一次
-                await asyncio.sleep(1)
+                # 只有 leader 执行到期任务
+                if await self._refresh_leadership():
+                    await self._dispatch_due_tasks()
+                    # 休眠到下一个任务到期，或被新调度的更早任务唤醒
+                    await self._waiter.wait()
+                else:
+                    # 非 leader 不领取任务，最早的到期时间会停留在过去，按到期时间休眠会空转；
+                    # 只需在租约可能易主时重试
+                    await asyncio.sleep(LEADER_RENEW_INTERVAL)
 
             except asyncio.CancelledError:
                 break
@@ -148,46 +296,111 @@ class RedisTaskScheduler:
 
         logger.info("任务调度工作器已停止")
 
-    async def _execute_task(self, task_id: str):
-        """执行任务"""
-        try:
-            # 获取任务详情
-            task_json = await self.redis.hget("tasks:details", task_id)
-            if not task_json:
-                logger.warning(f"任务详情不存在: {task_id}")
-                return
+    async def _dispatch_due_tasks(self):
+        """领取所有到期任务并在后台执行"""
+        now = time.time()
+        due_tasks = await self.redis.zrangebyscore(SCHEDULED_KEY, "-inf", now)
+        for task_id in due_tasks:
+            await self._dispatch_task(task_id, now)
+
+    async def _dispatch_task(self, task_id: str, now: float):
+        """领取单个到期任务：先排定下一次执行，再按并发限制启动"""
+        task_json = await self.redis.hget(DETAILS_KEY, task_id)
+        if not task_json:
+            logger.warning(f"任务详情不存在: {task_id}")
+            await self.redis.zrem(SCHEDULED_KEY, task_id)
+            return
 
+        try:
             task_data = json.loads(task_json)
-            task_type = task_data.get("type")
-            data = task_data.get("data", {})
+            schedule = task_data.get("schedule")
+            next_run = next_run_time(schedule, now) if schedule else None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.error(f"任务详情无效，已移除 {task_id}: {e}")
+            await self.cancel_task(task_id)
+            return
+
+        claim_args = [task_id, now, "" if next_run is None else next_run]
+        if not await self._claim_script(keys=[SCHEDULED_KEY], args=claim_args):
+            return
+        if next_run is not None:
+            self._waiter.notify(next_run)
+
+        running = self._running_jobs.setdefault(task_id, set())
+        if len(running) >= task_data.get("max_concurrency", 1):
+            logger.warning(f"任务 {task_id} 仍在运行，跳过本次执行")
+            await self._record_run(task_data, "skipped", now, 0.0)
+            return
+
+        job = asyncio.create_task(self._execute_task(task_data, is_recurring=next_run is not None))
+        running.add(job)
+        job.add_done_callback(running.discard)
+
+    async def _execute_task(self, task_data: dict, is_recurring: bool):
+        """执行任务并记录执行结果"""
+        task_id = task_data.get("id")
+        task_type = task_data.get("type")
+        started_at = time.time()
+        start = time.perf_counter()
+        status, error = "ok", None
 
+        try:
             # 获取处理器
             handler = self._handlers.get(task_type)
             if handler:
-                await handler(task_id, data)
+                await handler(task_id, task_data.get("data", {}))
                 logger.info(f"任务已执行: {task_id}")
             else:
-                logger.warning(f"未找到任务处理器: {task_type}")
-
-            # 清理任务详情
-            await self.redis.hdel("tasks:details", task_id)
-
-            # 如果是周期性任务，重新调度
-            if task_type == "weekly_cleanup":
-                # 计算下次执行时间（7天后）
-                next_run = time.time() + (7 * 24 * 60 * 60)
-                await self.schedule_task(task_id, task_type, next_run, data)
-            elif task_type == "rate_refresh":
-                # 汇率刷新任务每30分钟执行一次
-                next_run = time.time() + (30 * 60)
-                await self.schedule_task(task_id, task_type, next_run, data)
-
+                status, error = "error", f"未找到任务处理器: {task_type}"
+                logger.warning(error)
         except Exception as e:
+            status, error = "error", str(e)
             logger.error(f"执行任务失败 {task_id}: {e}")
+        finally:
+            # 一次性任务执行后清理详情
+            if not is_recurring:
+                await self.redis.hdel(DETAILS_KEY, task_id)
+            await self._record_run(task_data, status, started_at, time.perf_counter() - start, error)
+
+    async def _record_run(
+        self, task_data: dict, status: str, started_at: float, duration: float, error: str | None = None
+    ):
+        """把执行记录写入有上限的 Redis Stream"""
+        entry = {
+            "task_id": task_data.get("id", ""),
+            "type": task_data.get("type", ""),
+            "status": status,
+            "started_at": f"{started_at:.3f}",
+            "duration_ms": f"{duration * 1000:.1f}",
+            "instance": self.instance_id,
+        }
+        if error:
+            entry["error"] = error[:500]
+        try:
+            await self.redis.xadd(HISTORY_STREAM, entry, maxlen=HISTORY_MAX_LENGTH, approximate=True)
+        except Exception as e:
+            logger.debug(f"写入任务执行记录失败: {e}")
+
+    async def get_task_history(self, limit: int = 50, task_id: str | None = None) -> list[dict]:
+        """获取最近的任务执行记录（最新的在前）"""
+        entries = await self.redis.xrevrange(HISTORY_STREAM, count=limit if task_id is None else HISTORY_MAX_LENGTH)
+        history = [{"id": entry_id, **fields} for entry_id, fields in entries]
+        if task_id is not None:
+            history = [entry for entry in history if entry.get("task_id") == task_id][:limit]
+        return history
 
     async def _handle_cache_cleanup(self, task_id: str, data: dict):
         """处理缓存清理任务"""
         cache_key = data.get("cache_key")
+
+        # 价格数据集不再直接删除，而是强制刷新，新数据校验通过前保留旧版本
+        from utils.price_query_service import get_price_service
+
+        service = get_price_service(cache_key) if cache_key else None
+        if service:
+            await self._refresh_price_service(service)
+            return
+
         if not cache_key or not self._cache_manager:
             logger.warning(f"无法执行缓存清理: cache_key={cache_key}")
             return
@@ -199,6 +412,28 @@ class RedisTaskScheduler:
         except Exception as e:
             logger.error(f"缓存清理失败 {cache_key}: {e}")
 
+    async def _handle_dataset_refresh(self, task_id: str, data: dict):
+        """处理价格数据集刷新任务"""
+        from utils.price_query_service import get_price_service
+
+        service_key = data.get("service")
+        service = get_price_service(service_key) if service_key else None
+        if not service:
+            logger.warning(f"价格服务未注册，跳过数据集刷新: {service_key}")
+            return
+
+        await self._refresh_price_service(service)
+
+    async def _refresh_price_service(self, service):
+        """强制刷新价格服务的数据集"""
+        try:
+            if await service.refresh_data(force=True):
+                logger.info(f"Redis调度：{service.service_name} 数据集刷新完成")
+            else:
+                logger.warning(f"Redis调度：{service.service_name} 数据集刷新失败")
+        except Exception as e:
+            logger.error(f"数据集刷新失败 {service.service_name}: {e}")
+
     async def _handle_rate_refresh(self, task_id: str, data: dict):
         """处理汇率刷新任务"""
         if not hasattr(self, "_rate_converter") or not self._rate_converter:
@@ -220,61 +455,51 @@ class RedisTaskScheduler:
     async def cancel_task(self, task_id: str):
         """取消任务"""
         # 从调度队列移除
-        result = await self.redis.zrem("tasks:scheduled", task_id)
+        result = await self.redis.zrem(SCHEDULED_KEY, task_id)
 
         # 删除任务详情
-        await self.redis.hdel("tasks:details", task_id)
+        await self.redis.hdel(DETAILS_KEY, task_id)
 
         if result:
             logger.debug(f"任务已取消: {task_id}")
 
     async def get_scheduled_tasks(self) -> dict[str, float]:
         """获取所有已调度任务"""
-        tasks = await self.redis.zrange("tasks:scheduled", 0, -1, withscores=True)
+        tasks = await self.redis.zrange(SCHEDULED_KEY, 0, -1, withscores=True)
         return dict(tasks)
 
     async def get_task_count(self) -> int:
         """获取调度任务数量"""
-        return await self.redis.zcard("tasks:scheduled")
+        return await self.redis.zcard(SCHEDULED_KEY)
 
     async def clear_all_tasks(self):
         """清除所有任务"""
         # 获取所有任务ID
-        task_ids = await self.redis.zrange("tasks:scheduled", 0, -1)
+        task_ids = await self.redis.zrange(SCHEDULED_KEY, 0, -1)
 
         # 删除任务详情
         if task_ids:
-            await self.redis.hdel("tasks:details", *task_ids)
+            await self.redis.hdel(DETAILS_KEY, *task_ids)
 
         # 清空调度队列
-        await self.redis.delete("tasks:scheduled")
+        await self.redis.delete(SCHEDULED_KEY)
 
         logger.info("已清除所有调度任务")
 
     async def schedule_rate_refresh(self, delay_minutes: int = 30):
-        """调度汇率刷新任务"""
-        task_id = "rate_refresh_periodic"
-        execute_at = time.time() + (delay_minutes * 60)
-
-        await self.schedule_task(task_id=task_id, task_type="rate_refresh", execute_at=execute_at, data={})
-
-        logger.info(f"已调度汇率刷新任务，将在 {delay_minutes} 分钟后执行")
+        """调度汇率刷新任务（每30分钟执行一次）"""
+        await self.schedule_job(
+            "rate_refresh_periodic",
+            "rate_refresh",
+            {"interval": 30 * 60},
+            first_run_at=time.time() + (delay_minutes * 60),
+        )
 
     async def _ensure_rate_refresh_task(self):
-        """确保汇率刷新任务存在，如果不存在则创建"""
+        """确保汇率刷新任务存在，如果不存在则创建（已存在时更新为周期任务规则）"""
         try:
-            task_id = "rate_refresh_periodic"
-
-            # 检查任务是否已存在
-            existing_task = await self.redis.zscore("tasks:scheduled", task_id)
-
-            if existing_task is None:
-                # 任务不存在，创建新任务（5分钟后开始执行）
-                await self.schedule_rate_refresh(delay_minutes=5)
-                logger.info("✅ 自动创建汇率刷新任务")
-            else:
-                logger.info("汇率刷新任务已存在，跳过创建")
-
+            # 首次创建时 5 分钟后开始执行
+            await self.schedule_rate_refresh(delay_minutes=5)
         except Exception as e:
             logger.error(f"检查汇率刷新任务失败: {e}")
 
@@ -0,0 +1,312 @@
+"""
+轻量级链路追踪
+基于 contextvars 的 span API：命令入口开启一条 trace，下游的缓存、上游请求、解析、格式化和
+Telegram 调用各自记录 span，asyncio 子任务自动继承父 span。
+
+采样分两步：开启 trace 时按 TRACE_SAMPLE_RATE 决定是否记录（未采样时 span() 几乎无开销）；
+trace 结束时只有耗时超过 TRACE_SLOW_THRESHOLD_MS 或以异常结束的才写入 Redis Stream（尾部采样），
+可用 /traces 查看。安装了 opentelemetry-sdk 且 TRACE_OTEL_EXPORT=true 时，同时转交给 OpenTelemetry。
+"""
+
+import inspect
+import json
+import logging
+import os
+import random
+import time
+from collections.abc import Callable
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace as otel_trace
+
+    OTEL_AVAILABLE = True
+except ImportError:
+    otel_trace = None
+    OTEL_AVAILABLE = False
+
+SLOW_TRACES_KEY = "trace:slow"
+# 单条 trace 最多记录的 span 数，超出部分只计数
+MAX_SPANS_PER_TRACE = 256
+
+
+class Span:
+    """一次计时的操作"""
+
+    __slots__ = ("attributes", "end", "error", "name", "parent_id", "span_id", "start", "trace")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: str | None, attributes: dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start = time.time()
+        self.end: float | None = None
+        self.error: str | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.time()) - self.start) * 1000
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "offset_ms": round((self.start - self.trace.root.start) * 1000, 2),
+            "duration_ms": round(self.duration_ms, 2),
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """一次命令处理产生的全部 span"""
+
+    def __init__(self, name: str, attributes: dict[str, Any]):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: list[Span] = []
+        self.dropped = 0
+        self.root = Span(self, name, None, attributes)
+        self.spans.append(self.root)
+
+    def add_span(self, name: str, parent: Span, attributes: dict[str, Any]) -> Span | None:
+        if len(self.spans) >= MAX_SPANS_PER_TRACE:
+            self.dropped += 1
+            return None
+        span = Span(self, name, parent.span_id, attributes)
+        self.spans.append(span)
+        return span
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "start": self.root.start,
+            "duration_ms": round(self.root.duration_ms, 2),
+            "error": self.root.error,
+            "dropped_spans": self.dropped,
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    """当前上下文中的 span（未在采样的 trace 中时为 None）"""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    记录一个子 span；不在采样的 trace 中时不做任何记录
+
+    Args:
+        name: span 名称，如 cache.load、http.request、parse.app_store
+        **attributes: 附加属性
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.trace.add_span(name, parent, attributes)
+    if child is None:
+        yield None
+        return
+
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        child.end = time.time()
+        _current_span.reset(token)
+
+
+def traced(name: str | None = None):
+    """把整个函数记录为一个 span（同步和异步函数均可）"""
+
+    def decorator(func: Callable):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class Tracer:
+    """trace 的采样、尾部采样和导出"""
+
+    def __init__(self):
+        self.redis = None
+        self.enabled = True
+        self.sample_rate = 1.0
+        self.slow_threshold_ms = 3000.0
+        self.stream_maxlen = 1000
+        self._otel_tracer = None
+
+    def configure(
+        self,
+        redis_client=None,
+        enabled: bool = True,
+        sample_rate: float = 1.0,
+        slow_threshold_ms: float = 3000.0,
+        stream_maxlen: int = 1000,
+        otel_export: bool = False,
+    ):
+        """
+        配置追踪
+
+        Args:
+            redis_client: 写入慢 trace 的 Redis 客户端，为 None 时只在日志中记录
+            enabled: 是否启用
+            sample_rate: 记录 trace 的比例（0-1）
+            slow_threshold_ms: 超过此耗时的 trace 写入 Redis Stream
+            stream_maxlen: Stream 近似最大长度
+            otel_export: 是否同时导出到 OpenTelemetry（需安装 opentelemetry-sdk）
+        """
+        self.redis = redis_client
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self.stream_maxlen = stream_maxlen
+
+        if otel_export and OTEL_AVAILABLE:
+            self._otel_tracer = otel_trace.get_tracer(__name__)
+        elif otel_export:
+            logger.warning("未安装 opentelemetry，跳过 OpenTelemetry 导出")
+
+        logger.info(
+            f"链路追踪: {'启用' if enabled else '禁用'}，采样率 {sample_rate}，慢请求阈值 {slow_threshold_ms:.0f}ms"
+        )
+
+    @asynccontextmanager
+    async def trace(self, name: str, **attributes):
+        """
+        开启一条 trace（已在 trace 中时退化为普通 span）
+
+        Args:
+            name: 根 span 名称，如 command.app
+            **attributes: 附加属性
+        """
+        if _current_span.get() is not None:
+            with span(name, **attributes) as child:
+                yield child
+            return
+
+        if not self.enabled or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        trace = Trace(name, attributes)
+        token = _current_span.set(trace.root)
+        try:
+            yield trace.root
+        except BaseException as e:
+            trace.root.error = type(e).__name__
+            raise
+        finally:
+            trace.root.end = time.time()
+            _current_span.reset(token)
+            await self._finish(trace)
+
+    async def _finish(self, trace: Trace):
+        if self._otel_tracer is not None:
+            self._export_otel(trace)
+
+        if trace.root.duration_ms < self.slow_threshold_ms and not trace.root.error:
+            return
+
+        data = trace.to_dict()
+        if self.redis is None:
+            logger.info(f"慢请求 trace {trace.root.name}: {data['duration_ms']}ms")
+            return
+
+        try:
+            await self.redis.xadd(
+                SLOW_TRACES_KEY,
+                {
+                    "trace_id": trace.trace_id,
+                    "name": trace.root.name,
+                    "duration_ms": data["duration_ms"],
+                    "error": trace.root.error or "",
+                    "trace": json.dumps(data, ensure_ascii=False, default=str),
+                },
+                maxlen=self.stream_maxlen,
+                approximate=True,
+            )
+        except Exception as e:
+            logger.debug(f"写入慢请求 trace 失败: {e}")
+
+    def _export_otel(self, trace: Trace):
+        """按记录的起止时间把 span 转交给 OpenTelemetry"""
+        try:
+            otel_spans = {}
+            for item in trace.spans:
+                parent = otel_spans.get(item.parent_id)
+                context = otel_trace.set_span_in_context(parent) if parent is not None else None
+                attributes = {
+                    k: v if isinstance(v, str | int | float | bool) else str(v) for k, v in item.attributes.items()
+                }
+                otel_span = self._otel_tracer.start_span(
+                    item.name, context=context, attributes=attributes, start_time=int(item.start * 1e9)
+                )
+                if item.error:
+                    otel_span.set_attribute("error.type", item.error)
+                otel_spans[item.span_id] = otel_span
+            for item in reversed(trace.spans):
+                otel_spans[item.span_id].end(end_time=int((item.end or item.start) * 1e9))
+        except Exception as e:
+            logger.debug(f"导出 OpenTelemetry span 失败: {e}")
+
+    async def get_slow_traces(self, limit: int = 10) -> list[dict]:
+        """读取最近的慢请求 trace（最新的在前）"""
+        if self.redis is None:
+            return []
+
+        entries = await self.redis.xrevrange(SLOW_TRACES_KEY, count=limit)
+        traces = []
+        for _entry_id, fields in entries:
+            try:
+                traces.append(json.loads(fields["trace"]))
+            except (KeyError, json.JSONDecodeError):
+                continue
+        return traces
+
+
+# 全局追踪器
+tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """获取全局追踪器"""
+    return tracer